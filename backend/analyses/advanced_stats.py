@@ -1,6 +1,6 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
+from scipy import stats, sparse
 from scipy.stats import chi2_contingency, f_oneway, kruskal, mannwhitneyu, shapiro, normaltest, levene, ttest_ind, ttest_rel
 import warnings
 warnings.filterwarnings('ignore')
@@ -27,6 +27,12 @@ class AdvancedStatsAnalyzer:
                 'var1': 'category1',
                 'var2': 'category2'
             },
+            'chi_square_screening': {
+                'target': 'disease',
+                'columns': None,  # None = toutes les autres colonnes
+                'top_n': 50,
+                'max_levels': 50  # colonnes plus cardinales (identifiants, continues) ignorées
+            },
             'alpha': 0.05
         }
         """
@@ -58,6 +64,10 @@ class AdvancedStatsAnalyzer:
         if 'chi_square' in tests and 'chi_square' in config:
             results['tests']['chi_square'] = self._chi_square_test(config['chi_square'], alpha)
         
+        # Criblage Chi-carré de toutes les colonnes contre une cible
+        if 'chi_square_screening' in tests and 'chi_square_screening' in config:
+            results['tests']['chi_square_screening'] = self._chi_square_screening(config['chi_square_screening'], alpha)
+        
         # Test de corrélation
         if 'correlation_test' in tests:
             results['tests']['correlation'] = self._correlation_tests(config, alpha)
@@ -262,7 +272,169 @@ class AdvancedStatsAnalyzer:
             'association_strength': 'faible' if cramers_v < 0.3 else 'moyenne' if cramers_v < 0.5 else 'forte',
             'interpretation': f"Association {'significative' if p_value < alpha else 'non significative'} entre {var1} et {var2} (p={p_value:.4f})"
         }
-    
+
+    def _chi_square_screening(self, screening_config, alpha):
+        """Criblage Chi-carré de toutes les colonnes catégorielles contre une variable cible"""
+        target = screening_config['target']
+        columns = screening_config.get('columns') or [c for c in self.df.columns if c != target]
+        columns = [c for c in columns if c != target and c in self.df.columns]
+        top_n = screening_config.get('top_n', 50)
+        correction = screening_config.get('correction', True)
+        max_levels = screening_config.get('max_levels', 50)
+
+        # Les tables denses font n_niveaux_cible × Σ modalités: on écarte les colonnes trop cardinales
+        n_levels = self.df[columns].nunique()
+        high_cardinality = [c for c in columns if n_levels[c] > max_levels]
+        columns = [c for c in columns if n_levels[c] <= max_levels]
+
+        if not columns:
+            return {'error': 'Aucune colonne à tester', 'high_cardinality_columns': high_cardinality}
+
+        table = self._batch_contingency(self.df[target], self.df[columns])
+        stats_by_column = self._batch_chi_square(table, correction)
+
+        chi2 = stats_by_column['chi2']
+        dof = stats_by_column['dof']
+        p_values = stats_by_column['p_value']
+        cramers_v = stats_by_column['cramers_v']
+        tested = dof > 0
+
+        # Correction de Benjamini-Hochberg sur les colonnes testées
+        p_adjusted = np.full(len(columns), np.nan)
+        tested_idx = np.flatnonzero(tested)
+        if len(tested_idx) > 0:
+            order = tested_idx[np.argsort(p_values[tested_idx])]
+            ranks = np.arange(1, len(order) + 1)
+            adjusted = np.minimum.accumulate((p_values[order] * len(order) / ranks)[::-1])[::-1]
+            p_adjusted[order] = np.minimum(adjusted, 1.0)
+
+        # Classement: p-value croissante puis Cramér's V décroissant
+        ranking = tested_idx[np.lexsort((-cramers_v[tested_idx], p_values[tested_idx]))]
+
+        ranked_results = []
+        for idx in ranking[:top_n]:
+            v = float(cramers_v[idx])
+            ranked_results.append({
+                'column': columns[idx],
+                'chi2_statistic': float(chi2[idx]),
+                'p_value': float(p_values[idx]),
+                'p_value_adjusted': float(p_adjusted[idx]),
+                'degrees_of_freedom': int(dof[idx]),
+                'n_samples': int(stats_by_column['n'][idx]),
+                'cramers_v': v,
+                'association_strength': 'faible' if v < 0.3 else 'moyenne' if v < 0.5 else 'forte',
+                'significant': bool(p_adjusted[idx] < alpha)
+            })
+
+        n_significant = int(np.sum(p_adjusted[tested_idx] < alpha))
+
+        return {
+            'test_name': 'Criblage Chi-carré d\'indépendance',
+            'target': target,
+            'n_target_levels': int(table['n_target_levels']),
+            'alpha': alpha,
+            'n_columns_tested': int(len(tested_idx)),
+            'n_significant': n_significant,
+            'skipped_columns': [columns[i] for i in np.flatnonzero(~tested)] + high_cardinality,
+            'high_cardinality_columns': high_cardinality,
+            'max_levels': max_levels,
+            'results': ranked_results,
+            'interpretation': f"{n_significant} colonne(s) sur {len(tested_idx)} significativement associée(s) à {target} (Benjamini-Hochberg, α={alpha})"
+        }
+
+    @staticmethod
+    def _batch_contingency(target, frame):
+        """
+        Construit toutes les tables de contingence cible × colonne en une seule
+        multiplication creuse entre les matrices one-hot des codes.
+
+        Retourne les effectifs observés (n_niveaux_cible × total des modalités),
+        la colonne propriétaire de chaque modalité et les totaux de lignes par
+        colonne (les valeurs manquantes sont exclues colonne par colonne).
+        """
+        n_rows = len(target)
+        target_codes, target_levels = pd.factorize(target)
+        target_rows = np.flatnonzero(target_codes >= 0)
+        target_onehot = sparse.csr_matrix(
+            (np.ones(len(target_rows)), (target_rows, target_codes[target_rows])),
+            shape=(n_rows, len(target_levels))
+        )
+
+        cell_rows, cell_cols, present_rows, present_cols, owner = [], [], [], [], []
+        offset = 0
+        for j, col in enumerate(frame.columns):
+            codes, levels = pd.factorize(frame[col])
+            rows = np.flatnonzero(codes >= 0)
+            cell_rows.append(rows)
+            cell_cols.append(codes[rows] + offset)
+            present_rows.append(rows)
+            present_cols.append(np.full(len(rows), j))
+            owner.append(np.full(len(levels), j))
+            offset += len(levels)
+
+        cell_rows = np.concatenate(cell_rows)
+        present_rows = np.concatenate(present_rows)
+        codes_onehot = sparse.csr_matrix(
+            (np.ones(len(cell_rows)), (cell_rows, np.concatenate(cell_cols))),
+            shape=(n_rows, offset)
+        )
+        present = sparse.csr_matrix(
+            (np.ones(len(present_rows)), (present_rows, np.concatenate(present_cols))),
+            shape=(n_rows, frame.shape[1])
+        )
+
+        target_t = target_onehot.T.tocsr()
+        return {
+            'observed': (target_t @ codes_onehot).toarray(),
+            'row_totals': (target_t @ present).toarray(),
+            'owner': np.concatenate(owner).astype(int),
+            'n_columns': frame.shape[1],
+            'n_target_levels': len(target_levels)
+        }
+
+    @staticmethod
+    def _batch_chi_square(table, correction=True):
+        """Chi², ddl, p-values et Cramér's V vectorisés pour toutes les tables (même convention que chi2_contingency)."""
+        observed = table['observed']
+        row_totals = table['row_totals']
+        owner = table['owner']
+        n_columns = table['n_columns']
+
+        n = row_totals.sum(axis=0)
+        col_totals = observed.sum(axis=0)
+
+        # Dimensions effectives (lignes/colonnes non vides) de chaque table
+        n_row_levels = (row_totals > 0).sum(axis=0)
+        n_col_levels = np.bincount(owner, weights=(col_totals > 0), minlength=n_columns)
+        dof = ((n_row_levels - 1) * (n_col_levels - 1)).clip(min=0).astype(int)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = row_totals[:, owner] * col_totals[np.newaxis, :] / n[owner][np.newaxis, :]
+        expected = np.nan_to_num(expected)
+
+        if correction:
+            # Correction de continuité de Yates pour les tables 2×2 (ddl = 1)
+            diff = expected - observed
+            yates = (dof[owner] == 1)[np.newaxis, :]
+            observed = np.where(yates, observed + np.sign(diff) * np.minimum(0.5, np.abs(diff)), observed)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cells = np.where(expected > 0, (observed - expected) ** 2 / expected, 0.0)
+        chi2 = np.bincount(owner, weights=cells.sum(axis=0), minlength=n_columns)
+
+        p_value = np.where(dof > 0, stats.chi2.sf(chi2, np.maximum(dof, 1)), np.nan)
+        min_dim = np.minimum(n_row_levels, n_col_levels) - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cramers_v = np.where((min_dim > 0) & (n > 0), np.sqrt(chi2 / (n * np.maximum(min_dim, 1))), 0.0)
+
+        return {
+            'chi2': chi2,
+            'dof': dof,
+            'p_value': p_value,
+            'cramers_v': cramers_v,
+            'n': n
+        }
+
     def _correlation_tests(self, config, alpha):
         """Tests de corrélation (Pearson, Spearman)"""
         numeric_cols = self.df.select_dtypes(include=[np.number]).columns
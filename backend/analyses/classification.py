@@ -5,7 +5,8 @@ from sklearn.svm import SVC
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, AdaBoostClassifier
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.naive_bayes import GaussianNB
-from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
+from sklearn.model_selection import train_test_split, cross_val_score, cross_val_predict, GridSearchCV
+from sklearn.base import clone
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import (accuracy_score, precision_score, recall_score, f1_score, 
                             roc_auc_score, confusion_matrix, classification_report)
@@ -25,7 +26,8 @@ except ImportError:
 
 # Import explainability and advanced features
 try:
-    from analyses.explainability import ExplainabilityAnalyzer, ModelAuditor, CalibrationAnalyzer
+    from analyses.explainability import (ExplainabilityAnalyzer, ModelAuditor, CalibrationAnalyzer,
+                                         ProbabilityCalibrator)
     from analyses.feature_engineering import FeatureEngineer, ImbalanceHandler
     from analyses.data_quality import DataQualityAnalyzer
     EXPLAINABILITY_AVAILABLE = True
@@ -46,6 +48,10 @@ class ClassificationAnalyzer:
         self._target_column = None
         self._label_encoder = None
         self._class_names = None
+        self._feature_ranges = None
+        self._background_sample = None
+        self._holdout = None
+        self._calibrator = None
 
     def _encode_features(self, X_raw: pd.DataFrame) -> pd.DataFrame:
         """Encode les features en numérique (bool/date/catégoriel) et gère les NA."""
@@ -79,6 +85,15 @@ class ClassificationAnalyzer:
         self._target_column = config.get('target')
         self._best_model_key = method_key
 
+        # Bornes observées de chaque feature encodée (what-if / contrefactuels)
+        self._feature_ranges = {
+            col: (float(X_encoded[col].min()), float(X_encoded[col].max()))
+            for col in X_encoded.columns
+        }
+        # Lignes de fond pour la dépendance partielle / ICE
+        n_background = min(len(X_encoded), config.get('background_size', 200))
+        self._background_sample = X_encoded.sample(n=n_background, random_state=42).values.astype(float)
+
         # Standardisation (utile pour knn/svm/nb). Pour les arbres, ça ne gêne pas.
         scaler = StandardScaler()
         X_scaled = scaler.fit_transform(X_encoded.values)
@@ -121,24 +136,51 @@ class ClassificationAnalyzer:
         self._predict_scaler = scaler
         self._predict_model = model
 
-    def predict_proba(self, features: dict):
-        """Retourne (classes, probas) pour une ligne."""
+        # Recalibration optionnelle des probabilités, ajustée sur les prédictions out-of-fold.
+        # Un échec n'invalide pas le modèle servi: probabilités brutes et avertissement
+        self._calibrator = None
+        calibration_method = config.get('calibration_method')
+        if calibration_method and EXPLAINABILITY_AVAILABLE and hasattr(model, 'predict_proba'):
+            X_fit = X_scaled if scaler is not None else X_encoded.values
+            try:
+                oof_proba = cross_val_predict(clone(model), X_fit, y_encoded,
+                                              cv=config.get('cv_folds', 5), method='predict_proba')
+                self._calibrator = ProbabilityCalibrator(calibration_method).fit(oof_proba, y_encoded,
+                                                                                 model.classes_)
+            except Exception as e:
+                self._calibrator = None
+                return (f"Probability calibration ({calibration_method}) failed, "
+                        f"serving uncalibrated probabilities: {e}")
+        return None
+
+    def encode_rows(self, rows: list) -> np.ndarray:
+        """Matrice encodée (non standardisée) de plusieurs lignes, dans l'ordre des colonnes d'entraînement."""
         if self._predict_model is None or not self._original_feature_columns or not self._encoded_feature_columns:
             raise ValueError("No trained classification model available")
 
-        row = {}
-        for col in self._original_feature_columns:
-            row[col] = features.get(col, None)
-        X_raw = pd.DataFrame([row])
+        X_raw = pd.DataFrame(
+            [{col: features.get(col, None) for col in self._original_feature_columns} for features in rows],
+            columns=self._original_feature_columns
+        )
         X_encoded = self._encode_features(X_raw)
         X_encoded = X_encoded.reindex(columns=self._encoded_feature_columns, fill_value=0)
+        return X_encoded.values.astype(float)
+
+    def encode_row(self, features: dict) -> np.ndarray:
+        """Vecteur encodé (non standardisé) d'une ligne, dans l'ordre des colonnes d'entraînement."""
+        return self.encode_rows([features])[0]
 
-        X_in = X_encoded.values
+    def predict_proba(self, features: dict):
+        """Retourne (classes, probas) pour une ligne."""
+        X_in = self.encode_row(features).reshape(1, -1)
         if self._predict_scaler is not None:
             X_in = self._predict_scaler.transform(X_in)
 
         if hasattr(self._predict_model, 'predict_proba'):
-            proba = self._predict_model.predict_proba(X_in)[0]
+            proba = self._predict_model.predict_proba(X_in)
+            if self._calibrator is not None:
+                proba = self._calibrator.transform(proba)
+            proba = proba[0]
         else:
             # fallback: probas uniformes
             classes = getattr(self._predict_model, 'classes_', np.array([]))
@@ -164,7 +206,10 @@ class ClassificationAnalyzer:
                        'gradient_boosting', 'xgboost', 'lightgbm'],
             'test_size': 0.2,
             'cv_folds': 5,
-            'tune_hyperparameters': False
+            'tune_hyperparameters': False,
+            'importance_method': 'auto',  # ou 'permutation' (forcée pour tous les modèles)
+            'permutation_repeats': 5,
+            'calibration_method': None  # ou 'isotonic' / 'sigmoid' ('platt') (appliquée par /predict)
         }
         """
         results = {
@@ -213,6 +258,19 @@ class ClassificationAnalyzer:
                     'models': {}
                 }
         
+        # Méthode de calibration validée avant tout entraînement
+        if config.get('calibration_method') and EXPLAINABILITY_AVAILABLE:
+            try:
+                ProbabilityCalibrator.resolve_method(config['calibration_method'])
+            except ValueError as e:
+                return {
+                    'error': 'Invalid calibration_method',
+                    'validation_errors': [str(e)],
+                    'validation_warnings': [],
+                    'summary': {},
+                    'models': {}
+                }
+        
         # Préparation des données (robuste multi-types)
         X_raw = self.df[config['features']]
         X = self._encode_features(X_raw)
@@ -246,6 +304,16 @@ class ClassificationAnalyzer:
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=config.get('test_size', 0.2), random_state=42, stratify=y
         )
+
+        # Holdout compact (float32) conservé pour /model/stress-test
+        n_holdout = min(len(X_test), config.get('holdout_size', 2000))
+        holdout_rows = np.sort(np.random.default_rng(42).choice(len(X_test), n_holdout, replace=False))
+        self._holdout = {
+            'X': np.asarray(X_test, dtype=np.float32)[holdout_rows],
+            'y': np.asarray(y_test)[holdout_rows],
+            'rows': holdout_rows,
+            'columns': X.columns.tolist()
+        }
         
         # Standardisation
         scaler = StandardScaler()
@@ -356,8 +424,12 @@ class ClassificationAnalyzer:
                 except Exception:
                     pass
             
+            # Modèle servi ajusté sur X_train seulement: le holdout reste hors échantillon
             try:
-                self._train_predictor(best_key, X, y, config)
+                calibration_warning = self._train_predictor(best_key, X_train, y_train, config)
+                if calibration_warning:
+                    results['warnings'] = results.get('warnings', [])
+                    results['warnings'].append(calibration_warning)
             except Exception:
                 self._predict_model = None
         
@@ -590,26 +662,35 @@ class ClassificationAnalyzer:
         
         # Add explainability features
         if EXPLAINABILITY_AVAILABLE:
-            # Feature importance
-            feature_names = config.get('features', [])
+            # Feature importance: native si le modèle l'expose, sinon par permutation sur le holdout
+            feature_names = self._holdout['columns'] if self._holdout else config.get('features', [])
             if len(feature_names) > 0:
                 importance = ExplainabilityAnalyzer.get_feature_importance(
                     model, feature_names, 'tree' if hasattr(model, 'feature_importances_') else 'linear'
                 )
+                if (not importance.get('available') or config.get('importance_method') == 'permutation') \
+                        and self._holdout:
+                    rows = self._holdout['rows']
+                    X_holdout = X_test.iloc[rows] if hasattr(X_test, 'iloc') else X_test[rows]
+                    importance = ExplainabilityAnalyzer.permutation_importance(
+                        model, X_holdout, np.asarray(y_test)[rows], feature_names,
+                        n_repeats=config.get('permutation_repeats', 5),
+                        n_jobs=config.get('n_jobs', 1)
+                    )
                 if importance.get('available'):
                     result['feature_importance_global'] = importance
             
-            # Calibration for binary classification
-            if has_proba and len(np.unique(y_test)) == 2:
+            # Calibration (binaire ou multiclasse one-vs-rest)
+            if has_proba:
                 try:
                     calibration = CalibrationAnalyzer.analyze_calibration(
-                        y_test, y_pred_proba_test[:, 1]
+                        y_test, y_pred_proba_test, classes=model.classes_
                     )
                     result['calibration'] = calibration
                     
                     # Suggest calibration if needed
                     if not calibration.get('is_well_calibrated', True):
-                        brier = calibration.get('brier_score', 0)
+                        brier = calibration.get('brier_score_normalized', calibration.get('brier_score', 0))
                         model_type = 'tree' if hasattr(model, 'feature_importances_') else 'linear'
                         suggestion = CalibrationAnalyzer.suggest_calibration_method(brier, model_type)
                         result['calibration_suggestion'] = suggestion
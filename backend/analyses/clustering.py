@@ -1,27 +1,68 @@
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering
+from joblib import Parallel, delayed
+from sklearn.cluster import KMeans, MiniBatchKMeans, DBSCAN, AgglomerativeClustering, Birch
 from sklearn.mixture import GaussianMixture
+from sklearn.neighbors import NearestNeighbors
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
+from sklearn.metrics import silhouette_score, silhouette_samples, davies_bouldin_score, calinski_harabasz_score, pairwise_distances
 from sklearn.decomposition import PCA
 
+from utils.array_codec import encode_array, smallest_int_dtype
+
+try:
+    from sklearn.cluster import HDBSCAN
+    HDBSCAN_AVAILABLE = True
+except ImportError:
+    HDBSCAN_AVAILABLE = False
+
+# Au-delà de cette taille, le silhouette score (O(n²)) est estimé sur un échantillon stratifié
+SILHOUETTE_SAMPLE_SIZE = 4000
+# Au-delà de ce nombre de lignes, seuls Davies-Bouldin et Calinski-Harabasz (O(n·k)) sont calculés
+SILHOUETTE_MAX_ROWS = 500000
+# Taille de l'échantillon sur lequel la chaîne d'initialisations du balayage de k est calculée
+SWEEP_SEED_SAMPLE_SIZE = 10000
+# Au-delà de ce nombre de lignes, le balayage de k utilise MiniBatchKMeans ('sweep_minibatch': 'auto')
+SWEEP_MINIBATCH_ROWS = 50000
+# Nombre de points PCA renvoyés pour la visualisation en mode 'compact'
+PLOT_SAMPLE_SIZE = 5000
+
 class ClusteringAnalyzer:
     def __init__(self, df):
         self.df = df
+        # Modèles K-Means ajustés pendant le balayage de k, réutilisés par _kmeans_clustering
+        self._sweep_models = {}
+        # Labels complets par méthode (numpy), récupérables à la demande par dataset_id
+        self.labels_ = {}
         
     def perform_analysis(self, config):
         """
         Clustering avancé (K-Means, DBSCAN, Hierarchical, GMM)
         config = {
             'features': ['col1', 'col2', ...],
-            'methods': ['kmeans', 'dbscan', 'hierarchical', 'gmm'],
-            'n_clusters': 3,  # Pour K-Means, Hierarchical, GMM
+            'methods': ['kmeans', 'dbscan', 'hierarchical', 'gmm',
+                        'minibatch_kmeans', 'birch', 'hdbscan', 'dbscan_graph'],
+            'n_clusters': 3,  # Pour K-Means, Hierarchical, GMM, MiniBatch, BIRCH
             'eps': 0.5,  # Pour DBSCAN
-            'min_samples': 5,  # Pour DBSCAN
-            'linkage': 'ward',  # Pour Hierarchical
-            'find_optimal_k': True  # Recherche automatique du nombre optimal de clusters
+            'min_samples': 5,  # Pour DBSCAN / HDBSCAN
+            'linkage': 'ward',  # Pour Hierarchical / BIRCH
+            'batch_size': 1024,  # Pour MiniBatch K-Means
+            'birch_threshold': 0.5,  # Rayon des sous-clusters BIRCH
+            'min_cluster_size': 5,  # Pour HDBSCAN
+            'neighbors_algorithm': 'auto',  # 'kd_tree' / 'ball_tree' pour dbscan_graph
+            'silhouette_sample_size': 4000,  # Silhouette estimé sur échantillon au-delà
+            'silhouette_max_rows': 500000,  # Au-delà: Davies-Bouldin / Calinski-Harabasz seulement
+            'find_optimal_k': True,  # Recherche automatique du nombre optimal de clusters
+            'use_optimal_k': False,  # Utiliser le k recommandé au lieu de n_clusters
+            'n_jobs': -1,  # Workers parallèles pour le balayage de k
+            'sweep_minibatch': 'auto',  # True / False / 'auto' (MiniBatchKMeans si n > 50k)
+            'reuse_sweep_model': True,  # K-Means final = modèle du balayage (1 init. chaînée) / False: n_init=10
+            'response_mode': 'full',  # 'compact': labels en base64 + PCA sous-échantillonnée
+            'plot_sample_size': 5000  # Points PCA renvoyés en mode 'compact'
         }
+        
+        Les méthodes minibatch_kmeans, birch, hdbscan et dbscan_graph sont
+        destinées aux grands volumes (> 50k lignes).
         """
         results = {
             'summary': {},
@@ -37,7 +78,9 @@ class ClusteringAnalyzer:
         
         # Recherche du nombre optimal de clusters
         if config.get('find_optimal_k', False):
-            results['optimal_k'] = self._find_optimal_k(X_scaled, max_k=10)
+            results['optimal_k'] = self._find_optimal_k(X_scaled, max_k=10, config=config)
+            if config.get('use_optimal_k', False):
+                config = {**config, 'n_clusters': results['optimal_k']['recommended_k']}
         
         methods = config.get('methods', ['kmeans'])
         
@@ -65,50 +108,178 @@ class ClusteringAnalyzer:
                 X_scaled, config
             )
         
+        # Méthodes scalables pour grands volumes
+        if 'minibatch_kmeans' in methods:
+            results['models']['minibatch_kmeans'] = self._minibatch_kmeans_clustering(
+                X_scaled, config
+            )
+        
+        if 'birch' in methods:
+            results['models']['birch'] = self._birch_clustering(
+                X_scaled, config
+            )
+        
+        if 'hdbscan' in methods:
+            results['models']['hdbscan'] = self._hdbscan_clustering(
+                X_scaled, config
+            )
+        
+        if 'dbscan_graph' in methods:
+            results['models']['dbscan_graph'] = self._dbscan_graph_clustering(
+                X_scaled, config
+            )
+        
+        # Labels complets conservés pour récupération à la demande
+        self.labels_ = {name: np.asarray(model_result['labels'])
+                        for name, model_result in results['models'].items() if 'labels' in model_result}
+        
+        response_mode = config.get('response_mode', 'full')
+        
         # Visualisation PCA (réduction à 2D pour visualisation)
-        results['visualization'] = self._pca_visualization(X_scaled, results['models'])
+        results['visualization'] = self._pca_visualization(
+            X_scaled, results['models'], response_mode, config.get('plot_sample_size', PLOT_SAMPLE_SIZE)
+        )
         
         # Comparaison des modèles
         results['summary'] = self._compare_clustering_models(results['models'])
         
+        # Labels par ligne: liste JSON ('full') ou tableau entier compact en base64 ('compact')
+        for model_result in results['models'].values():
+            if 'labels' in model_result:
+                model_result['labels'] = self._format_labels(model_result['labels'], response_mode)
+        results['response_mode'] = response_mode
+        
         return results
     
-    def _find_optimal_k(self, X, max_k=10):
-        """Méthode du coude (Elbow Method) pour trouver le k optimal"""
+    def _find_optimal_k(self, X, max_k=10, config=None):
+        """
+        Méthode du coude (Elbow Method) pour trouver le k optimal
+        
+        Les initialisations sont chaînées sur un échantillon: les centres de k
+        partent des centres de k-1 plus une scission du cluster le plus dispersé.
+        Les ajustements complets de chaque k partent ensuite de ces centres
+        (une seule initialisation) et tournent en parallèle. Les modèles sont
+        conservés pour être réutilisés par _kmeans_clustering.
+        """
+        config = config or {}
+        sample_size = config.get('silhouette_sample_size', SILHOUETTE_SAMPLE_SIZE)
+        use_silhouette = len(X) <= config.get('silhouette_max_rows', SILHOUETTE_MAX_ROWS)
+        use_minibatch = config.get('sweep_minibatch', 'auto')
+        if use_minibatch == 'auto':
+            use_minibatch = len(X) > SWEEP_MINIBATCH_ROWS
+        n_jobs = config.get('n_jobs', -1)
+        
         inertias = []
         silhouette_scores = []
+        silhouette_cis = []
+        calinski_scores = []
         k_range = range(2, min(max_k + 1, len(X)))
         
-        for k in k_range:
-            kmeans = KMeans(n_clusters=k, random_state=42, n_init=10)
-            labels = kmeans.fit_predict(X)
+        # Un seul bloc de distances (échantillon fixe) réutilisé pour tous les k
+        if use_silhouette:
+            sample_idx = self._uniform_sample(len(X), sample_size)
+            distance_block = pairwise_distances(X[sample_idx].astype(np.float32))
+        
+        # Chaîne d'initialisations (séquentielle mais sur échantillon), puis ajustements parallèles
+        seeds = self._warm_start_seeds(X, list(k_range))
+        models = Parallel(n_jobs=n_jobs, prefer='threads')(
+            delayed(self._fit_sweep_model)(X, k, seeds[k], use_minibatch, config) for k in k_range
+        )
+        self._sweep_models = dict(zip(k_range, models))
+        
+        for k, kmeans in self._sweep_models.items():
+            labels = kmeans.labels_
             
             inertias.append(kmeans.inertia_)
-            silhouette_scores.append(silhouette_score(X, labels))
-        
-        # Trouver le meilleur k (silhouette score max)
-        best_k_idx = np.argmax(silhouette_scores)
+            calinski_scores.append(float(calinski_harabasz_score(X, labels)))
+            if use_silhouette:
+                estimate = self._silhouette_from_distances(distance_block, labels[sample_idx], len(X))
+                silhouette_scores.append(estimate['score'])
+                silhouette_cis.append(estimate['ci'])
+        
+        # Meilleur k: silhouette max, sinon Calinski-Harabasz max (grands volumes)
+        if use_silhouette:
+            selection_metric = 'silhouette'
+            best_k_idx = int(np.argmax([score if score is not None else -1 for score in silhouette_scores]))
+        else:
+            selection_metric = 'calinski_harabasz'
+            best_k_idx = int(np.argmax(calinski_scores))
         best_k = list(k_range)[best_k_idx]
         
         return {
             'k_range': list(k_range),
             'inertias': inertias,
             'silhouette_scores': silhouette_scores,
+            'silhouette_confidence_intervals': silhouette_cis,
+            'silhouette_sample_size': int(len(sample_idx)) if use_silhouette else None,
+            'calinski_harabasz_scores': calinski_scores,
+            'selection_metric': selection_metric,
             'recommended_k': int(best_k),
-            'best_silhouette': float(silhouette_scores[best_k_idx])
+            'best_silhouette': silhouette_scores[best_k_idx] if use_silhouette else None,
+            'sweep': {
+                'strategy': 'warm_start',
+                'estimator': 'MiniBatchKMeans' if use_minibatch else 'KMeans',
+                'n_jobs': n_jobs
+            }
         }
     
+    def _warm_start_seeds(self, X, k_values, random_state=42):
+        """
+        Centres initiaux pour chaque k, calculés en chaîne sur un échantillon:
+        centres de k-1 + scission du cluster de plus forte inertie le long de
+        sa première composante principale, puis affinage K-Means sur l'échantillon.
+        """
+        if not k_values:
+            return {}
+        sample = X[self._uniform_sample(len(X), SWEEP_SEED_SAMPLE_SIZE, random_state)]
+        centers = sample.mean(axis=0, keepdims=True)
+        labels = np.zeros(len(sample), dtype=int)
+        seeds = {}
+        
+        for k in range(2, max(k_values) + 1):
+            # Cluster le plus dispersé (plus grande contribution à l'inertie)
+            sse = np.bincount(labels, weights=((sample - centers[labels]) ** 2).sum(axis=1), minlength=len(centers))
+            target = int(np.argmax(sse))
+            members = sample[labels == target]
+            
+            if len(members) > 1:
+                _, singular_values, components = np.linalg.svd(members - centers[target], full_matrices=False)
+                offset = components[0] * singular_values[0] / np.sqrt(len(members))
+            else:
+                offset = np.zeros(sample.shape[1])
+            
+            init = np.vstack([np.delete(centers, target, axis=0), centers[target] + offset, centers[target] - offset])
+            model = KMeans(n_clusters=k, init=init, n_init=1, random_state=random_state).fit(sample)
+            centers, labels = model.cluster_centers_, model.labels_
+            seeds[k] = centers
+        
+        return {k: seeds[k] for k in k_values}
+    
+    def _fit_sweep_model(self, X, k, init, use_minibatch, config):
+        """Ajustement complet d'un k du balayage à partir de ses centres initiaux"""
+        if use_minibatch:
+            model = MiniBatchKMeans(n_clusters=k, init=init, n_init=1, random_state=42,
+                                    batch_size=config.get('batch_size', 1024))
+        else:
+            model = KMeans(n_clusters=k, init=init, n_init=1, random_state=42)
+        return model.fit(X)
+    
     def _kmeans_clustering(self, X, config):
         """K-Means Clustering"""
         n_clusters = config.get('n_clusters', 3)
         
-        model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-        labels = model.fit_predict(X)
+        # Réutiliser le modèle du balayage de k (KMeans ou MiniBatchKMeans) s'il a déjà été
+        # ajusté pour ce k: une seule initialisation chaînée au lieu de n_init=10 aléatoires
+        model = self._sweep_models.get(n_clusters) if config.get('reuse_sweep_model', True) else None
+        reused = model is not None
+        if reused:
+            labels = model.labels_
+        else:
+            model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+            labels = model.fit_predict(X)
         
         # Métriques de qualité
-        silhouette = silhouette_score(X, labels)
-        davies_bouldin = davies_bouldin_score(X, labels)
-        calinski_harabasz = calinski_harabasz_score(X, labels)
+        metrics = self._cluster_quality(X, labels, config)
         
         # Taille des clusters
         unique, counts = np.unique(labels, return_counts=True)
@@ -120,17 +291,17 @@ class ClusteringAnalyzer:
         return {
             'method': 'K-Means',
             'n_clusters': n_clusters,
-            'labels': labels.tolist(),
+            'reused_from_k_sweep': reused,
+            'estimator': type(model).__name__,
+            'n_init': 1 if reused else 10,
+            'initialization': 'warm_start_k_sweep' if reused else 'k-means++',
+            'labels': labels,
             'cluster_sizes': cluster_sizes,
             'cluster_centers': centers.tolist(),
             'inertia': float(model.inertia_),
-            'metrics': {
-                'silhouette_score': float(silhouette),
-                'davies_bouldin_index': float(davies_bouldin),
-                'calinski_harabasz_score': float(calinski_harabasz)
-            },
+            'metrics': metrics,
             'interpretation': {
-                'silhouette': 'Excellent' if silhouette > 0.7 else 'Bon' if silhouette > 0.5 else 'Acceptable' if silhouette > 0.25 else 'Faible'
+                'silhouette': self._silhouette_label(metrics['silhouette_score'])
             }
         }
     
@@ -150,16 +321,8 @@ class ClusteringAnalyzer:
         unique, counts = np.unique(labels, return_counts=True)
         cluster_sizes = dict(zip(unique.tolist(), counts.tolist()))
         
-        # Métriques (seulement si on a au moins 2 clusters et pas tous les points comme bruit)
-        if n_clusters >= 2 and n_noise < len(labels):
-            # Filtrer les points de bruit pour le calcul du silhouette score
-            mask = labels != -1
-            if sum(mask) > 0:
-                silhouette = silhouette_score(X[mask], labels[mask])
-            else:
-                silhouette = None
-        else:
-            silhouette = None
+        # Métriques (points de bruit exclus)
+        metrics = self._cluster_quality(X, labels, config, exclude_noise=True)
         
         return {
             'method': 'DBSCAN',
@@ -170,11 +333,9 @@ class ClusteringAnalyzer:
             'n_clusters': n_clusters,
             'n_noise_points': n_noise,
             'noise_percentage': float(n_noise / len(labels) * 100),
-            'labels': labels.tolist(),
+            'labels': labels,
             'cluster_sizes': cluster_sizes,
-            'metrics': {
-                'silhouette_score': float(silhouette) if silhouette is not None else None
-            },
+            'metrics': metrics,
             'interpretation': 'DBSCAN identifie les clusters de densité et détecte les points aberrants comme bruit'
         }
     
@@ -187,9 +348,7 @@ class ClusteringAnalyzer:
         labels = model.fit_predict(X)
         
         # Métriques de qualité
-        silhouette = silhouette_score(X, labels)
-        davies_bouldin = davies_bouldin_score(X, labels)
-        calinski_harabasz = calinski_harabasz_score(X, labels)
+        metrics = self._cluster_quality(X, labels, config)
         
         # Taille des clusters
         unique, counts = np.unique(labels, return_counts=True)
@@ -199,16 +358,12 @@ class ClusteringAnalyzer:
             'method': 'Hierarchical Clustering',
             'n_clusters': n_clusters,
             'linkage': linkage,
-            'labels': labels.tolist(),
+            'labels': labels,
             'cluster_sizes': cluster_sizes,
-            'metrics': {
-                'silhouette_score': float(silhouette),
-                'davies_bouldin_index': float(davies_bouldin),
-                'calinski_harabasz_score': float(calinski_harabasz)
-            },
+            'metrics': metrics,
             'interpretation': {
                 'linkage_method': f'Méthode de liaison: {linkage}',
-                'silhouette': 'Excellent' if silhouette > 0.7 else 'Bon' if silhouette > 0.5 else 'Acceptable' if silhouette > 0.25 else 'Faible'
+                'silhouette': self._silhouette_label(metrics['silhouette_score'])
             }
         }
     
@@ -222,8 +377,7 @@ class ClusteringAnalyzer:
         probabilities = model.predict_proba(X)
         
         # Métriques de qualité
-        silhouette = silhouette_score(X, labels)
-        davies_bouldin = davies_bouldin_score(X, labels)
+        metrics = self._cluster_quality(X, labels, config)
         
         # Taille des clusters
         unique, counts = np.unique(labels, return_counts=True)
@@ -235,47 +389,292 @@ class ClusteringAnalyzer:
         return {
             'method': 'Gaussian Mixture Model',
             'n_components': n_components,
-            'labels': labels.tolist(),
+            'labels': labels,
             'probabilities_sample': probabilities[:10].tolist(),
             'cluster_sizes': cluster_sizes,
             'cluster_means': means.tolist(),
             'aic': float(model.aic(X)),
             'bic': float(model.bic(X)),
             'log_likelihood': float(model.score(X) * len(X)),
-            'metrics': {
-                'silhouette_score': float(silhouette),
-                'davies_bouldin_index': float(davies_bouldin)
-            },
+            'metrics': metrics,
             'interpretation': 'GMM est un modèle probabiliste qui suppose que les données proviennent de plusieurs distributions gaussiennes'
         }
     
-    def _pca_visualization(self, X, models):
-        """Réduction à 2D avec PCA pour visualisation"""
+    def _minibatch_kmeans_clustering(self, X, config):
+        """MiniBatch K-Means (K-Means approximé par mini-lots pour grands volumes)"""
+        n_clusters = config.get('n_clusters', 3)
+        batch_size = config.get('batch_size', 1024)
+        
+        model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=42, n_init=3)
+        labels = model.fit_predict(X)
+        
+        metrics = self._cluster_quality(X, labels, config)
+        
+        unique, counts = np.unique(labels, return_counts=True)
+        cluster_sizes = dict(zip(unique.tolist(), counts.tolist()))
+        
+        return {
+            'method': 'MiniBatch K-Means',
+            'n_clusters': n_clusters,
+            'batch_size': batch_size,
+            'labels': labels,
+            'cluster_sizes': cluster_sizes,
+            'cluster_centers': model.cluster_centers_.tolist(),
+            'inertia': float(model.inertia_),
+            'metrics': metrics,
+            'interpretation': {
+                'silhouette': self._silhouette_label(metrics['silhouette_score'])
+            }
+        }
+    
+    def _birch_clustering(self, X, config):
+        """BIRCH: pré-clustering en sous-clusters (CF-tree) puis clustering hiérarchique des sous-clusters"""
+        n_clusters = config.get('n_clusters', 3)
+        linkage = config.get('linkage', 'ward')
+        threshold = config.get('birch_threshold', 0.5)
+        
+        # L'étape agglomérative ne porte que sur les centres des sous-clusters BIRCH
+        global_step = AgglomerativeClustering(n_clusters=n_clusters, linkage=linkage)
+        model = Birch(threshold=threshold, n_clusters=global_step)
+        labels = model.fit_predict(X)
+        n_subclusters = len(model.subcluster_centers_)
+        
+        metrics = self._cluster_quality(X, labels, config)
+        
+        unique, counts = np.unique(labels, return_counts=True)
+        cluster_sizes = dict(zip(unique.tolist(), counts.tolist()))
+        
+        return {
+            'method': 'BIRCH + Hierarchical',
+            'n_clusters': n_clusters,
+            'linkage': linkage,
+            'threshold': threshold,
+            'n_subclusters': int(n_subclusters),
+            'labels': labels,
+            'cluster_sizes': cluster_sizes,
+            'metrics': metrics,
+            'interpretation': f'{n_subclusters} sous-clusters BIRCH regroupés par liaison {linkage}'
+        }
+    
+    def _hdbscan_clustering(self, X, config):
+        """HDBSCAN - DBSCAN hiérarchique (pas de paramètre eps à régler)"""
+        if not HDBSCAN_AVAILABLE:
+            return {'error': 'HDBSCAN nécessite scikit-learn >= 1.3'}
+        
+        min_cluster_size = config.get('min_cluster_size', 5)
+        min_samples = config.get('min_samples', None)
+        
+        model = HDBSCAN(min_cluster_size=min_cluster_size, min_samples=min_samples, copy=True)
+        labels = model.fit_predict(X)
+        
+        n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
+        n_noise = int(np.sum(labels == -1))
+        
+        unique, counts = np.unique(labels, return_counts=True)
+        cluster_sizes = dict(zip(unique.tolist(), counts.tolist()))
+        
+        metrics = self._cluster_quality(X, labels, config, exclude_noise=True)
+        
+        return {
+            'method': 'HDBSCAN',
+            'parameters': {
+                'min_cluster_size': min_cluster_size,
+                'min_samples': min_samples
+            },
+            'n_clusters': n_clusters,
+            'n_noise_points': n_noise,
+            'noise_percentage': float(n_noise / len(labels) * 100),
+            'labels': labels,
+            'cluster_sizes': cluster_sizes,
+            'metrics': metrics,
+            'interpretation': 'HDBSCAN détecte des clusters de densités variables et marque les points isolés comme bruit'
+        }
+    
+    def _dbscan_graph_clustering(self, X, config):
+        """DBSCAN sur graphe de voisinage creux précalculé (KD-tree / Ball-tree)"""
+        eps = config.get('eps', 0.5)
+        min_samples = config.get('min_samples', 5)
+        algorithm = config.get('neighbors_algorithm', 'auto')
+        
+        # Graphe creux des distances < eps: mémoire proportionnelle au nombre de voisins
+        neighbors = NearestNeighbors(radius=eps, algorithm=algorithm).fit(X)
+        graph = neighbors.radius_neighbors_graph(X, mode='distance', sort_results=True)
+        
+        model = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed')
+        labels = model.fit_predict(graph)
+        
+        n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
+        n_noise = int(np.sum(labels == -1))
+        
+        unique, counts = np.unique(labels, return_counts=True)
+        cluster_sizes = dict(zip(unique.tolist(), counts.tolist()))
+        
+        metrics = self._cluster_quality(X, labels, config, exclude_noise=True)
+        
+        return {
+            'method': 'DBSCAN (graphe creux)',
+            'parameters': {
+                'eps': eps,
+                'min_samples': min_samples,
+                'neighbors_algorithm': algorithm
+            },
+            'n_clusters': n_clusters,
+            'n_noise_points': n_noise,
+            'noise_percentage': float(n_noise / len(labels) * 100),
+            'graph_edges': int(graph.nnz),
+            'labels': labels,
+            'cluster_sizes': cluster_sizes,
+            'metrics': metrics,
+            'interpretation': 'DBSCAN identifie les clusters de densité et détecte les points aberrants comme bruit'
+        }
+    
+    def _cluster_quality(self, X, labels, config, exclude_noise=False):
+        """
+        Métriques de qualité du clustering.
+        
+        - n <= silhouette_sample_size: silhouette exact
+        - n > silhouette_sample_size: silhouette estimé sur un échantillon stratifié
+          par cluster, avec intervalle de confiance à 95 %
+        - n > silhouette_max_rows: silhouette non calculé, Davies-Bouldin et
+          Calinski-Harabasz (O(n·k)) seulement
+        """
+        if exclude_noise:
+            mask = labels != -1
+            X, labels = X[mask], labels[mask]
+        
+        metrics = {
+            'silhouette_score': None,
+            'silhouette_ci': None,
+            'silhouette_sample_size': None,
+            'davies_bouldin_index': None,
+            'calinski_harabasz_score': None
+        }
+        if len(np.unique(labels)) < 2 or len(np.unique(labels)) >= len(labels):
+            return metrics
+        
+        metrics['davies_bouldin_index'] = float(davies_bouldin_score(X, labels))
+        metrics['calinski_harabasz_score'] = float(calinski_harabasz_score(X, labels))
+        
+        sample_size = config.get('silhouette_sample_size', SILHOUETTE_SAMPLE_SIZE)
+        if len(X) > config.get('silhouette_max_rows', SILHOUETTE_MAX_ROWS):
+            return metrics
+        
+        if len(X) <= sample_size:
+            metrics['silhouette_score'] = float(silhouette_score(X, labels))
+            return metrics
+        
+        estimate = self._stratified_silhouette(X, labels, sample_size)
+        metrics['silhouette_score'] = estimate['score']
+        metrics['silhouette_ci'] = estimate['ci']
+        metrics['silhouette_sample_size'] = estimate['sample_size']
+        return metrics
+    
+    def _stratified_silhouette(self, X, labels, sample_size, random_state=42):
+        """Silhouette estimé sur un échantillon stratifié par cluster (estimateur stratifié + IC 95 %)"""
+        rng = np.random.default_rng(random_state)
+        clusters, codes, counts = np.unique(labels, return_inverse=True, return_counts=True)
+        n = len(labels)
+        
+        # Allocation proportionnelle, au moins 2 points par cluster
+        allocation = np.minimum(counts, np.maximum(2, np.round(counts * sample_size / n).astype(int)))
+        order = np.lexsort((rng.random(n), codes))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sample_idx = np.concatenate([order[start:start + size] for start, size in zip(starts, allocation)])
+        
+        values = silhouette_samples(X[sample_idx], labels[sample_idx])
+        sample_codes = codes[sample_idx]
+        
+        weights = counts / n
+        stratum_means = np.bincount(sample_codes, weights=values) / allocation
+        stratum_sq = np.bincount(sample_codes, weights=values ** 2) / allocation
+        stratum_vars = np.maximum(stratum_sq - stratum_means ** 2, 0) * allocation / np.maximum(allocation - 1, 1)
+        
+        score = float(np.sum(weights * stratum_means))
+        std_error = float(np.sqrt(np.sum(weights ** 2 * stratum_vars / allocation)))
+        
+        return {
+            'score': score,
+            'ci': [score - 1.96 * std_error, score + 1.96 * std_error],
+            'sample_size': int(len(sample_idx))
+        }
+    
+    def _uniform_sample(self, n, sample_size, random_state=42):
+        """Indices d'un échantillon aléatoire simple (tous les indices si n <= sample_size)"""
+        if n <= sample_size:
+            return np.arange(n)
+        rng = np.random.default_rng(random_state)
+        return np.sort(rng.choice(n, size=sample_size, replace=False))
+    
+    def _silhouette_from_distances(self, distances, labels, n_total):
+        """Silhouette à partir d'un bloc de distances précalculé (IC 95 % si échantillonné)"""
+        if len(np.unique(labels)) < 2 or len(np.unique(labels)) >= len(labels):
+            return {'score': None, 'ci': None}
+        values = silhouette_samples(distances, labels, metric='precomputed')
+        score = float(values.mean())
+        if len(labels) >= n_total:
+            return {'score': score, 'ci': None}
+        std_error = float(values.std(ddof=1) / np.sqrt(len(values)))
+        return {'score': score, 'ci': [score - 1.96 * std_error, score + 1.96 * std_error]}
+    
+    def _silhouette_label(self, silhouette):
+        """Interprétation qualitative du silhouette score"""
+        if silhouette is None:
+            return 'Non calculé'
+        return 'Excellent' if silhouette > 0.7 else 'Bon' if silhouette > 0.5 else 'Acceptable' if silhouette > 0.25 else 'Faible'
+    
+    def _pca_visualization(self, X, models, response_mode='full', plot_sample_size=PLOT_SAMPLE_SIZE):
+        """Réduction à 2D avec PCA pour visualisation (sous-échantillonnée en mode 'compact')"""
         pca = PCA(n_components=2)
         X_pca = pca.fit_transform(X)
         
+        # En mode compact, seul un échantillon de points est renvoyé pour le graphique
+        if response_mode == 'compact' and len(X_pca) > plot_sample_size:
+            sample_idx = self._uniform_sample(len(X_pca), plot_sample_size)
+        else:
+            sample_idx = None
+        
         visualization_data = {
-            'pca_coordinates': X_pca.tolist(),
+            'pca_coordinates': (X_pca if sample_idx is None else X_pca[sample_idx]).tolist(),
             'explained_variance_ratio': pca.explained_variance_ratio_.tolist(),
             'total_variance_explained': float(sum(pca.explained_variance_ratio_))
         }
+        if sample_idx is not None:
+            visualization_data['sample_indices'] = sample_idx.tolist()
+            visualization_data['n_points_total'] = int(len(X_pca))
         
         # Ajouter les labels de chaque modèle pour visualisation
         for model_name, model_result in models.items():
             if 'labels' in model_result:
-                visualization_data[f'{model_name}_labels'] = model_result['labels']
+                labels = np.asarray(model_result['labels'])
+                visualization_data[f'{model_name}_labels'] = (labels if sample_idx is None else labels[sample_idx]).tolist()
         
         return visualization_data
     
+    def _format_labels(self, labels, response_mode='full'):
+        """Labels par ligne au format de réponse demandé"""
+        labels = np.asarray(labels)
+        if response_mode == 'compact':
+            return encode_array(labels, smallest_int_dtype(labels))
+        return labels.tolist()
+    
     def _compare_clustering_models(self, models):
         """Compare les performances des différents modèles de clustering"""
         comparison = []
+        fallback = []
         
         for name, model_result in models.items():
-            if 'metrics' in model_result and model_result['metrics'].get('silhouette_score') is not None:
+            metrics = model_result.get('metrics') or {}
+            if metrics.get('silhouette_score') is not None:
                 comparison.append({
                     'model': model_result['method'],
-                    'silhouette_score': model_result['metrics']['silhouette_score'],
+                    'silhouette_score': metrics['silhouette_score'],
+                    'n_clusters': model_result.get('n_clusters', model_result.get('n_components'))
+                })
+            elif metrics.get('davies_bouldin_index') is not None:
+                fallback.append({
+                    'model': model_result['method'],
+                    'davies_bouldin_index': metrics['davies_bouldin_index'],
+                    'calinski_harabasz_score': metrics.get('calinski_harabasz_score'),
                     'n_clusters': model_result.get('n_clusters', model_result.get('n_components'))
                 })
         
@@ -288,6 +687,15 @@ class ClusteringAnalyzer:
                 'comparison': comparison,
                 'recommendation': f"Le modèle {comparison[0]['model']} a la meilleure qualité de clustering avec un Silhouette Score de {comparison[0]['silhouette_score']:.3f}"
             }
+        elif fallback:
+            # Grands volumes: silhouette non calculé, Davies-Bouldin (plus bas = meilleur)
+            fallback.sort(key=lambda x: x['davies_bouldin_index'])
+            
+            return {
+                'best_model': fallback[0]['model'],
+                'comparison': fallback,
+                'recommendation': f"Le modèle {fallback[0]['model']} a la meilleure qualité de clustering avec un indice de Davies-Bouldin de {fallback[0]['davies_bouldin_index']:.3f}"
+            }
         else:
             return {
                 'best_model': None,
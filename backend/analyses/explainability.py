@@ -5,8 +5,312 @@ Provides feature importance, local explanations, and clear interpretation messag
 
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from scipy import sparse
 from typing import Dict, List, Tuple, Any, Optional
 
+try:
+    import shap
+    SHAP_AVAILABLE = True
+except ImportError:
+    SHAP_AVAILABLE = False
+
+# Cells (rows x nodes x quadrature points x outputs) processed per TreeSHAP block
+TREE_SHAP_CHUNK_CELLS = 4000000
+# Shuffles every feature gets before it can be stopped early as unimportant
+PERMUTATION_MIN_REPEATS = 2
+
+
+class ShapExplainer:
+    """
+    Exact SHAP attributions for tree models and linear models.
+    
+    Built once per trained model. Trees (DecisionTree, RandomForest,
+    ExtraTrees, GradientBoosting) are flattened into one node table shared by
+    all trees, numbered level by level: split bounds, cover ratios and leaf
+    values per edge. Explaining rows then evaluates path-dependent TreeSHAP
+    in closed form, vectorised over rows and nodes; when the shap package is
+    installed its compiled TreeExplainer computes the same values. Linear
+    models (coef_) use linear SHAP against the background feature means.
+    """
+    
+    def __init__(self, model, background: Optional[np.ndarray] = None, use_shap_library: bool = True):
+        self.model = model
+        self.classes_ = getattr(model, 'classes_', None)
+        self._library_explainer = None
+        if ShapExplainer._is_linear(model):
+            self.method = 'linear_shap'
+            self._init_linear(background)
+        elif ShapExplainer._tree_members(model) is not None:
+            self.method = 'tree_shap'
+            self._init_tree()
+            if use_shap_library and SHAP_AVAILABLE:
+                self._library_explainer = shap.TreeExplainer(model, feature_perturbation='tree_path_dependent')
+        else:
+            raise ValueError(f'SHAP explanations not available for {type(model).__name__}')
+    
+    @staticmethod
+    def supports(model) -> bool:
+        """Whether an exact explainer exists for this model type."""
+        return ShapExplainer._is_linear(model) or ShapExplainer._tree_members(model) is not None
+    
+    @staticmethod
+    def _is_linear(model) -> bool:
+        return hasattr(model, 'coef_') and getattr(model, 'kernel', 'linear') == 'linear'
+    
+    @staticmethod
+    def _tree_members(model):
+        """(tree, weight, output column or None) for each tree, or None if unsupported."""
+        if hasattr(model, 'tree_'):
+            return [(model, 1.0, None)]
+        members = getattr(model, 'estimators_', None)
+        if members is None or len(members) == 0:
+            return None
+        if isinstance(members, np.ndarray) and members.ndim == 2:
+            # Gradient boosting: one regression tree per stage and output
+            if not hasattr(model, 'learning_rate'):
+                return None
+            return [(tree, model.learning_rate, k)
+                    for stage in members for k, tree in enumerate(stage)]
+        if not all(hasattr(tree, 'tree_') for tree in members) or hasattr(model, 'estimator_weights_'):
+            return None
+        return [(tree, 1.0 / len(members), None) for tree in members]
+    
+    def _init_linear(self, background):
+        coef = np.asarray(self.model.coef_, dtype=float)
+        self._coef = coef.reshape(1, -1) if coef.ndim == 1 else coef
+        self._mean = (np.asarray(background, dtype=float).mean(axis=0) if background is not None
+                      else np.zeros(self._coef.shape[1]))
+        intercept = np.atleast_1d(np.asarray(self.model.intercept_, dtype=float))
+        self.expected_value = self._coef @ self._mean + intercept
+        self.output_space = 'decision_function' if self.classes_ is not None else 'prediction'
+    
+    def _init_tree(self):
+        members = ShapExplainer._tree_members(self.model)
+        boosting = members[0][2] is not None
+        n_outputs = (max(k for _, _, k in members) + 1) if boosting else members[0][0].tree_.value.shape[2]
+        n_features = self.model.n_features_in_
+        
+        # All trees share one node numbering; leaf values are zero on internal nodes
+        lefts, rights, split_features, thresholds, covers, values = [], [], [], [], [], []
+        roots, expected, offset = [], np.zeros(n_outputs), 0
+        for tree, weight, output in members:
+            structure = tree.tree_
+            children_left, children_right = structure.children_left, structure.children_right
+            cover = structure.weighted_n_node_samples
+            is_leaf = children_left == -1
+            
+            node_values = structure.value[:, 0, :]
+            if self.classes_ is not None and not boosting:
+                # Classification trees: class probabilities per node
+                node_values = node_values / node_values.sum(axis=1, keepdims=True)
+            leaf_values = np.zeros((structure.node_count, n_outputs))
+            if output is None:
+                leaf_values[is_leaf] = weight * node_values[is_leaf]
+            else:
+                leaf_values[is_leaf, output] = weight * node_values[is_leaf, 0]
+            values.append(leaf_values)
+            # Cover-weighted leaf average: boosting line search only rewrites leaf values
+            expected += cover[is_leaf] @ leaf_values[is_leaf] / cover[0]
+            
+            lefts.append(np.where(is_leaf, -1, children_left + offset))
+            rights.append(np.where(is_leaf, -1, children_right + offset))
+            split_features.append(structure.feature)
+            thresholds.append(structure.threshold)
+            covers.append(cover)
+            roots.append(offset)
+            offset += structure.node_count
+        
+        if boosting:
+            # Constant initial raw prediction of the ensemble
+            probe = np.zeros((1, n_features))
+            raw = (self.model.decision_function(probe) if self.classes_ is not None
+                   else self.model.predict(probe))
+            raw = np.atleast_1d(np.asarray(raw, dtype=float).ravel())
+            trees_sum = np.zeros(n_outputs)
+            for tree, weight, output in members:
+                trees_sum[output] += weight * tree.predict(probe)[0]
+            expected += raw - trees_sum
+        
+        self.expected_value = expected
+        self.output_space = ('decision_function' if boosting and self.classes_ is not None
+                             else 'probability' if self.classes_ is not None else 'prediction')
+        self._n_features = n_features
+        self._n_outputs = n_outputs
+        # Probability outputs sum to a constant: the last class is minus the sum of the others
+        self._implied_last = self.output_space == 'probability' and n_outputs > 1
+        
+        left, right = np.concatenate(lefts), np.concatenate(rights)
+        split_feature, threshold, cover = (np.concatenate(split_features), np.concatenate(thresholds),
+                                           np.concatenate(covers))
+        node_values = np.vstack(values)
+        
+        # Breadth-first renumbering over all trees: the children of each level are
+        # stored as [left children..., right children...] so levels are slices
+        frontier = np.array(roots, dtype=np.int64)
+        order, levels = [frontier], []
+        while True:
+            parents = frontier[left[frontier] >= 0]
+            if not len(parents):
+                break
+            frontier = np.concatenate([left[parents], right[parents]])
+            order.append(frontier)
+            levels.append(len(parents))
+        order = np.concatenate(order)
+        n_nodes = len(order)
+        new_id = np.empty(n_nodes, dtype=np.int64)
+        new_id[order] = np.arange(n_nodes)
+        
+        # Per node, the edge from its parent merged with earlier splits on the same
+        # feature: cover ratio product, intersected bounds, previous same-feature
+        # edge on the path (n_nodes = neutral sentinel: q = 1, r = 0)
+        self._edge_feature = np.zeros(n_nodes + 1, dtype=np.int64)
+        self._zero_fraction = np.ones(n_nodes + 1)
+        self._lower = np.full(n_nodes + 1, -np.inf)
+        self._upper = np.full(n_nodes + 1, np.inf)
+        self._previous = np.full(n_nodes, n_nodes, dtype=np.int64)
+        
+        # Level by level: last edge per feature on the path of each node of the level
+        n_roots = len(roots)
+        last = np.full((n_roots, n_features), -1, dtype=np.int64)
+        level_start, unique_on_path = 0, 0
+        self._levels = []
+        for n_parents in levels:
+            level_nodes = np.arange(level_start, level_start + len(last))
+            internal = left[order[level_nodes]] >= 0
+            parents = level_nodes[internal]
+            start = level_start + len(last)
+            children = np.arange(start, start + 2 * n_parents)
+            parents2 = np.concatenate([parents, parents])
+            child_last = np.concatenate([last[internal], last[internal]])
+            features = split_feature[order[parents2]]
+            previous = child_last[np.arange(len(children)), features]
+            previous = np.where(previous >= 0, previous, n_nodes)
+            cut = threshold[order[parents2]]
+            goes_left = np.arange(len(children)) < n_parents
+            
+            self._edge_feature[children] = features
+            self._previous[children] = previous
+            self._zero_fraction[children] = (cover[order[children]] / cover[order[parents2]]
+                                             * self._zero_fraction[previous])
+            self._lower[children] = np.where(goes_left, self._lower[previous],
+                                             np.maximum(self._lower[previous], cut))
+            self._upper[children] = np.where(goes_left, np.minimum(self._upper[previous], cut),
+                                             self._upper[previous])
+            
+            child_last[np.arange(len(children)), features] = children
+            unique_on_path = max(unique_on_path, int((child_last >= 0).sum(axis=1).max()))
+            self._levels.append((parents, start, n_parents))
+            level_start, last = start, child_last
+        
+        self._n_nodes = n_nodes
+        self._n_roots = n_roots
+        self._values = node_values[order][:, :n_outputs - 1] if self._implied_last else node_values[order]
+        # phi_f = sum over the edges splitting on f: static edge -> feature scatter
+        self._feature_scatter = sparse.csr_matrix(
+            (np.ones(n_nodes - n_roots), (self._edge_feature[n_roots:n_nodes], np.arange(n_roots, n_nodes))),
+            shape=(n_features, n_nodes)
+        )
+        # Gauss-Legendre on [0, 1], exact for the path polynomials (degree < unique features on a path)
+        nodes, weights = np.polynomial.legendre.leggauss(max(1, (unique_on_path + 1) // 2))
+        self._quad_t, self._quad_w = (nodes + 1) / 2, weights / 2
+    
+    def shap_values(self, X: np.ndarray) -> np.ndarray:
+        """
+        SHAP values of each row in the model's output space.
+        
+        Path-dependent TreeSHAP in closed form: a leaf's weight for feature i is
+        the integral over [0, 1] of prod_{j != i} (z_j + t (o_j - z_j)) along its
+        path, evaluated exactly by Gauss-Legendre quadrature. Path products are
+        built top-down and leaf sums bottom-up once per tree level, so a row costs
+        O(nodes x quadrature points) instead of O(leaves x depth^2).
+        
+        Args:
+            X: Rows in the model's input space (encoded, scaled if the model was)
+            
+        Returns:
+            Array (n_rows, n_features, n_outputs); rows sum to prediction - expected_value
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if self.method == 'linear_shap':
+            return (X - self._mean)[:, :, np.newaxis] * self._coef.T[np.newaxis, :, :]
+        
+        if self._library_explainer is not None:
+            return self._library_shap_values(X)
+        
+        n_outputs = self._values.shape[1]
+        phi = np.zeros((len(X), self._n_features, n_outputs))
+        if self._levels:
+            # Trees compare float32 inputs against their thresholds
+            X = X.astype(np.float32).astype(float)
+            cells = (self._n_nodes + 1) * len(self._quad_t) * max(n_outputs, 1)
+            chunk = max(1, TREE_SHAP_CHUNK_CELLS // cells)
+            for start in range(0, len(X), chunk):
+                phi[start:start + chunk] = self._tree_shap_chunk(X[start:start + chunk])
+        
+        if self._implied_last:
+            phi = np.concatenate([phi, -phi.sum(axis=2, keepdims=True)], axis=2)
+        return phi
+    
+    def _library_shap_values(self, X: np.ndarray) -> np.ndarray:
+        # Older shap versions return one array per output, newer ones a single array
+        values = self._library_explainer.shap_values(X, check_additivity=False)
+        if isinstance(values, list):
+            values = np.stack(values, axis=2)
+        values = np.asarray(values, dtype=float)
+        return values[:, :, np.newaxis] if values.ndim == 2 else values
+    
+    def _tree_shap_chunk(self, X: np.ndarray) -> np.ndarray:
+        t, previous = self._quad_t, self._previous
+        values = X.T[self._edge_feature]
+        hot = (values > self._lower[:, np.newaxis]) & (values <= self._upper[:, np.newaxis])
+        hot[:self._n_roots] = hot[-1] = True
+        hot_previous = hot[previous][:, :, np.newaxis]
+        hot = hot[:-1, :, np.newaxis]
+        
+        # o is 0/1, so q = z + t (o - z) and r = (o - z) / q take one of two values per node
+        z = self._zero_fraction[:, np.newaxis]
+        q_cold, q_hot = (1 - t) * z, z + t * (1 - z)
+        q_cold[-1] = 1.0
+        r_cold = np.broadcast_to(-1 / (1 - t), q_cold.shape).copy()
+        r_cold[-1] = 0.0
+        r_hot = (1 - z) / q_hot
+        
+        # Path products top-down: a repeated feature replaces its earlier factor
+        path = np.where(hot, q_hot[:-1, np.newaxis], q_cold[:-1, np.newaxis])
+        path /= np.where(hot_previous, q_hot[previous][:, np.newaxis], q_cold[previous][:, np.newaxis])
+        for parents, start, n_parents in self._levels:
+            above = path[parents]
+            path[start:start + n_parents] *= above
+            path[start + n_parents:start + 2 * n_parents] *= above
+        
+        # Leaf-value-weighted sums of path products bottom-up (internal nodes hold no value)
+        totals = path[..., np.newaxis] * self._values[:, np.newaxis, np.newaxis, :]
+        for parents, start, n_parents in reversed(self._levels):
+            totals[parents] = totals[start:start + n_parents] + totals[start + n_parents:start + 2 * n_parents]
+        
+        # r telescopes along the path: each edge adds (r_e - r_previous) times its subtree sum
+        delta = np.where(hot, r_hot[:-1, np.newaxis], r_cold[:-1, np.newaxis])
+        delta -= np.where(hot_previous, r_hot[previous][:, np.newaxis], r_cold[previous][:, np.newaxis])
+        delta *= self._quad_w
+        contributions = np.matmul(delta[:, :, np.newaxis, :], totals)[:, :, 0, :]
+        n_rows, n_outputs = len(X), self._values.shape[1]
+        phi = self._feature_scatter @ contributions.reshape(self._n_nodes, n_rows * n_outputs)
+        return phi.reshape(self._n_features, n_rows, n_outputs).transpose(1, 0, 2)
+    
+    def output_for_class(self, class_index: int) -> Tuple[int, float]:
+        """Output column and sign holding the attributions of a class."""
+        if len(np.atleast_1d(self.expected_value)) == 1 and self.classes_ is not None and len(self.classes_) == 2:
+            # Binary models with a single decision function: class 0 is its opposite
+            return 0, (1.0 if class_index == 1 else -1.0)
+        return class_index, 1.0
+    
+    def explain(self, X: np.ndarray, class_index: int = 0) -> Tuple[np.ndarray, float]:
+        """(n_rows, n_features) attributions and expected value for one class."""
+        column, sign = self.output_for_class(class_index)
+        phi = self.shap_values(X)[:, :, column] * sign
+        return phi, float(sign * np.atleast_1d(self.expected_value)[column])
+
 
 class ExplainabilityAnalyzer:
     """Provides explainability for ML models."""
@@ -28,9 +332,11 @@ class ExplainabilityAnalyzer:
             # Tree-based models (Random Forest, XGBoost, LightGBM, etc.)
             if hasattr(model, 'feature_importances_'):
                 importances = model.feature_importances_
+                method = 'impurity'
                 
             # Linear models (Logistic Regression, Linear Regression, etc.)
             elif hasattr(model, 'coef_'):
+                method = 'coefficients'
                 coef = model.coef_
                 if len(coef.shape) > 1:  # Multi-class
                     importances = np.abs(coef).mean(axis=0)
@@ -63,6 +369,7 @@ class ExplainabilityAnalyzer:
             
             return {
                 'available': True,
+                'method': method,
                 'top_features': top_10_with_pct,
                 'total_features': len(feature_names),
                 'top_10_cumulative': sum([f['percentage'] for f in top_10_with_pct])
@@ -74,53 +381,158 @@ class ExplainabilityAnalyzer:
                 'message': f'Error extracting feature importance: {str(e)}'
             }
     
+    @staticmethod
+    def permutation_importance(model, X, y, feature_names: List[str], task: str = 'classification',
+                               n_repeats: int = 5, n_jobs: int = 1, random_state: int = 42,
+                               tolerance: float = 0.005) -> Dict[str, Any]:
+        """
+        Model-agnostic feature importance: score drop when a column is shuffled.
+        
+        Works for any model with predict (KNN, SVC, GaussianNB, MLP, ...).
+        Shuffles run in rounds: each round shuffles every still-active column
+        once, one predict call per column, spread over a thread pool. After
+        PERMUTATION_MIN_REPEATS rounds, columns whose drops all stayed within
+        the tolerance are stopped early. Each column draws from its own seeded
+        generator, so results do not depend on n_jobs.
+        
+        Args:
+            model: Trained model with predict
+            X: Holdout rows as seen by the model
+            y: Holdout labels / targets
+            feature_names: List of feature names (one per column of X)
+            task: 'classification' (accuracy) or 'regression' (R²)
+            n_repeats: Maximum shuffles per feature
+            n_jobs: Worker threads
+            random_state: Seed of the shuffles
+            tolerance: Drop below which a feature counts as unimportant
+            
+        Returns:
+            Dictionary with top 10 features, same layout as get_feature_importance
+        """
+        try:
+            columns = getattr(X, 'columns', None)
+            X = np.asarray(X, dtype=float)
+            y = np.asarray(y)
+            n_features = X.shape[1]
+            baseline = ExplainabilityAnalyzer._permutation_score(model, X, y, columns, task)
+            
+            rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(random_state).spawn(n_features)]
+            drops = np.full((n_features, max(1, n_repeats)), np.nan)
+            active = np.arange(n_features)
+            for repeat in range(drops.shape[1]):
+                tasks = [delayed(ExplainabilityAnalyzer._shuffled_score)(model, X, y, j, rngs[j], columns, task)
+                         for j in active]
+                if n_jobs != 1 and len(tasks) > 1:
+                    scores = Parallel(n_jobs=n_jobs, prefer='threads')(tasks)
+                else:
+                    scores = [fn(*args, **kwargs) for fn, args, kwargs in tasks]
+                drops[active, repeat] = baseline - np.asarray(scores)
+                
+                if repeat + 1 >= PERMUTATION_MIN_REPEATS:
+                    spread = np.abs(drops[active, :repeat + 1]).max(axis=1)
+                    active = active[spread > tolerance]
+                if len(active) == 0:
+                    break
+            
+            repeats_used = np.sum(~np.isnan(drops), axis=1)
+            importances = np.nanmean(drops, axis=1)
+            stds = np.nanstd(drops, axis=1)
+            order = np.argsort(-importances, kind='stable')
+            total_importance = np.clip(importances, 0, None).sum()
+            top_10 = [
+                {
+                    'feature': feature_names[j],
+                    'importance': float(importances[j]),
+                    'std': float(stds[j]),
+                    'n_repeats': int(repeats_used[j]),
+                    'percentage': float(max(importances[j], 0) / total_importance * 100) if total_importance > 0 else 0
+                }
+                for j in order[:10]
+            ]
+            
+            return {
+                'available': True,
+                'method': 'permutation',
+                'metric': 'r2' if task == 'regression' else 'accuracy',
+                'baseline_score': float(baseline),
+                'n_rows': int(len(X)),
+                'top_features': top_10,
+                'total_features': n_features,
+                'top_10_cumulative': sum([f['percentage'] for f in top_10]),
+                'stopped_early': [feature_names[j] for j in range(n_features) if repeats_used[j] < drops.shape[1]]
+            }
+            
+        except Exception as e:
+            return {
+                'available': False,
+                'message': f'Error computing permutation importance: {str(e)}'
+            }
+    
+    @staticmethod
+    def _permutation_score(model, X: np.ndarray, y: np.ndarray, columns, task: str) -> float:
+        """Accuracy (classification) or R² (regression) of the model on X."""
+        pred = model.predict(pd.DataFrame(X, columns=columns) if columns is not None else X)
+        if task == 'regression':
+            total = np.sum((y - y.mean()) ** 2)
+            return 1.0 - np.sum((y - pred) ** 2) / total if total > 0 else 0.0
+        return float(np.mean(pred == y))
+    
+    @staticmethod
+    def _shuffled_score(model, X: np.ndarray, y: np.ndarray, column: int, rng: np.random.Generator,
+                        columns, task: str) -> float:
+        """Score with one column shuffled (one predict call)."""
+        shuffled = X.copy()
+        shuffled[:, column] = rng.permutation(X[:, column])
+        return ExplainabilityAnalyzer._permutation_score(model, shuffled, y, columns, task)
+    
     @staticmethod
     def explain_prediction_local(model, X_sample: np.ndarray, feature_names: List[str], 
-                                base_value: float = 0.5) -> Dict[str, Any]:
+                                base_value: float = 0.5,
+                                explainer: Optional[ShapExplainer] = None,
+                                class_index: Optional[int] = None,
+                                top_k: int = 5) -> Dict[str, Any]:
         """
         Provide local explanation for a single prediction.
-        Uses a simplified SHAP-like approach based on feature values and model coefficients.
+        Uses exact SHAP values: TreeSHAP for tree models, linear SHAP for coef_ models.
         
         Args:
             model: Trained model
-            X_sample: Single sample to explain (1D array)
+            X_sample: Single sample to explain (1D array), as seen by the model
+                (encoded, and scaled if the model was trained on scaled data)
             feature_names: List of feature names
-            base_value: Base probability/value (default 0.5 for classification)
+            base_value: Fallback base value (replaced by the explainer's expected value)
+            explainer: Prebuilt ShapExplainer for this model (built on the fly otherwise)
+            class_index: Class to explain (predicted class by default)
+            top_k: Number of contributions returned
             
         Returns:
             Dictionary with feature contributions
         """
         try:
-            # For linear models, use coefficients directly
-            if hasattr(model, 'coef_'):
-                coef = model.coef_
-                if len(coef.shape) > 1:
-                    coef = coef[0]  # Use first class for binary
-                
-                # Calculate contributions
-                contributions = X_sample * coef
-                
-            # For tree models, approximate with feature importance
-            elif hasattr(model, 'feature_importances_'):
-                importances = model.feature_importances_
-                # Approximate contribution by multiplying feature value with importance
-                contributions = X_sample * importances
-                
-            else:
-                return {
-                    'available': False,
-                    'message': 'Local explanations not available for this model type'
-                }
+            if explainer is None:
+                if not ShapExplainer.supports(model):
+                    return {
+                        'available': False,
+                        'message': 'Local explanations not available for this model type'
+                    }
+                explainer = ShapExplainer(model)
             
-            # Create sorted contribution list
-            contrib_dict = dict(zip(feature_names, contributions))
-            sorted_contrib = sorted(contrib_dict.items(), key=lambda x: abs(x[1]), reverse=True)
+            X_row = np.asarray(X_sample, dtype=float).reshape(1, -1)
+            if class_index is None:
+                class_index = 0
+                if explainer.classes_ is not None:
+                    predicted = model.predict(X_row)[0]
+                    class_index = int(np.flatnonzero(np.asarray(explainer.classes_) == predicted)[0])
+            
+            contributions, base_value = explainer.explain(X_row, class_index)
+            contributions = contributions[0]
             
             # Get top contributors (both positive and negative)
-            top_contributors = sorted_contrib[:5]
+            order = np.argsort(-np.abs(contributions), kind='stable')[:top_k]
             
             explanations = []
-            for feat, contrib in top_contributors:
+            for idx in order:
+                feat, contrib = feature_names[idx], contributions[idx]
                 direction = "↑" if contrib > 0 else "↓"
                 effect = "increases" if contrib > 0 else "decreases"
                 explanations.append({
@@ -132,6 +544,8 @@ class ExplainabilityAnalyzer:
             
             return {
                 'available': True,
+                'method': explainer.method,
+                'output_space': explainer.output_space,
                 'base_value': base_value,
                 'contributions': explanations,
                 'total_effect': float(np.sum(contributions))
@@ -143,6 +557,139 @@ class ExplainabilityAnalyzer:
                 'message': f'Error generating local explanation: {str(e)}'
             }
     
+    @staticmethod
+    def explain_batch(explainer: ShapExplainer, X: np.ndarray, feature_names: List[str],
+                      class_names: Optional[List[str]] = None, chunk_size: int = 500,
+                      n_jobs: int = 1, top_k: int = 0, top_features: int = 10) -> Dict[str, Any]:
+        """
+        Population-level attribution summary over many rows.
+        
+        Rows are explained for their predicted class in chunks; with
+        n_jobs > 1 chunks are spread over a process pool. Per-chunk
+        aggregates (sums of |contribution| and contribution, per feature and
+        per predicted class) are folded in as chunks complete, so memory stays
+        bounded by the chunk size rather than the number of rows.
+        
+        Args:
+            explainer: ShapExplainer of the model
+            X: Rows as seen by the model (encoded, scaled if needed)
+            feature_names: List of feature names
+            class_names: Display names of the model classes
+            chunk_size: Rows explained per chunk
+            n_jobs: Worker processes
+            top_k: Per-row top contributions to return (0 = none)
+            top_features: Features listed per predicted class
+            
+        Returns:
+            Global and per-class summaries, plus per-row top contributions
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        n_features = X.shape[1]
+        n_classes = len(explainer.classes_) if explainer.classes_ is not None else 1
+        starts = range(0, len(X), max(1, chunk_size))
+        tasks = (delayed(ExplainabilityAnalyzer._explain_chunk)(explainer, X[start:start + chunk_size], top_k)
+                 for start in starts)
+        if n_jobs != 1 and len(X) > chunk_size:
+            chunks = Parallel(n_jobs=n_jobs, return_as='generator')(tasks)
+        else:
+            chunks = (fn(*args, **kwargs) for fn, args, kwargs in tasks)
+        
+        abs_sum = np.zeros(n_features)
+        signed_sum = np.zeros(n_features)
+        class_abs_sum = np.zeros((n_classes, n_features))
+        class_counts = np.zeros(n_classes, dtype=np.int64)
+        rows = []
+        offset = 0
+        for chunk in chunks:
+            abs_sum += chunk['abs_sum']
+            signed_sum += chunk['signed_sum']
+            class_abs_sum += chunk['class_abs_sum']
+            class_counts += chunk['class_counts']
+            if top_k > 0:
+                for i, (predicted, indices, values) in enumerate(zip(chunk['predicted'], chunk['top_indices'],
+                                                                      chunk['top_values'])):
+                    rows.append({
+                        'row': offset + i,
+                        'predicted_class': class_names[predicted] if class_names is not None else int(predicted),
+                        'top_contributions': [
+                            {'feature': feature_names[j], 'contribution': float(v)}
+                            for j, v in zip(indices, values)
+                        ]
+                    })
+            offset += len(chunk['predicted'])
+        
+        n_rows = max(offset, 1)
+        order = np.argsort(-abs_sum, kind='stable')
+        per_class = {}
+        for k in np.flatnonzero(class_counts):
+            means = class_abs_sum[k] / class_counts[k]
+            per_class[class_names[k] if class_names is not None else str(k)] = {
+                'count': int(class_counts[k]),
+                'top_features': [
+                    {'feature': feature_names[j], 'mean_abs_contribution': float(means[j])}
+                    for j in np.argsort(-means, kind='stable')[:top_features]
+                ]
+            }
+        
+        result = {
+            'n_rows': int(offset),
+            'method': explainer.method,
+            'output_space': explainer.output_space,
+            'global_importance': [
+                {
+                    'feature': feature_names[j],
+                    'mean_abs_contribution': float(abs_sum[j] / n_rows),
+                    'mean_contribution': float(signed_sum[j] / n_rows)
+                }
+                for j in order
+            ],
+            'per_class': per_class
+        }
+        if top_k > 0:
+            result['rows'] = rows
+        return result
+    
+    @staticmethod
+    def _explain_chunk(explainer: ShapExplainer, X: np.ndarray, top_k: int = 0) -> Dict[str, Any]:
+        """Attributions of one chunk for each row's predicted class, reduced to aggregates."""
+        phi = explainer.shap_values(X)
+        n_classes = len(explainer.classes_) if explainer.classes_ is not None else 1
+        if explainer.classes_ is not None:
+            scores = (explainer.model.predict_proba(X) if hasattr(explainer.model, 'predict_proba')
+                      else explainer.model.decision_function(X))
+            scores = np.asarray(scores).reshape(len(X), -1)
+            predicted = np.argmax(scores, axis=1) if scores.shape[1] > 1 else (scores[:, 0] > 0).astype(int)
+        else:
+            predicted = np.zeros(len(X), dtype=np.int64)
+        
+        # Column/sign of each row's predicted class (single-output binary models: class 0 = -output)
+        if phi.shape[2] == 1:
+            contributions = phi[:, :, 0]
+            if n_classes == 2:
+                contributions = contributions * np.where(predicted == 1, 1.0, -1.0)[:, np.newaxis]
+        else:
+            contributions = phi[np.arange(len(X)), :, predicted]
+        
+        magnitude = np.abs(contributions)
+        class_abs_sum = np.zeros((n_classes, X.shape[1]))
+        np.add.at(class_abs_sum, predicted, magnitude)
+        chunk = {
+            'abs_sum': magnitude.sum(axis=0),
+            'signed_sum': contributions.sum(axis=0),
+            'class_abs_sum': class_abs_sum,
+            'class_counts': np.bincount(predicted, minlength=n_classes),
+            'predicted': predicted
+        }
+        if top_k > 0:
+            k = min(top_k, X.shape[1])
+            top = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+            rank = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1, kind='stable')
+            chunk['top_indices'] = np.take_along_axis(top, rank, axis=1)
+            chunk['top_values'] = np.take_along_axis(contributions, chunk['top_indices'], axis=1)
+        else:
+            chunk['top_indices'] = chunk['top_values'] = [None] * len(X)
+        return chunk
+    
     @staticmethod
     def generate_interpretation_messages(prediction_class: Any, probability: float, 
                                         contributions: List[Dict]) -> List[str]:
@@ -315,78 +862,222 @@ class ModelAuditor:
         }
 
 
+class ProbabilityCalibrator:
+    """
+    One-vs-rest recalibration of predicted probabilities.
+    
+    Fitted on out-of-fold (cross-validated) probabilities: one isotonic
+    regression or Platt sigmoid per class column (only the positive column
+    for binary problems), then rows are renormalised to sum to one.
+    """
+    
+    METHODS = ('isotonic', 'sigmoid')
+    # Platt scaling is the sigmoid calibration
+    ALIASES = {'platt': 'sigmoid'}
+    
+    def __init__(self, method: str = 'isotonic'):
+        self.method = ProbabilityCalibrator.resolve_method(method)
+        self.calibrators_ = None
+    
+    @staticmethod
+    def resolve_method(method: str) -> str:
+        """Canonical calibration method name; ValueError if unknown."""
+        resolved = ProbabilityCalibrator.ALIASES.get(str(method).lower(), str(method).lower())
+        if resolved not in ProbabilityCalibrator.METHODS:
+            accepted = ProbabilityCalibrator.METHODS + tuple(ProbabilityCalibrator.ALIASES)
+            raise ValueError(f"Unknown calibration method: {method} (expected one of {', '.join(accepted)})")
+        return resolved
+    
+    def fit(self, proba: np.ndarray, y: np.ndarray, classes: Optional[np.ndarray] = None):
+        from sklearn.isotonic import IsotonicRegression
+        from sklearn.linear_model import LogisticRegression
+        
+        proba = np.atleast_2d(np.asarray(proba, dtype=float))
+        targets = CalibrationAnalyzer._one_hot(y, proba.shape[1], classes)
+        columns = [1] if proba.shape[1] == 2 else range(proba.shape[1])
+        self.calibrators_ = {}
+        for k in columns:
+            if self.method == 'isotonic':
+                calibrator = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+                calibrator.fit(proba[:, k], targets[:, k])
+            else:
+                calibrator = LogisticRegression(C=1e6)
+                calibrator.fit(self._logit(proba[:, k]), targets[:, k].astype(int))
+            self.calibrators_[k] = calibrator
+        return self
+    
+    def transform(self, proba: np.ndarray) -> np.ndarray:
+        proba = np.atleast_2d(np.asarray(proba, dtype=float))
+        calibrated = proba.copy()
+        for k, calibrator in self.calibrators_.items():
+            if self.method == 'isotonic':
+                calibrated[:, k] = calibrator.predict(proba[:, k])
+            else:
+                calibrated[:, k] = calibrator.predict_proba(self._logit(proba[:, k]))[:, 1]
+        if proba.shape[1] == 2:
+            calibrated[:, 0] = 1.0 - calibrated[:, 1]
+            return calibrated
+        totals = calibrated.sum(axis=1, keepdims=True)
+        return np.where(totals > 0, calibrated / np.where(totals > 0, totals, 1.0), 1.0 / proba.shape[1])
+    
+    @staticmethod
+    def _logit(p: np.ndarray) -> np.ndarray:
+        p = np.clip(p, 1e-6, 1 - 1e-6)
+        return np.log(p / (1 - p)).reshape(-1, 1)
+
+
 class CalibrationAnalyzer:
     """Analyze and improve probability calibration."""
     
     @staticmethod
     def analyze_calibration(y_true: np.ndarray, y_proba: np.ndarray, 
-                           n_bins: int = 10) -> Dict[str, Any]:
+                           n_bins: int = 10, classes: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """
         Analyze probability calibration.
         
+        Binary problems take the positive-class probabilities (1-D) or the
+        two-column matrix. Multiclass problems take the full (n, K) matrix:
+        reliability curves are computed one-vs-rest for every class at once,
+        with per-bin sums and counts from a single np.bincount per quantity.
+        
         Args:
-            y_true: True labels (binary)
-            y_proba: Predicted probabilities
+            y_true: True labels (binary 0/1, or one of classes)
+            y_proba: Predicted probabilities, (n,) or (n, K)
             n_bins: Number of bins for calibration curve
+            classes: Labels of the probability columns (default 0..K-1)
             
         Returns:
             Calibration analysis including Brier score and curve data
         """
         try:
-            # Brier score (lower is better)
-            brier_score = np.mean((y_proba - y_true) ** 2)
-            
-            # Calibration curve
-            bins = np.linspace(0, 1, n_bins + 1)
-            bin_indices = np.digitize(y_proba, bins[:-1]) - 1
-            bin_indices = np.clip(bin_indices, 0, n_bins - 1)
-            
-            calibration_data = []
-            for i in range(n_bins):
-                mask = bin_indices == i
-                if np.sum(mask) > 0:
-                    mean_predicted = np.mean(y_proba[mask])
-                    mean_actual = np.mean(y_true[mask])
-                    count = np.sum(mask)
-                    
-                    calibration_data.append({
-                        'bin': i,
-                        'predicted_probability': float(mean_predicted),
-                        'actual_probability': float(mean_actual),
-                        'count': int(count),
-                        'calibration_error': float(abs(mean_predicted - mean_actual))
-                    })
-            
-            # Expected Calibration Error (ECE)
-            ece = np.mean([bin_data['calibration_error'] for bin_data in calibration_data])
-            
-            # Interpretation
-            interpretation = []
-            if brier_score < 0.1:
-                interpretation.append("Excellent calibration - probabilities are well-calibrated")
-            elif brier_score < 0.2:
-                interpretation.append("Good calibration - probabilities are reasonably reliable")
-            else:
-                interpretation.append("Poor calibration - consider calibrating the model")
-            
-            if ece > 0.1:
-                interpretation.append(
-                    f"High calibration error (ECE={ece:.3f}) - predicted probabilities may be overconfident"
-                )
-            
-            return {
-                'brier_score': float(brier_score),
-                'expected_calibration_error': float(ece),
-                'calibration_curve': calibration_data,
-                'interpretation': interpretation,
-                'is_well_calibrated': brier_score < 0.15 and ece < 0.1
-            }
+            y_proba = np.asarray(y_proba, dtype=float)
+            if y_proba.ndim == 2 and y_proba.shape[1] == 2:
+                y_true = CalibrationAnalyzer._one_hot(y_true, 2, classes)[:, 1]
+                y_proba = y_proba[:, 1]
+            if y_proba.ndim == 1:
+                return CalibrationAnalyzer._binary_calibration(np.asarray(y_true, dtype=float), y_proba, n_bins)
+            return CalibrationAnalyzer._multiclass_calibration(y_true, y_proba, n_bins, classes)
             
         except Exception as e:
             return {
                 'error': f'Error analyzing calibration: {str(e)}'
             }
     
+    @staticmethod
+    def _one_hot(y: np.ndarray, n_classes: int, classes: Optional[np.ndarray] = None) -> np.ndarray:
+        """(n, K) indicator matrix of the labels against the probability columns."""
+        classes = np.arange(n_classes) if classes is None else np.asarray(classes)
+        return (np.asarray(y).reshape(-1, 1) == classes.reshape(1, -1)).astype(float)
+    
+    @staticmethod
+    def _reliability(y_onehot: np.ndarray, y_proba: np.ndarray, n_bins: int):
+        """Per (column, bin) predicted sums, actual sums and counts, shaped (K, n_bins)."""
+        n_columns = y_proba.shape[1]
+        bin_indices = np.clip((y_proba * n_bins).astype(int), 0, n_bins - 1)
+        flat = (bin_indices + np.arange(n_columns) * n_bins).ravel()
+        size = n_columns * n_bins
+        predicted = np.bincount(flat, weights=y_proba.ravel(), minlength=size).reshape(n_columns, n_bins)
+        actual = np.bincount(flat, weights=y_onehot.ravel(), minlength=size).reshape(n_columns, n_bins)
+        counts = np.bincount(flat, minlength=size).reshape(n_columns, n_bins)
+        return predicted, actual, counts
+    
+    @staticmethod
+    def _curve(predicted: np.ndarray, actual: np.ndarray, counts: np.ndarray) -> List[Dict[str, Any]]:
+        """Non-empty bins of one reliability curve."""
+        occupied = np.flatnonzero(counts)
+        mean_predicted = predicted[occupied] / counts[occupied]
+        mean_actual = actual[occupied] / counts[occupied]
+        return [
+            {
+                'bin': int(i),
+                'predicted_probability': float(p),
+                'actual_probability': float(a),
+                'count': int(counts[i]),
+                'calibration_error': float(abs(p - a))
+            }
+            for i, p, a in zip(occupied, mean_predicted, mean_actual)
+        ]
+    
+    @staticmethod
+    def _binary_calibration(y_true: np.ndarray, y_proba: np.ndarray, n_bins: int) -> Dict[str, Any]:
+        # Brier score (lower is better)
+        brier_score = np.mean((y_proba - y_true) ** 2)
+        
+        # Calibration curve
+        predicted, actual, counts = CalibrationAnalyzer._reliability(
+            y_true.reshape(-1, 1), y_proba.reshape(-1, 1), n_bins
+        )
+        calibration_data = CalibrationAnalyzer._curve(predicted[0], actual[0], counts[0])
+        
+        # Expected Calibration Error (ECE), bins weighted by their counts as in the multiclass case
+        ece = np.abs(predicted[0] - actual[0]).sum() / len(y_proba)
+        
+        return {
+            'brier_score': float(brier_score),
+            'expected_calibration_error': float(ece),
+            'calibration_curve': calibration_data,
+            'interpretation': CalibrationAnalyzer._interpret(brier_score, ece),
+            'is_well_calibrated': brier_score < 0.15 and ece < 0.1
+        }
+    
+    @staticmethod
+    def _multiclass_calibration(y_true: np.ndarray, y_proba: np.ndarray, n_bins: int,
+                                classes: Optional[np.ndarray]) -> Dict[str, Any]:
+        n_rows, n_classes = y_proba.shape
+        y_onehot = CalibrationAnalyzer._one_hot(y_true, n_classes, classes)
+        class_labels = np.arange(n_classes) if classes is None else np.asarray(classes)
+        
+        # Brier multiclasse (somme sur les classes, dans [0, 2]) et version ramenée à [0, 1]
+        brier_score = np.mean(np.sum((y_proba - y_onehot) ** 2, axis=1))
+        normalized_brier = brier_score / 2
+        
+        # Courbes one-vs-rest de toutes les classes en une passe
+        predicted, actual, counts = CalibrationAnalyzer._reliability(y_onehot, y_proba, n_bins)
+        class_ece = np.abs(predicted - actual).sum(axis=1) / n_rows
+        ece = float(class_ece.mean())
+        
+        # Top-label (confidence) calibration
+        top = np.argmax(y_proba, axis=1)
+        confidence = y_proba[np.arange(n_rows), top].reshape(-1, 1)
+        correct = y_onehot[np.arange(n_rows), top].reshape(-1, 1)
+        top_predicted, top_actual, top_counts = CalibrationAnalyzer._reliability(correct, confidence, n_bins)
+        
+        per_class = [
+            {
+                'class': label.item() if hasattr(label, 'item') else label,
+                'expected_calibration_error': float(class_ece[k]),
+                'calibration_curve': CalibrationAnalyzer._curve(predicted[k], actual[k], counts[k])
+            }
+            for k, label in enumerate(class_labels)
+        ]
+        
+        return {
+            'brier_score': float(brier_score),
+            'brier_score_normalized': float(normalized_brier),
+            'expected_calibration_error': ece,
+            'top_label_calibration_error': float(np.abs(top_predicted - top_actual).sum() / n_rows),
+            'calibration_curve': CalibrationAnalyzer._curve(top_predicted[0], top_actual[0], top_counts[0]),
+            'per_class': per_class,
+            'interpretation': CalibrationAnalyzer._interpret(normalized_brier, ece),
+            'is_well_calibrated': normalized_brier < 0.15 and ece < 0.1
+        }
+    
+    @staticmethod
+    def _interpret(brier_score: float, ece: float) -> List[str]:
+        interpretation = []
+        if brier_score < 0.1:
+            interpretation.append("Excellent calibration - probabilities are well-calibrated")
+        elif brier_score < 0.2:
+            interpretation.append("Good calibration - probabilities are reasonably reliable")
+        else:
+            interpretation.append("Poor calibration - consider calibrating the model")
+        
+        if ece > 0.1:
+            interpretation.append(
+                f"High calibration error (ECE={ece:.3f}) - predicted probabilities may be overconfident"
+            )
+        return interpretation
+    
     @staticmethod
     def suggest_calibration_method(brier_score: float, model_type: str) -> Dict[str, str]:
         """Suggest calibration method if needed."""
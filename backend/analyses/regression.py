@@ -2,6 +2,7 @@ import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression, Ridge, Lasso, LogisticRegression, ElasticNet
 from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+from sklearn.pipeline import Pipeline
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
@@ -14,6 +15,13 @@ try:
 except ImportError:
     VALIDATION_AVAILABLE = False
 
+# Import explainability module
+try:
+    from analyses.explainability import ExplainabilityAnalyzer
+    EXPLAINABILITY_AVAILABLE = True
+except ImportError:
+    EXPLAINABILITY_AVAILABLE = False
+
 class RegressionAnalyzer:
     def __init__(self, df):
         self.df = df
@@ -28,6 +36,8 @@ class RegressionAnalyzer:
         self._best_model_key = None
         self._best_model_label = None
         self._target_column = None
+        self._holdout = None
+        self._is_classification = False
 
     def _encode_features(self, X_raw: pd.DataFrame) -> pd.DataFrame:
         """Encode les features en numérique (bool/date/catégoriel) et gère les NA."""
@@ -141,7 +151,9 @@ class RegressionAnalyzer:
             'methods': ['linear', 'polynomial', 'ridge', 'lasso', 'elastic', 'logistic'],
             'polynomial_degree': 2,
             'test_size': 0.2,
-            'cv_folds': 5
+            'cv_folds': 5,
+            'importance_method': 'auto',  # ou 'permutation' (forcée pour tous les modèles)
+            'permutation_repeats': 5
         }
         """
         results = {
@@ -179,6 +191,17 @@ class RegressionAnalyzer:
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=config.get('test_size', 0.2), random_state=42
         )
+
+        # Holdout compact (float32) conservé pour /model/stress-test
+        n_holdout = min(len(X_test), config.get('holdout_size', 2000))
+        holdout_rows = np.sort(np.random.default_rng(42).choice(len(X_test), n_holdout, replace=False))
+        self._is_classification = is_classification
+        self._holdout = {
+            'X': np.asarray(X_test, dtype=np.float32)[holdout_rows],
+            'y': np.asarray(y_test)[holdout_rows],
+            'rows': holdout_rows,
+            'columns': X.columns.tolist()
+        }
         
         # Standardisation
         scaler = StandardScaler()
@@ -242,9 +265,10 @@ class RegressionAnalyzer:
         self._best_model_label = results['summary'].get('best_model')
         if best_key:
             results['summary']['best_model_key'] = best_key
-            # Entraîner un modèle final pour /predict
+            # Entraîner un modèle final pour /predict, sur X_train seulement
+            # (le holdout de /model/stress-test reste hors échantillon)
             try:
-                self._train_predictor(best_key, X, y, config)
+                self._train_predictor(best_key, X_train, y_train, config)
             except Exception:
                 # Ne pas faire échouer l'analyse si l'entraînement final échoue
                 self._predict_model = None
@@ -263,7 +287,7 @@ class RegressionAnalyzer:
                                    cv=config.get('cv_folds', 5), 
                                    scoring='r2')
         
-        return {
+        result = {
             'method': 'Régression Linéaire',
             'coefficients': model.coef_.tolist(),
             'intercept': float(model.intercept_),
@@ -288,6 +312,7 @@ class RegressionAnalyzer:
             'actual_sample': y_test[:10].tolist(),
             'residuals_sample': (y_test - y_pred_test)[:10].tolist()
         }
+        return self._add_global_importance(result, model, X_test, y_test, config)
     
     def _polynomial_regression(self, X_train, X_test, y_train, y_test, config):
         degree = config.get('polynomial_degree', 2)
@@ -302,7 +327,10 @@ class RegressionAnalyzer:
         y_pred_train = model.predict(X_train_poly)
         y_pred_test = model.predict(X_test_poly)
         
-        return {
+        # Polynôme + modèle exposés comme un seul estimateur sur les features d'origine
+        model = Pipeline([('poly', poly), ('model', model)])
+        
+        result = {
             'method': f'Régression Polynomiale (degré {degree})',
             'degree': degree,
             'n_features': X_train_poly.shape[1],
@@ -322,6 +350,7 @@ class RegressionAnalyzer:
             'actual_sample': y_test[:10].tolist(),
             'residuals_sample': (y_test - y_pred_test)[:10].tolist()
         }
+        return self._add_global_importance(result, model, X_test, y_test, config)
     
     def _ridge_regression(self, X_train, X_test, y_train, y_test, config):
         alpha = config.get('ridge_alpha', 1.0)
@@ -331,7 +360,7 @@ class RegressionAnalyzer:
         y_pred_train = model.predict(X_train)
         y_pred_test = model.predict(X_test)
         
-        return {
+        result = {
             'method': 'Ridge Regression (L2)',
             'alpha': alpha,
             'coefficients': model.coef_.tolist(),
@@ -352,6 +381,7 @@ class RegressionAnalyzer:
             'actual_sample': y_test[:10].tolist(),
             'residuals_sample': (y_test - y_pred_test)[:10].tolist()
         }
+        return self._add_global_importance(result, model, X_test, y_test, config)
     
     def _lasso_regression(self, X_train, X_test, y_train, y_test, config):
         alpha = config.get('lasso_alpha', 1.0)
@@ -364,7 +394,7 @@ class RegressionAnalyzer:
         # Nombre de coefficients non-nuls (feature selection)
         n_nonzero = np.sum(model.coef_ != 0)
         
-        return {
+        result = {
             'method': 'Lasso Regression (L1)',
             'alpha': alpha,
             'coefficients': model.coef_.tolist(),
@@ -387,6 +417,7 @@ class RegressionAnalyzer:
             'actual_sample': y_test[:10].tolist(),
             'residuals_sample': (y_test - y_pred_test)[:10].tolist()
         }
+        return self._add_global_importance(result, model, X_test, y_test, config)
     
     def _elastic_net_regression(self, X_train, X_test, y_train, y_test, config):
         alpha = config.get('elastic_alpha', 1.0)
@@ -398,7 +429,7 @@ class RegressionAnalyzer:
         y_pred_train = model.predict(X_train)
         y_pred_test = model.predict(X_test)
         
-        return {
+        result = {
             'method': 'ElasticNet (L1 + L2)',
             'alpha': alpha,
             'l1_ratio': l1_ratio,
@@ -420,6 +451,7 @@ class RegressionAnalyzer:
             'actual_sample': y_test[:10].tolist(),
             'residuals_sample': (y_test - y_pred_test)[:10].tolist()
         }
+        return self._add_global_importance(result, model, X_test, y_test, config)
     
     def _logistic_regression(self, X_train, X_test, y_train, y_test, config):
         model = LogisticRegression(max_iter=1000)
@@ -432,7 +464,7 @@ class RegressionAnalyzer:
         # Confusion matrix
         cm = confusion_matrix(y_test, y_pred_test)
         
-        return {
+        result = {
             'method': 'Régression Logistique',
             'coefficients': model.coef_.tolist(),
             'intercept': model.intercept_.tolist(),
@@ -454,6 +486,27 @@ class RegressionAnalyzer:
             'probabilities_sample': y_pred_proba[:10].tolist(),
             'actual_sample': y_test[:10].tolist()
         }
+        return self._add_global_importance(result, model, X_test, y_test, config)
+    
+    def _add_global_importance(self, result, model, X_test, y_test, config):
+        """Ajoute feature_importance_global: native (coefficients) ou par permutation sur le holdout."""
+        if not EXPLAINABILITY_AVAILABLE or not self._holdout:
+            return result
+
+        feature_names = self._holdout['columns']
+        importance = ExplainabilityAnalyzer.get_feature_importance(model, feature_names, 'linear')
+        if not importance.get('available') or config.get('importance_method') == 'permutation':
+            rows = self._holdout['rows']
+            X_holdout = X_test.iloc[rows] if hasattr(X_test, 'iloc') else X_test[rows]
+            importance = ExplainabilityAnalyzer.permutation_importance(
+                model, X_holdout, np.asarray(y_test)[rows], feature_names,
+                task='classification' if self._is_classification else 'regression',
+                n_repeats=config.get('permutation_repeats', 5),
+                n_jobs=config.get('n_jobs', 1)
+            )
+        if importance.get('available'):
+            result['feature_importance_global'] = importance
+        return result
     
     def _compare_models(self, models, is_classification):
         """Compare les performances des différents modèles"""
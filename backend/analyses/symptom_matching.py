@@ -3,16 +3,194 @@ Analyse de correspondance symptômes-maladies
 Utilise TF-IDF, similarité cosinus et modèles probabilistes
 Parfait pour diagnostic médical basé sur symptômes
 """
+import os
 import pandas as pd
 import numpy as np
+from scipy import sparse
+from scipy.special import logsumexp
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.naive_bayes import MultinomialNB, BernoulliNB
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report
-from sklearn.preprocessing import LabelEncoder
+from sklearn.preprocessing import LabelEncoder, normalize
 import warnings
 warnings.filterwarnings('ignore')
 
+# Corpus fréquentiel livré à la racine du projet (symptôme, nb_maladies, fréquence %)
+DEFAULT_FREQUENCY_CORPUS = os.path.join(os.path.dirname(__file__), '..', '..', 'symptomes_frequence.csv')
+
+
+def _binarize_symptoms(X):
+    """
+    Binarisation unique de la matrice symptômes, partagée par les modèles Naive Bayes.
+    Matrice déjà 0/1 conservée, sinon seuil = médiane de chaque colonne.
+    Retourne (matrice CSR 0/1, is_boolean).
+    """
+    X = np.asarray(X, dtype=float)
+    is_boolean = bool(np.all((X == 0) | (X == 1)))
+    binary = X if is_boolean else X > np.median(X, axis=0)
+    return sparse.csr_matrix(binary, dtype=np.float64), is_boolean
+
+
+def _scaled_counts(X):
+    """Comptages pour le Multinomial: normalisation min-max par colonne puis × 100"""
+    X = np.asarray(X, dtype=float)
+    min_vals = X.min(axis=0)
+    span = X.max(axis=0) - min_vals
+    scaled = np.divide(X - min_vals, span, out=np.zeros_like(X), where=span > 0)
+    return sparse.csr_matrix(np.round(scaled * 100))
+
+
+class NaiveBayesScorer:
+    """
+    Scoring Naive Bayes pré-calculé à partir d'un modèle entraîné:
+    la log-vraisemblance jointe se réduit à un produit creux X · W + b.
+    
+    Bernoulli:   W = log p - log(1 - p),  b = log P(c) + Σ log(1 - p)
+    Multinomial: W = log p,               b = log P(c)
+    """
+    
+    def __init__(self, model):
+        self.classes_ = model.classes_
+        log_prob = model.feature_log_prob_
+        if isinstance(model, BernoulliNB):
+            log_neg = np.log1p(-np.exp(log_prob))
+            self.binarize = model.binarize
+            self.weights = np.ascontiguousarray((log_prob - log_neg).T)
+            self.bias = model.class_log_prior_ + log_neg.sum(axis=1)
+        else:
+            self.binarize = None
+            self.weights = np.ascontiguousarray(log_prob.T)
+            self.bias = model.class_log_prior_.copy()
+    
+    def joint_log_likelihood(self, X):
+        X = sparse.csr_matrix(X, dtype=np.float64)
+        if self.binarize is not None:
+            X = (X > self.binarize).astype(np.float64)
+        return np.asarray(X @ self.weights) + self.bias
+    
+    def predict_proba(self, X):
+        jll = self.joint_log_likelihood(X)
+        return np.exp(jll - logsumexp(jll, axis=1, keepdims=True))
+
+
+def load_symptom_frequencies(path=DEFAULT_FREQUENCY_CORPUS):
+    """Corpus fréquentiel: symptôme → nombre de maladies qui le présentent"""
+    return load_symptom_corpus(path)[0]
+
+
+def load_symptom_corpus(path=DEFAULT_FREQUENCY_CORPUS, percent_step=0.1):
+    """
+    Corpus fréquentiel et son nombre de maladies N.
+    N n'est pas stocké: chaque ligne donne nb_maladies / fréquence (%) × 100 à
+    l'arrondi près (pas `percent_step`); on retient le milieu de l'intervalle
+    compatible avec toutes les lignes (rapport des sommes s'il est vide).
+    Retourne (dict symptôme → nb_maladies, N ou None sans colonne de fréquence).
+    """
+    corpus = pd.read_csv(path)
+    name_col, count_col = corpus.columns[:2]
+    frequencies = dict(zip(corpus[name_col].astype(str), corpus[count_col].astype(int)))
+    if len(corpus.columns) < 3:
+        return frequencies, None
+    
+    counts = corpus[count_col].to_numpy(dtype=float)
+    percents = corpus[corpus.columns[2]].to_numpy(dtype=float)
+    valid = (counts > 0) & (percents > 0)
+    if not valid.any():
+        return frequencies, None
+    counts, percents = counts[valid], percents[valid]
+    half_step = percent_step / 2
+    lower = np.max(counts * 100 / (percents + half_step))
+    upper = np.min(counts[percents > half_step] * 100 / (percents[percents > half_step] - half_step),
+                   initial=np.inf)
+    n_documents = (lower + upper) / 2 if lower <= upper < np.inf else counts.sum() * 100 / percents.sum()
+    return frequencies, max(int(round(n_documents)), int(counts.max()))
+
+
+class SymptomRetrievalIndex:
+    """
+    Recherche classée symptômes → maladies par pondération TF-IDF ou BM25.
+    
+    L'IDF est calculé une seule fois (vecteur en cache), à partir du corpus
+    fréquentiel quand il est fourni (avec son propre nombre de maladies
+    `corpus_size`), sinon des fréquences de la matrice.
+    Les profils maladies pondérés sont normalisés L2: une requête (ou un lot
+    de requêtes) se score en un unique produit creux D · Qᵀ.
+    """
+    
+    def __init__(self, X, diseases, symptom_cols, weighting='bm25', document_frequency=None, k1=1.2, b=0.75,
+                 corpus_size=None):
+        if weighting not in ('bm25', 'tfidf'):
+            raise ValueError(f"Pondération inconnue: {weighting} (attendu 'bm25' ou 'tfidf')")
+        X = sparse.csr_matrix(X, dtype=np.float64)
+        n_documents = X.shape[0]
+        self.weighting = weighting
+        self.diseases = np.asarray(diseases)
+        self.symptom_cols = list(symptom_cols)
+        self._positions = {symptom: j for j, symptom in enumerate(self.symptom_cols)}
+        
+        # Fréquences documentaires: corpus si disponible (rapportées à son N), sinon matrice
+        df = np.bincount(X.indices, minlength=X.shape[1]).astype(float)
+        n_df = np.full(X.shape[1], float(n_documents))
+        self.corpus_coverage = 0
+        self.corpus_size = corpus_size
+        if document_frequency:
+            corpus_df = np.array([document_frequency.get(str(s), np.nan) for s in self.symptom_cols])
+            known = ~np.isnan(corpus_df)
+            if corpus_size:
+                n_df[known] = corpus_size
+                df[known] = np.minimum(corpus_df[known], corpus_size)
+            else:
+                # N du corpus inconnu: celui de la matrice, fréquences bornées
+                df[known] = np.minimum(corpus_df[known], n_documents)
+            self.corpus_coverage = int(known.sum())
+        
+        if weighting == 'bm25':
+            self.idf = np.log1p((n_df - df + 0.5) / (df + 0.5))
+            lengths = np.asarray(X.sum(axis=1)).ravel()
+            length_norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1e-12))
+            tf = X.copy()
+            tf.data = tf.data * (k1 + 1) / (tf.data + np.repeat(length_norm, np.diff(X.indptr)))
+        else:
+            self.idf = np.log((1 + n_df) / (1 + df)) + 1
+            tf = X
+        
+        self.documents = normalize(tf @ sparse.diags(self.idf), norm='l2', axis=1).tocsr()
+    
+    def query_matrix(self, queries):
+        """
+        Requêtes (listes de symptômes ou matrice 0/1) → matrice dense pondérée IDF, normalisée L2.
+        Côté requête le vocabulaire est petit: le dense évite le coût fixe des opérations creuses.
+        """
+        if sparse.issparse(queries):
+            Q = queries.toarray() > 0
+        elif isinstance(queries, np.ndarray):
+            Q = np.atleast_2d(queries) > 0
+        else:
+            Q = np.zeros((len(queries), len(self.symptom_cols)), dtype=bool)
+            for i, symptoms in enumerate(queries):
+                Q[i, [self._positions[s] for s in symptoms if s in self._positions]] = True
+        weighted = Q * self.idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        return np.divide(weighted, norms, out=np.zeros_like(weighted), where=norms > 0)
+    
+    def rank(self, queries, top_k=5):
+        """Indices et scores cosinus des top_k maladies pour chaque requête"""
+        scores = np.asarray(self.documents @ self.query_matrix(queries).T).T
+        top_k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+    
+    def search(self, symptoms, top_k=5):
+        """Maladies classées pour une liste de symptômes"""
+        top, scores = self.rank([symptoms], top_k)
+        return [
+            {'disease': self.diseases[idx], 'score': round(float(score), 4)}
+            for idx, score in zip(top[0], scores[0])
+        ]
+
 
 class SymptomMatchingAnalyzer:
     """
@@ -23,6 +201,8 @@ class SymptomMatchingAnalyzer:
     def __init__(self, df):
         self.df = df.copy()
         self.trained_model = None  # Modèle ML entraîné
+        self.scorer = None  # NaiveBayesScorer pré-calculé du modèle entraîné
+        self.retrieval_index = None  # SymptomRetrievalIndex (TF-IDF / BM25)
         self.feature_names = None  # Noms des colonnes features
         self.target_column = None  # Nom de la colonne cible
         self.classes_ = None  # Classes possibles (maladies)
@@ -37,9 +217,11 @@ class SymptomMatchingAnalyzer:
             'id_column': 'id',  # Colonne ID (optionnel)
             'symptom_columns': [...],  # Liste des colonnes de symptômes (ou 'auto')
             'test_size': 0.2,
-            'model': 'tfidf',  # 'tfidf', 'bernoulli', 'multinomial', 'all'
+            'model': 'tfidf',  # 'tfidf', 'bernoulli', 'multinomial', 'retrieval', 'all'
             'top_predictions': 5,  # Nombre de maladies à retourner
-            'similarity_threshold': 0.3  # Seuil de similarité minimum
+            'similarity_threshold': 0.3,  # Seuil de similarité minimum
+            'weighting': 'bm25',  # Recherche classée: 'bm25' ou 'tfidf'
+            'frequency_corpus': 'default'  # Chemin du corpus fréquentiel pour l'IDF (None: fréquences de la matrice)
         }
         """
         results = {
@@ -51,6 +233,7 @@ class SymptomMatchingAnalyzer:
             'tfidf_analysis': None,
             'bernoulli_nb': None,
             'multinomial_nb': None,
+            'retrieval': None,
             'symptom_importance': None,
             'disease_similarity': None,
             'top_symptoms_per_disease': None,
@@ -120,15 +303,25 @@ class SymptomMatchingAnalyzer:
                 print("\n[TFIDF] Analyse TF-IDF...")
                 results['tfidf_analysis'] = self._tfidf_analysis(X, y, symptom_cols, disease_col)
             
+            # Binarisation unique (creuse), partagée par les deux Naive Bayes
+            if config.get('model') in ['bernoulli', 'multinomial', 'all']:
+                X_binary, is_boolean = _binarize_symptoms(X)
+            
             # 2. Modèle Bernoulli Naive Bayes (parfait pour données booléennes)
             if config.get('model') in ['bernoulli', 'all']:
                 print("\n[BERNOULLI] Modele Bernoulli Naive Bayes...")
-                results['bernoulli_nb'] = self._bernoulli_nb_model(X, y, config)
+                results['bernoulli_nb'] = self._bernoulli_nb_model(X_binary, y, config, X_raw=X)
             
             # 3. Modèle Multinomial Naive Bayes
             if config.get('model') in ['multinomial', 'all']:
                 print("\n[MULTINOMIAL] Modele Multinomial Naive Bayes...")
-                results['multinomial_nb'] = self._multinomial_nb_model(X, y, config)
+                X_counts = X_binary if is_boolean else _scaled_counts(X)
+                results['multinomial_nb'] = self._multinomial_nb_model(X_counts, y, config)
+            
+            # Recherche classée TF-IDF / BM25
+            if config.get('model') in ['retrieval', 'all']:
+                print("\n[RETRIEVAL] Index de recherche TF-IDF/BM25...")
+                results['retrieval'] = self._build_retrieval_index(X, y, symptom_cols, config)
             
             # 4. Importance des symptômes
             print("\n[IMPORTANCE] Calcul de l'importance des symptomes...")
@@ -214,10 +407,11 @@ class SymptomMatchingAnalyzer:
             'note': 'Importance des features basée sur fréquence et variance'
         }
     
-    def _bernoulli_nb_model(self, X, y, config):
+    def _bernoulli_nb_model(self, X_binary, y, config, X_raw=None):
         """
         Bernoulli Naive Bayes - Parfait pour features binaires (0/1)
-        Idéal pour symptômes booléens ou autres données binarisées
+        X_binary: matrice creuse déjà binarisée (_binarize_symptoms)
+        X_raw: matrice d'origine; sans split, le modèle est entraîné sur X_raw > 0
         """
         test_size = config.get('test_size', 0.2)
         n_classes = len(np.unique(y))
@@ -225,16 +419,6 @@ class SymptomMatchingAnalyzer:
         if n_classes < 2:
             return {'error': 'Pas assez de classes differentes pour entrainer un modele'}
         
-        # Convertir en données binaires si nécessaire
-        X_binary = X.copy()
-        is_boolean = np.all((X == 0) | (X == 1))
-        
-        if not is_boolean:
-            # Binariser avec le seuil de la médiane par colonne
-            for col in range(X_binary.shape[1]):
-                col_median = np.median(X_binary[:, col])
-                X_binary[:, col] = (X_binary[:, col] > col_median).astype(int)
-        
         # Pour les datasets avec trop de classes uniques et peu d'echantillons,
         # on ne peut pas faire de split stratifié
         if n_classes > len(y) * 0.9:
@@ -243,13 +427,15 @@ class SymptomMatchingAnalyzer:
             print(f"   [WARNING] Beaucoup de classes ({n_classes}) pour peu de samples ({len(y)})")
             print(f"   [INFO] Entraînement du modèle sans validation (pas de train/test split)")
             
-            # Entraîner sur TOUTES les données (pas de split)
-            X_binary = (X > 0).astype(int)
+            # Entraîner sur TOUTES les données (pas de split), présence = valeur > 0
+            X_presence = X_binary if X_raw is None else sparse.csr_matrix(np.asarray(X_raw, dtype=float) > 0,
+                                                                          dtype=np.float64)
             model = BernoulliNB(alpha=1.0, fit_prior=True)
-            model.fit(X_binary, y)
+            model.fit(X_presence, y)
             
             # Sauvegarder le modèle pour prédictions futures
             self.trained_model = model
+            self.scorer = NaiveBayesScorer(model)
             self.classes_ = model.classes_
             
             return {
@@ -289,17 +475,16 @@ class SymptomMatchingAnalyzer:
         
         # Sauvegarder le modèle pour prédictions futures
         self.trained_model = model
+        self.scorer = NaiveBayesScorer(model)
         self.classes_ = model.classes_
         
-        # Prédictions
-        y_pred = model.predict(X_test)
+        # Probabilités (scoring pré-calculé) et prédictions
+        y_proba = self.scorer.predict_proba(X_test)
+        y_pred = model.classes_[y_proba.argmax(axis=1)]
         
         # Métriques
         accuracy = accuracy_score(y_test, y_pred)
         
-        # Probabilités pour top prédictions
-        y_proba = model.predict_proba(X_test)
-        
         # Top prédictions sur quelques exemples
         top_k = config.get('top_predictions', 5)
         example_predictions = []
@@ -320,8 +505,8 @@ class SymptomMatchingAnalyzer:
             'model_name': 'Bernoulli Naive Bayes',
             'accuracy': round(accuracy, 4),
             'test_size': test_size,
-            'train_samples': len(X_train),
-            'test_samples': len(X_test),
+            'train_samples': X_train.shape[0],
+            'test_samples': X_test.shape[0],
             'n_classes': len(model.classes_),
             'example_predictions': example_predictions,
             'class_distribution': {
@@ -330,11 +515,11 @@ class SymptomMatchingAnalyzer:
             }
         }
     
-    def _multinomial_nb_model(self, X, y, config):
+    def _multinomial_nb_model(self, X_counts, y, config):
         """
         Multinomial Naive Bayes
         Fonctionne avec des comptages (0, 1, 2, ...)
-        Pour données non-binaires, on normalise et scale
+        X_counts: matrice creuse binaire, ou normalisée et scalée (_scaled_counts)
         """
         test_size = config.get('test_size', 0.2)
         n_classes = len(np.unique(y))
@@ -353,25 +538,6 @@ class SymptomMatchingAnalyzer:
                 'accuracy': None
             }
         
-        # Préparer les données pour Multinomial
-        X_scaled = X.copy().astype(float)
-        
-        # Vérifier si déjà binaire/entière
-        is_boolean = np.all((X_scaled == 0) | (X_scaled == 1))
-        
-        if not is_boolean:
-            # Normaliser à [0, 1] puis scale en counts
-            min_vals = np.min(X_scaled, axis=0)
-            max_vals = np.max(X_scaled, axis=0)
-            
-            for col in range(X_scaled.shape[1]):
-                if max_vals[col] - min_vals[col] > 0:
-                    # Normaliser
-                    X_scaled[:, col] = (X_scaled[:, col] - min_vals[col]) / (max_vals[col] - min_vals[col])
-            
-            # Multiplier par 100 pour avoir des "counts"
-            X_scaled = np.round(X_scaled * 100).astype(int)
-        
         # Split
         use_stratify = False
         if n_classes < len(y) / 2:
@@ -379,7 +545,7 @@ class SymptomMatchingAnalyzer:
         
         try:
             X_train, X_test, y_train, y_test = train_test_split(
-                X_scaled, y, test_size=test_size, random_state=42, 
+                X_counts, y, test_size=test_size, random_state=42, 
                 stratify=y if use_stratify else None
             )
         except ValueError as e:
@@ -394,7 +560,7 @@ class SymptomMatchingAnalyzer:
         model = MultinomialNB(alpha=1.0, fit_prior=True)
         model.fit(X_train, y_train)
         
-        y_pred = model.predict(X_test)
+        y_pred = model.classes_[NaiveBayesScorer(model).joint_log_likelihood(X_test).argmax(axis=1)]
         accuracy = accuracy_score(y_test, y_pred)
         
         # Cross-validation
@@ -406,11 +572,43 @@ class SymptomMatchingAnalyzer:
             'cv_mean_accuracy': round(cv_scores.mean(), 4),
             'cv_std': round(cv_scores.std(), 4),
             'test_size': test_size,
-            'train_samples': len(X_train),
-            'test_samples': len(X_test),
+            'train_samples': X_train.shape[0],
+            'test_samples': X_test.shape[0],
             'n_classes': len(model.classes_)
         }
     
+    def _build_retrieval_index(self, X, y, symptom_cols, config):
+        """
+        Construit l'index de recherche classée et l'évalue en auto-recherche:
+        chaque maladie interrogée avec son propre profil doit arriver en tête
+        """
+        corpus_path = config.get('frequency_corpus', 'default')
+        if corpus_path == 'default':
+            corpus_path = DEFAULT_FREQUENCY_CORPUS if os.path.exists(DEFAULT_FREQUENCY_CORPUS) else None
+        document_frequency, corpus_size = load_symptom_corpus(corpus_path) if corpus_path else (None, None)
+        
+        X_binary, _ = _binarize_symptoms(X)
+        index = SymptomRetrievalIndex(X_binary, y, symptom_cols, weighting=config.get('weighting', 'bm25'),
+                                      document_frequency=document_frequency, corpus_size=corpus_size)
+        self.retrieval_index = index
+        
+        top, _ = index.rank(X_binary, top_k=min(5, len(y)))
+        hits = np.asarray(y)[top] == np.asarray(y)[:, None]
+        order = np.argsort(-index.idf, kind='stable')[:20]
+        
+        return {
+            'weighting': index.weighting,
+            'idf_source': os.path.basename(corpus_path) if document_frequency else 'matrix',
+            'corpus_coverage': index.corpus_coverage,
+            'corpus_size': index.corpus_size if document_frequency else None,
+            'total_symptoms': len(symptom_cols),
+            'self_recall_at_1': round(float(hits[:, 0].mean()), 4),
+            'self_recall_at_5': round(float(hits.any(axis=1).mean()), 4),
+            'top_idf_symptoms': [
+                {'symptom': str(symptom_cols[j]), 'idf': round(float(index.idf[j]), 4)} for j in order
+            ]
+        }
+    
     def _calculate_symptom_importance(self, X, symptom_cols):
         """
         Calcule l'importance de chaque symptôme
@@ -477,29 +675,44 @@ class SymptomMatchingAnalyzer:
     def _top_symptoms_per_disease(self, df, symptom_cols, disease_col, top_n=10):
         """
         Pour chaque maladie, liste les top symptômes les plus fréquents
+        Profils de toutes les maladies en un produit creux one-hot(maladie)ᵀ · X,
+        top-n par ligne via argpartition
         """
-        disease_profiles = []
-        
-        for disease in df[disease_col].unique()[:20]:  # Top 20 maladies
-            disease_data = df[df[disease_col] == disease]
-            symptom_counts = disease_data[symptom_cols].sum()
-            
-            # Top symptômes pour cette maladie
-            top_symptoms = symptom_counts.nlargest(top_n)
-            
-            disease_profiles.append({
+        codes, diseases = pd.factorize(df[disease_col])
+        # Maladie manquante (code -1): ligne ignorée; symptôme manquant compté 0 (comme sum())
+        labelled = codes >= 0
+        codes = codes[labelled]
+        X = sparse.csr_matrix(df.loc[labelled, symptom_cols].fillna(0).to_numpy(dtype=float))
+        one_hot = sparse.csr_matrix(
+            (np.ones(len(codes)), (codes, np.arange(len(codes)))), shape=(len(diseases), len(codes))
+        )
+        profiles = (one_hot @ X).toarray()
+        
+        top_n = min(top_n, len(symptom_cols))
+        if top_n == 0:
+            top = np.empty((len(diseases), 0), dtype=int)
+        else:
+            top = np.argpartition(-profiles, top_n - 1, axis=1)[:, :top_n]
+            # Tri décroissant, à égalité l'ordre des colonnes (comme nlargest)
+            top_counts = np.take_along_axis(profiles, top, axis=1)
+            order = np.lexsort((top, -top_counts), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+        totals = profiles.sum(axis=1)
+        
+        return [
+            {
                 'disease': disease,
-                'total_symptom_count': int(symptom_counts.sum()),
+                'total_symptom_count': int(totals[i]),
                 'top_symptoms': [
                     {
-                        'symptom': symptom,
-                        'count': int(count)
+                        'symptom': symptom_cols[j],
+                        'count': int(profiles[i, j])
                     }
-                    for symptom, count in top_symptoms.items()
+                    for j in top[i]
                 ]
-            })
-        
-        return disease_profiles
+            }
+            for i, disease in enumerate(diseases)
+        ]
     
     def predict_disease(self, symptoms_input, model, symptom_cols, top_k=5):
         """
@@ -514,14 +727,16 @@ class SymptomMatchingAnalyzer:
         Returns:
             Liste des top_k maladies avec probabilités
         """
-        # Créer un vecteur binaire
-        symptom_vector = np.zeros((1, len(symptom_cols)))
-        for symptom in symptoms_input:
-            if symptom in symptom_cols:
-                idx = symptom_cols.index(symptom)
-                symptom_vector[0, idx] = 1
-        
-        # Prédire
+        # Créer un vecteur binaire creux
+        positions = {symptom: i for i, symptom in enumerate(symptom_cols)}
+        cols = sorted({positions[s] for s in symptoms_input if s in positions})
+        symptom_vector = sparse.csr_matrix(
+            (np.ones(len(cols)), (np.zeros(len(cols), dtype=int), cols)), shape=(1, len(symptom_cols))
+        )
+        
+        # Prédire (scoring pré-calculé si le modèle est celui entraîné ici)
+        if model is self.trained_model and self.scorer is not None:
+            model = self.scorer
         probabilities = model.predict_proba(symptom_vector)[0]
         top_indices = probabilities.argsort()[-top_k:][::-1]
         
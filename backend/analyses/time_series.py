@@ -1,12 +1,23 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from collections import OrderedDict
+from joblib import Parallel, delayed
+import hashlib
 import json
+import time
+import warnings
+from scipy.signal import lfilter
+from scipy.stats import norm
+
+from utils.array_codec import encode_array
 
 try:
     from statsmodels.tsa.arima.model import ARIMA
     from statsmodels.tsa.statespace.sarimax import SARIMAX
-    from statsmodels.tsa.stattools import adfuller, acf, pacf
+    from statsmodels.tsa.statespace.initialization import Initialization
+    from statsmodels.tsa.seasonal import STL
+    from statsmodels.tsa.stattools import adfuller, acf, pacf, kpss
     from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
     STATSMODELS_AVAILABLE = True
 except ImportError:
@@ -18,24 +29,314 @@ try:
 except ImportError:
     PROPHET_AVAILABLE = False
 
+# Scores des ajustements (hash de la série, ordre) conservés par la recherche auto-ARIMA
+ORDER_SEARCH_CACHE_SIZE = 2048
+_order_fit_cache = OrderedDict()
+
+
+# Modèles de référence vectorisés (numpy), sélectionnables dans 'methods'
+BASELINE_METHODS = {
+    'naive': 'Naïf',
+    'seasonal_naive': 'Naïf saisonnier',
+    'drift': 'Dérive',
+    'ses': 'Lissage exponentiel simple',
+    'holt': 'Holt (tendance linéaire)',
+    'theta': 'Theta'
+}
+# Grille des constantes de lissage (alpha, beta) ajustées par SSE à un pas
+SMOOTHING_GRID = np.linspace(0.05, 1.0, 20)
+# Modèles sautés quand une référence gagne la présélection
+HEAVY_METHODS = ('arima', 'auto_arima', 'sarima', 'prophet')
+# Pas de rééchantillonnage candidats (choix automatique pour les séries trop longues)
+RESAMPLE_LADDER = ['1s', '5s', '10s', '15s', '30s', '1min', '5min', '10min', '15min', '30min',
+                   '1h', '2h', '3h', '6h', '12h', '1D', '7D', '30D']
+
+
+def _forecast_metrics(actual, predicted, axis=None):
+    """
+    MSE, RMSE, MAE et MAPE (%) en une passe numpy, alignement positionnel.
+    Avec axis, une valeur par position restante (ex. axis=0 sur (origines, horizon)
+    donne des courbes par horizon). Les valeurs réelles nulles sont exclues du MAPE.
+    """
+    actual = np.asarray(actual, dtype=float)
+    errors = actual - np.asarray(predicted, dtype=float)
+    mse = np.mean(errors ** 2, axis=axis)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(actual != 0, np.abs(errors / np.where(actual != 0, actual, 1.0)), np.nan) * 100
+    valid = np.isfinite(pct).any(axis=axis)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mape = np.where(valid, np.nanmean(pct, axis=axis), np.nan)
+    
+    if axis is None:
+        return {
+            'mse': float(mse),
+            'rmse': float(np.sqrt(mse)),
+            'mae': float(np.mean(np.abs(errors))),
+            'mape': float(mape) if valid else None
+        }
+    return {
+        'mse': mse.tolist(),
+        'rmse': np.sqrt(mse).tolist(),
+        'mae': np.mean(np.abs(errors), axis=axis).tolist(),
+        'mape': [float(v) if np.isfinite(v) else None for v in mape] if valid.any() else None
+    }
+
+
+def _smoothing_errors(values, alpha, beta=None):
+    """
+    Erreurs à un pas du lissage simple (beta=None) ou de Holt, via leurs formes
+    ARIMA(0,1,1) / ARIMA(0,2,2): un seul filtre récursif (lfilter) sur la série
+    différenciée. Initialisation: niveau y0 (simple), niveau y1 et pente y1 - y0 (Holt).
+    """
+    errors = np.zeros(len(values))
+    if beta is None:
+        if len(values) > 1:
+            errors[1:] = lfilter([1.0], [1.0, -(1 - alpha)], np.diff(values))
+    elif len(values) > 2:
+        errors[2:] = lfilter([1.0], [1.0, -(2 - alpha - alpha * beta), -(alpha - 1)], np.diff(values, 2))
+    return errors
+
+
+def _fit_baseline(values, method, period=0):
+    """Paramètres d'un modèle de référence (constantes de lissage par grille) et écart-type des erreurs à un pas."""
+    params = {}
+    if method in ('ses', 'theta'):
+        sse = [np.sum(_smoothing_errors(values, a) ** 2) for a in SMOOTHING_GRID]
+        params['alpha'] = float(SMOOTHING_GRID[int(np.argmin(sse))])
+        residuals = _smoothing_errors(values, params['alpha'])[1:]
+    elif method == 'holt':
+        grid = [(a, b) for a in SMOOTHING_GRID for b in SMOOTHING_GRID[:10]]
+        sse = [np.sum(_smoothing_errors(values, a, b) ** 2) for a, b in grid]
+        params['alpha'], params['beta'] = (float(v) for v in grid[int(np.argmin(sse))])
+        residuals = _smoothing_errors(values, params['alpha'], params['beta'])[2:]
+    elif method == 'seasonal_naive' and period > 1 and len(values) > period:
+        residuals = values[period:] - values[:-period]
+    elif method == 'drift' and len(values) > 2:
+        diffs = np.diff(values)
+        residuals = diffs - diffs.mean()
+    else:
+        residuals = np.diff(values)
+    params['sigma'] = float(np.std(residuals)) if len(residuals) else 0.0
+    return params
+
+
+def _baseline_forecast(values, origins, horizon, method, params, period=0):
+    """
+    Prévisions (origines, horizon) d'un modèle de référence pour plusieurs
+    origines à la fois; l'origine o utilise uniquement values[:o].
+    """
+    origins = np.asarray(origins)
+    steps = np.arange(1, horizon + 1)
+    last = values[origins - 1][:, None]
+    
+    if method == 'seasonal_naive' and period > 1 and origins.min() >= period:
+        return values[origins[:, None] - period + (steps - 1) % period]
+    if method == 'drift':
+        slope = (values[origins - 1] - values[0]) / np.maximum(origins - 1, 1)
+        return last + steps * slope[:, None]
+    if method in ('ses', 'theta', 'holt'):
+        alpha = params['alpha']
+        errors = _smoothing_errors(values, alpha, params.get('beta'))
+        level = (values - (1 - alpha) * errors)[origins - 1][:, None]
+        if method == 'ses':
+            return np.repeat(level, horizon, axis=1)
+        if method == 'holt':
+            trend = (values[1] - values[0]) + alpha * params['beta'] * np.cumsum(errors)
+            return level + steps * trend[origins - 1][:, None]
+        # Theta (Hyndman & Billah): lissage simple + demi-pente de la régression linéaire sur le temps
+        t = np.arange(len(values), dtype=float)
+        n = origins.astype(float)
+        sum_y, sum_ty = np.cumsum(values)[origins - 1], np.cumsum(t * values)[origins - 1]
+        sum_t, sum_tt = n * (n - 1) / 2, (n - 1) * n * (2 * n - 1) / 6
+        slope = (n * sum_ty - sum_t * sum_y) / np.maximum(n * sum_tt - sum_t ** 2, 1e-12)
+        drift = steps - 1 + (1 - (1 - alpha) ** n[:, None]) / alpha
+        return level + slope[:, None] / 2 * drift
+    # Naïf (et naïf saisonnier sans période exploitable)
+    return np.repeat(last, horizon, axis=1)
+
+
+def _fit_order_candidate(values, order, seasonal_order, maxiter):
+    """Ajuste un candidat SARIMAX (exécuté dans un worker) et retourne ses critères."""
+    start = time.perf_counter()
+    record = {'order': tuple(order), 'seasonal_order': tuple(seasonal_order)}
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            fitted = SARIMAX(values, order=order, seasonal_order=seasonal_order).fit(disp=False, maxiter=maxiter)
+        converged = bool(fitted.mle_retvals.get('converged', True)) if fitted.mle_retvals else True
+        aic = float(fitted.aic)
+        record.update({
+            'aic': aic if np.isfinite(aic) else None,
+            'bic': float(fitted.bic) if np.isfinite(fitted.bic) else None,
+            'status': 'ok' if converged and np.isfinite(aic) else 'not_converged'
+        })
+    except Exception as e:
+        record.update({'aic': None, 'bic': None, 'status': 'failed', 'error': str(e)})
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+
+def _analyze_series_group(group, frame, config):
+    """Analyse une série d'un groupe (exécuté dans un worker); les erreurs restent locales au groupe."""
+    try:
+        if len(frame) < config.get('min_series_length', 10):
+            raise ValueError(f'Série trop courte ({len(frame)} points)')
+        results = TimeSeriesAnalyzer(frame).perform_analysis(config)
+        if results.get('error'):
+            raise ValueError(results['error'])
+        
+        models = {
+            key: {'method': model['method'], 'test_metrics': model.get('test_metrics'), 'aic': model.get('aic')}
+            if 'error' not in model else {'method': model.get('method'), 'error': model['error']}
+            for key, model in results['models'].items()
+        }
+        best_key = None
+        ranked = [(m['test_metrics']['rmse'], key) for key, m in models.items() if m.get('test_metrics')]
+        if ranked:
+            best_key = min(ranked)[1]
+        best = results['models'].get(best_key) or {}
+        return group, {
+            'n_observations': int(len(frame)),
+            'best_model': best.get('method'),
+            'best_model_key': best_key,
+            'models': models,
+            'forecast': best.get('forecast')
+        }
+    except Exception as e:
+        return group, {'n_observations': int(len(frame)), 'error': str(e)}
+
+
+class ForecastState:
+    """
+    État compact d'un ARIMA/SARIMAX ajusté: spécification, paramètres et
+    dernier état prédit (moyenne, covariance), sans les données d'entraînement.
+    
+    Les prévisions (tout horizon, tout niveau de confiance) se font par un
+    filtrage de Kalman sur des observations manquantes à partir de cet état;
+    append() y intègre de nouvelles observations sans réajuster les paramètres.
+    """
+    
+    def __init__(self, results, last_timestamp=None, freq=None, method=None):
+        self.model_class = type(results.model)
+        self.model_kwds = results.model._get_init_kwds()
+        self.params = np.asarray(results.params, dtype=float)
+        self.state = np.array(results.predicted_state[:, -1])
+        self.state_cov = np.array(results.predicted_state_cov[:, :, -1])
+        self.n_observations = int(results.nobs)
+        self.last_timestamp = last_timestamp
+        self.freq = freq
+        self.method = method
+    
+    def _filter(self, endog):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            model = self.model_class(endog, **self.model_kwds)
+            model.ssm.initialization = Initialization(
+                model.k_states, 'known', constant=self.state, stationary_cov=self.state_cov
+            )
+            return model.filter(self.params)
+    
+    def forecast(self, horizon, alpha=0.05):
+        """(moyenne, borne basse, borne haute) des `horizon` prochains pas."""
+        prediction = self._filter(np.full(horizon, np.nan)).get_prediction(start=0, end=horizon - 1)
+        bounds = np.asarray(prediction.conf_int(alpha=alpha))
+        return np.asarray(prediction.predicted_mean), bounds[:, 0], bounds[:, 1]
+    
+    def append(self, values, offset=None):
+        """
+        Intègre de nouvelles observations à l'état (paramètres inchangés).
+        offset: position de values[0] dans la série (n_observations = juste après
+        la dernière). Les points déjà intégrés sont ignorés, rejouer un append est
+        donc sans effet; un trou après la dernière observation lève ValueError.
+        Retourne le nombre d'observations effectivement intégrées.
+        """
+        values = np.asarray(values, dtype=float)
+        if offset is not None:
+            if offset > self.n_observations:
+                raise ValueError(f"Append starts at position {offset}, "
+                                 f"the state ends at {self.n_observations} observations")
+            values = values[max(self.n_observations - offset, 0):]
+        if not len(values):
+            return 0
+        results = self._filter(values)
+        self.state = np.array(results.predicted_state[:, -1])
+        self.state_cov = np.array(results.predicted_state_cov[:, :, -1])
+        self.n_observations += len(values)
+        if self.last_timestamp is not None and self.freq is not None:
+            self.last_timestamp = self.last_timestamp + len(values) * self.freq
+        return len(values)
+    
+    def offset_of(self, timestamp):
+        """Position dans la série d'une date alignée sur la fréquence (ValueError sinon)."""
+        if self.last_timestamp is None or self.freq is None:
+            raise ValueError("Series frequency unknown: use a position offset instead of a timestamp")
+        timestamp = pd.Timestamp(timestamp)
+        start, end = sorted([timestamp, self.last_timestamp])
+        steps = pd.date_range(start, end, freq=self.freq)
+        if not len(steps) or steps[0] != start or steps[-1] != end:
+            raise ValueError(f"{timestamp} is not aligned on the series frequency {self.freq.freqstr}")
+        periods = len(steps) - 1
+        return self.n_observations - 1 + (periods if timestamp >= self.last_timestamp else -periods)
+    
+    def index(self, horizon):
+        """Dates des `horizon` prochains pas (None si la fréquence est inconnue)."""
+        if self.last_timestamp is None or self.freq is None:
+            return None
+        return pd.date_range(self.last_timestamp + self.freq, periods=horizon, freq=self.freq)
+
+
 class TimeSeriesAnalyzer:
     def __init__(self, df):
         self.df = df
         
+        # Pour /forecast (runtime): états ARIMA/SARIMA sauvegardés
+        self._forecast_states = {}
+        self._best_forecast_key = None
+        
     def perform_analysis(self, config):
         """
         Analyse de séries temporelles (ARIMA, SARIMA, Prophet)
         config = {
             'date_column': 'nom_colonne_date',
             'target_column': 'nom_colonne_cible',
-            'methods': ['arima', 'sarima', 'prophet'],
+            'methods': ['arima', 'sarima', 'prophet', 'auto_arima'],
             'forecast_periods': 30,
-            'arima_order': (1, 1, 1),  # (p, d, q)
+            'arima_order': (1, 1, 1),  # (p, d, q), ou 'auto' (recherche automatique)
             'sarima_order': (1, 1, 1),  # (p, d, q)
             'sarima_seasonal_order': (1, 1, 1, 12),  # (P, D, Q, s)
-            'test_size': 0.2
+            'test_size': 0.2,
+            # Recherche automatique de l'ordre (auto_arima)
+            'seasonal_period': 0,  # s (0 = non saisonnier)
+            'auto_max_p': 3, 'auto_max_q': 3, 'auto_max_d': 2,
+            'auto_max_P': 1, 'auto_max_Q': 1,
+            'auto_stepwise': True,  # False = grille complète
+            'auto_time_budget': 60,  # secondes
+            'auto_maxiter': 50,  # itérations max par ajustement (non convergé = élagué)
+            'n_jobs': -1,  # Workers (processus) pour les ajustements candidats / les groupes
+            # Mode multi-séries (table longue, une série par valeur de group_column)
+            'group_column': None,
+            'min_series_length': 10,
+            # Backtest à origine glissante (fenêtre croissante); 0 = désactivé
+            'backtest_folds': 0,
+            'backtest_horizon': None,  # défaut: min(forecast_periods, n // 10)
+            'backtest_step': None,  # défaut: horizon
+            'backtest_min_train': None,  # défaut: n // 2
+            # Modèles de référence: 'naive', 'seasonal_naive', 'drift', 'ses', 'holt', 'theta' dans methods
+            'skip_heavy_models': False,  # sauter ARIMA/SARIMA/Prophet si une référence gagne la présélection
+            'screening_folds': 3,
+            # Rééchantillonnage avant modélisation (séries haute fréquence)
+            'resample_rule': None,  # ex. '1h'; None = automatique au-delà de max_model_points
+            'resample_agg': 'mean',  # 'sum', 'median', 'min', 'max', 'last', 'first'
+            'fill_method': 'interpolate',  # 'ffill', 'zero' ou None pour les intervalles vides
+            'max_model_points': 5000,  # 0 = jamais de rééchantillonnage automatique
+            'diagnostics_max_points': 5000,  # fenêtre ACF/PACF et décimation de l'ADF
+            'response_mode': 'full'  # 'compact': tableaux float32 en base64, index = début + fréquence
         }
         """
+        if config.get('group_column'):
+            return self._grouped_analysis(config)
+        
         results = {
             'summary': {},
             'models': {},
@@ -46,20 +347,22 @@ class TimeSeriesAnalyzer:
             results['error'] = 'statsmodels non installé. Installation requise: pip install statsmodels'
             return results
         
-        # Préparation des données
-        df = self.df.copy()
+        # Préparation des données (seules les colonnes date / cible sont copiées)
+        df = self.df[[config['date_column'], config['target_column']]].copy()
         df[config['date_column']] = pd.to_datetime(df[config['date_column']])
         df = df.sort_values(config['date_column'])
         df = df.set_index(config['date_column'])
         
-        # Série temporelle
+        # Série temporelle, rééchantillonnée si nécessaire
         ts = df[config['target_column']].dropna()
+        ts, results['resampling'] = self._resample_series(ts, config)
         
         # Tests de stationnarité
-        results['diagnostics']['stationarity'] = self._test_stationarity(ts)
+        max_points = config.get('diagnostics_max_points', 5000)
+        results['diagnostics']['stationarity'] = self._test_stationarity(ts, max_points)
         
         # ACF et PACF pour déterminer les paramètres ARIMA
-        results['diagnostics']['acf_pacf'] = self._calculate_acf_pacf(ts)
+        results['diagnostics']['acf_pacf'] = self._calculate_acf_pacf(ts, window=max_points)
         
         # Split train/test
         test_size = int(len(ts) * config.get('test_size', 0.2))
@@ -68,12 +371,31 @@ class TimeSeriesAnalyzer:
         
         methods = config.get('methods', ['arima'])
         
+        # Modèles de référence (vectorisés, quasi instantanés)
+        for method in methods:
+            if method in BASELINE_METHODS:
+                results['models'][method] = self._baseline_model(train, test, method, config)
+        
+        # Présélection: modèles lourds sautés si une référence gagne déjà un backtest rapide
+        if config.get('skip_heavy_models', False) and any(m in BASELINE_METHODS for m in methods):
+            results['screening'] = self._screen_heavy_models(ts, results['models'], config)
+            if results['screening'].get('skip_heavy'):
+                results['screening']['skipped_methods'] = [m for m in methods if m in HEAVY_METHODS]
+                methods = [m for m in methods if m not in HEAVY_METHODS]
+        
         # ARIMA
-        if 'arima' in methods:
+        auto_order = config.get('arima_order') == 'auto'
+        if 'arima' in methods and not auto_order:
             results['models']['arima'] = self._arima_model(
                 train, test, config
             )
         
+        # ARIMA / SARIMA à ordre automatique
+        if 'auto_arima' in methods or ('arima' in methods and auto_order):
+            results['models']['auto_arima'] = self._auto_arima_model(
+                train, test, config, results['diagnostics']['acf_pacf']
+            )
+        
         # SARIMA
         if 'sarima' in methods:
             results['models']['sarima'] = self._sarima_model(
@@ -83,7 +405,7 @@ class TimeSeriesAnalyzer:
         # Prophet
         if 'prophet' in methods and PROPHET_AVAILABLE:
             # Reconvertir pour Prophet (besoin d'un DataFrame avec colonnes 'ds' et 'y')
-            df_prophet = df[[config['target_column']]].reset_index()
+            df_prophet = ts.reset_index()
             df_prophet.columns = ['ds', 'y']
             
             train_prophet = df_prophet[:-test_size] if test_size > 0 else df_prophet
@@ -97,37 +419,593 @@ class TimeSeriesAnalyzer:
                 'error': 'Prophet non installé. Installation: pip install prophet'
             }
         
+        # Backtest à origine glissante (mise à jour de l'état, sans réajustement)
+        if config.get('backtest_folds', 0) > 0:
+            results['backtest'] = self._rolling_origin_backtest(ts, results['models'], config)
+        
         # Comparaison des modèles
-        results['summary'] = self._compare_time_series_models(results['models'])
+        results['summary'] = self._compare_time_series_models(results['models'], results.get('backtest'))
+        
+        # États sauvegardés pour /forecast (filtrage sur toute la série, sans réajustement)
+        self._save_forecast_states(ts, results['models'], results['summary'].get('best_model'))
+        if self._forecast_states:
+            results['forecast_state'] = {
+                'models': list(self._forecast_states),
+                'default_model': self._best_forecast_key
+            }
+        
+        response_mode = config.get('response_mode', 'full')
+        if response_mode == 'compact':
+            self._compact_payload(results, ts, len(train))
+        results['response_mode'] = response_mode
         
         return results
     
-    def _test_stationarity(self, ts):
-        """Test de Dickey-Fuller augmenté pour la stationnarité"""
-        result = adfuller(ts.dropna())
+    def _resample_series(self, ts, config):
+        """
+        Rééchantillonne la série (règle, agrégation, comblement des intervalles vides).
+        Sans règle explicite, les séries de plus de max_model_points points sont
+        ramenées au plus petit pas de RESAMPLE_LADDER qui respecte cette limite.
+        """
+        rule = config.get('resample_rule')
+        max_points = config.get('max_model_points', 5000)
+        info = {'original_points': int(len(ts)), 'resampled': False}
+        
+        if not rule and max_points and len(ts) > max_points:
+            span = (ts.index[-1] - ts.index[0]).total_seconds()
+            needed = span / max_points
+            rule = next((r for r in RESAMPLE_LADDER if pd.Timedelta(r).total_seconds() >= needed), RESAMPLE_LADDER[-1])
+            info['automatic_rule'] = True
+        
+        if rule:
+            aggregation = config.get('resample_agg', 'mean')
+            resampler = ts.resample(rule)
+            resampled = resampler.sum(min_count=1) if aggregation == 'sum' else getattr(resampler, aggregation)()
+            n_gaps = int(resampled.isna().sum())
+            fill = config.get('fill_method', 'interpolate')
+            if fill == 'interpolate':
+                resampled = resampled.interpolate(limit_direction='both')
+            elif fill == 'ffill':
+                resampled = resampled.ffill().bfill()
+            elif fill == 'zero':
+                resampled = resampled.fillna(0)
+            ts = resampled.dropna()
+            info.update({'resampled': True, 'rule': rule, 'aggregation': aggregation,
+                         'empty_intervals': n_gaps, 'fill_method': fill})
+        
+        info['effective_points'] = int(len(ts))
+        info['effective_resolution'] = rule or self._infer_resolution(ts.index)
+        return ts, info
+    
+    def _compact_payload(self, results, ts, train_length):
+        """
+        Réponse compacte: séries et paramètres en float32 base64 (utils.array_codec),
+        index décrits par début + fréquence + nombre de points au lieu de dates en texte.
+        """
+        freq = ts.index.freq
+        if freq is None and len(ts) >= 3:
+            inferred = pd.infer_freq(ts.index[:1000])
+            freq = pd.tseries.frequencies.to_offset(inferred) if inferred else None
+        
+        def index_payload(index):
+            if freq is not None:
+                return {'start': index[:1].astype(str)[0], 'freq': freq.freqstr, 'periods': int(len(index))}
+            return {'timestamps_ns': encode_array(index.asi8)}
+        
+        def encode(values):
+            return encode_array(values, np.float32) if values is not None else None
+        
+        for model in results['models'].values():
+            if 'error' in model:
+                continue
+            for key in ('test_actual', 'test_predictions'):
+                if model.get(key) is not None:
+                    model[key] = encode(model[key])
+            if model.get('test_index') is not None:
+                model['test_index'] = index_payload(ts.index[train_length:])
+            forecast = model.get('forecast')
+            if forecast:
+                for key in ('values', 'lower_bound', 'upper_bound'):
+                    forecast[key] = encode(forecast.get(key))
+                if freq is not None:
+                    start = pd.DatetimeIndex([ts.index[train_length - 1] + freq])
+                    forecast['index'] = {'start': start.astype(str)[0], 'freq': freq.freqstr,
+                                         'periods': int(forecast['periods'])}
+            summary = model.get('model_summary')
+            if summary:
+                model['model_summary'] = {
+                    'names': list(summary['parameters']),
+                    'parameters': encode(list(summary['parameters'].values())),
+                    'p_values': encode([summary['p_values'].get(name) for name in summary['parameters']])
+                }
+            if model.get('components'):
+                model['components'] = {k: encode(v) for k, v in model['components'].items()}
+        
+        for curves in (results.get('backtest') or {}).get('models', {}).values():
+            if 'per_horizon' in curves:
+                curves['per_horizon'] = {k: encode(v) for k, v in curves['per_horizon'].items()}
+        acf_pacf = results['diagnostics'].get('acf_pacf')
+        if acf_pacf:
+            acf_pacf['acf'], acf_pacf['pacf'] = encode(acf_pacf['acf']), encode(acf_pacf['pacf'])
+    
+    def _infer_resolution(self, index):
+        """Fréquence de l'index (inférée, sinon écart médian entre deux observations)."""
+        if len(index) < 3:
+            return None
+        try:
+            freq = pd.infer_freq(index[:1000])
+        except (TypeError, ValueError):
+            freq = None
+        return freq or str(pd.Series(index[:1000]).diff().median())
+    
+    def _test_stationarity(self, ts, max_points=None):
+        """Test de Dickey-Fuller augmenté pour la stationnarité (sur une série décimée si elle est longue)"""
+        ts = ts.dropna()
+        step = int(np.ceil(len(ts) / max_points)) if max_points and len(ts) > max_points else 1
+        result = adfuller(ts.iloc[::step])
         
         return {
             'adf_statistic': float(result[0]),
             'p_value': float(result[1]),
             'n_lags': int(result[2]),
             'n_observations': int(result[3]),
+            'decimation': step,
             'critical_values': {k: float(v) for k, v in result[4].items()},
             'is_stationary': result[1] < 0.05,
             'interpretation': 'Série stationnaire' if result[1] < 0.05 else 'Série non-stationnaire (différenciation nécessaire)'
         }
     
-    def _calculate_acf_pacf(self, ts, nlags=40):
-        """Calcul ACF et PACF pour déterminer les paramètres ARIMA"""
-        acf_values = acf(ts.dropna(), nlags=min(nlags, len(ts)//2 - 1))
-        pacf_values = pacf(ts.dropna(), nlags=min(nlags, len(ts)//2 - 1))
+    def _calculate_acf_pacf(self, ts, nlags=40, window=None):
+        """Calcul ACF (par FFT) et PACF, sur les `window` dernières observations, pour déterminer les paramètres ARIMA"""
+        values = ts.dropna()
+        if window and len(values) > window:
+            values = values.iloc[-window:]
+        nlags = min(nlags, len(values) // 2 - 1)
+        acf_values = acf(values, nlags=nlags, fft=True)
+        pacf_values = pacf(values, nlags=nlags)
         
         return {
             'acf': acf_values.tolist(),
             'pacf': pacf_values.tolist(),
+            'window': int(len(values)),
             'suggested_p': int(np.argmax(np.abs(pacf_values[1:]) < 0.2) + 1),  # Premier lag non significatif
             'suggested_q': int(np.argmax(np.abs(acf_values[1:]) < 0.2) + 1)
         }
     
+    def _grouped_analysis(self, config):
+        """
+        Prévisions par groupe: un seul groupby, une série par groupe ajustée
+        dans un pool de processus. Un groupe en échec est signalé sans
+        interrompre les autres; un classement agrège les métriques par modèle.
+        """
+        results = {
+            'summary': {},
+            'models': {},
+            'groups': {}
+        }
+        
+        if not STATSMODELS_AVAILABLE:
+            results['error'] = 'statsmodels non installé. Installation requise: pip install statsmodels'
+            return results
+        
+        group_column = config['group_column']
+        date_column, target_column = config['date_column'], config['target_column']
+        df = self.df[[group_column, date_column, target_column]].copy()
+        df[date_column] = pd.to_datetime(df[date_column])
+        df = df.sort_values([group_column, date_column])
+        
+        # Les groupes sont déjà parallélisés: pas de pool imbriqué dans chaque analyse
+        group_config = {**config, 'group_column': None, 'n_jobs': 1}
+        tasks = (
+            delayed(_analyze_series_group)(str(group), frame[[date_column, target_column]], group_config)
+            for group, frame in df.groupby(group_column, sort=False)
+        )
+        n_jobs = config.get('n_jobs', -1)
+        if n_jobs != 1:
+            outputs = Parallel(n_jobs=n_jobs, return_as='generator_unordered')(tasks)
+        else:
+            outputs = (fn(*args, **kwargs) for fn, args, kwargs in tasks)
+        
+        for group, output in outputs:
+            results['groups'][group] = output
+        results['groups'] = dict(sorted(results['groups'].items()))
+        
+        failed = [g for g, output in results['groups'].items() if 'error' in output]
+        results['summary'] = {
+            'n_groups': len(results['groups']),
+            'n_failed': len(failed),
+            'failed_groups': failed,
+            **self._group_leaderboard(results['groups'])
+        }
+        return results
+    
+    def _group_leaderboard(self, groups):
+        """Classement des modèles sur l'ensemble des groupes (victoires, puis MAPE médian)."""
+        per_model = {}
+        for output in groups.values():
+            for key, model in output.get('models', {}).items():
+                entry = per_model.setdefault(key, {'model': key, 'wins': 0, 'n_errors': 0, 'rmse': [], 'mae': [], 'mape': []})
+                if model.get('test_metrics'):
+                    for metric in ('rmse', 'mae', 'mape'):
+                        entry[metric].append(model['test_metrics'][metric])
+                else:
+                    entry['n_errors'] += 1
+                if output.get('best_model_key') == key:
+                    entry['wins'] += 1
+        
+        leaderboard = []
+        for entry in per_model.values():
+            values = {metric: np.asarray(entry.pop(metric), dtype=float) for metric in ('rmse', 'mae', 'mape')}
+            entry['n_groups'] = int(len(values['rmse']))
+            for metric, array in values.items():
+                finite = array[np.isfinite(array)]
+                entry[f'mean_{metric}'] = float(finite.mean()) if len(finite) else None
+                entry[f'median_{metric}'] = float(np.median(finite)) if len(finite) else None
+            leaderboard.append(entry)
+        leaderboard.sort(key=lambda e: (-e['wins'], e['median_mape'] if e['median_mape'] is not None else np.inf))
+        
+        return {
+            'best_model': leaderboard[0]['model'] if leaderboard else None,
+            'leaderboard': leaderboard
+        }
+    
+    def _baseline_model(self, train, test, method, config):
+        """Modèle de référence vectorisé (naïf, naïf saisonnier, dérive, lissage simple, Holt, Theta)"""
+        forecast_periods = config.get('forecast_periods', 30)
+        alpha = config.get('forecast_alpha', 0.05)
+        period = int(config.get('seasonal_period', 0) or 0)
+        
+        try:
+            values = np.asarray(train, dtype=float)
+            params = _fit_baseline(values, method, period)
+            origin = np.array([len(values)])
+            
+            # Prédictions sur le test set
+            if test is not None and len(test) > 0:
+                predictions = _baseline_forecast(values, origin, len(test), method, params, period)[0]
+                actual = np.asarray(test, dtype=float)
+                
+                # Calcul des métriques
+                test_metrics = _forecast_metrics(actual, predictions)
+                test_index = test.index.astype(str).tolist()
+            else:
+                predictions = None
+                test_metrics = None
+                test_index = None
+            
+            # Prévisions futures, intervalle approché sigma * sqrt(h)
+            future_forecast = _baseline_forecast(values, origin, forecast_periods, method, params, period)[0]
+            half_width = norm.ppf(1 - alpha / 2) * params['sigma'] * np.sqrt(np.arange(1, forecast_periods + 1))
+            
+            return {
+                'method': BASELINE_METHODS[method],
+                'baseline': True,
+                'parameters': {k: v for k, v in params.items() if k != 'sigma'},
+                'test_metrics': test_metrics,
+                'test_predictions': predictions.tolist() if predictions is not None else None,
+                'test_actual': test.tolist() if test is not None else None,
+                'test_index': test_index,
+                'forecast': {
+                    'values': future_forecast.tolist(),
+                    'lower_bound': (future_forecast - half_width).tolist(),
+                    'upper_bound': (future_forecast + half_width).tolist(),
+                    'periods': forecast_periods
+                },
+                'residuals_stats': {
+                    'std': params['sigma']
+                }
+            }
+        except Exception as e:
+            return {
+                'method': BASELINE_METHODS[method],
+                'error': str(e)
+            }
+    
+    def _screen_heavy_models(self, ts, models, config):
+        """
+        Backtest rapide des références contre une sonde ARIMA (un seul ajustement,
+        état étendu aux origines): si une référence fait au moins aussi bien,
+        les modèles lourds sont sautés.
+        """
+        order = config.get('arima_order', (1, 1, 1))
+        order = tuple(order) if order != 'auto' else (1, 1, 1)
+        candidates = {k: m for k, m in models.items() if m.get('baseline') and 'error' not in m}
+        candidates['arima'] = {'method': f'ARIMA{order}', 'order': order}
+        
+        backtest = self._rolling_origin_backtest(ts, candidates, {
+            **config, 'backtest_folds': config.get('screening_folds', 3)
+        })
+        if 'error' in backtest:
+            return {'skip_heavy': False, 'error': backtest['error']}
+        
+        scores = {k: m['rmse'] for k, m in backtest['models'].items() if 'rmse' in m}
+        baselines = {k: v for k, v in scores.items() if k != 'arima'}
+        if not baselines:
+            return {'skip_heavy': False, 'backtest_rmse': scores}
+        best_baseline = min(baselines, key=baselines.get)
+        probe = scores.get('arima', np.inf)
+        return {
+            'skip_heavy': bool(baselines[best_baseline] <= probe),
+            'best_baseline': best_baseline,
+            'probe': candidates['arima']['method'],
+            'backtest_rmse': scores
+        }
+    
+    def _state_space_builders(self, models):
+        """Constructeurs (valeurs -> modèle statsmodels non ajusté) des modèles ARIMA/SARIMA ajustés."""
+        builders = {}
+        for key, model in models.items():
+            if 'error' in model or 'order' not in model:
+                continue
+            order = tuple(model['order'])
+            if key == 'arima':
+                builders[key] = lambda values, order=order: ARIMA(values, order=order)
+            else:
+                seasonal_order = tuple(model.get('seasonal_order', (0, 0, 0, 0)))
+                builders[key] = lambda values, order=order, seasonal_order=seasonal_order: SARIMAX(
+                    values, order=order, seasonal_order=seasonal_order
+                )
+        return builders
+    
+    def _state_space_fitters(self, models):
+        """Fonctions d'ajustement (valeurs -> résultats statsmodels) des modèles ARIMA/SARIMA ajustés."""
+        def fit(model):
+            return model.fit() if isinstance(model, ARIMA) else model.fit(disp=False)
+        return {key: (lambda values, build=build: fit(build(values)))
+                for key, build in self._state_space_builders(models).items()}
+    
+    def _save_forecast_states(self, ts, models, best_method=None):
+        """Conserve l'état final de chaque ARIMA/SARIMA: paramètres ajustés sur le train, filtrés sur toute la série."""
+        self._forecast_states = {}
+        self._best_forecast_key = None
+        values = np.asarray(ts, dtype=float)
+        freq = ts.index.freq or (pd.tseries.frequencies.to_offset(pd.infer_freq(ts.index[:1000]))
+                                 if len(ts) >= 3 and pd.infer_freq(ts.index[:1000]) else None)
+        
+        for key, build in self._state_space_builders(models).items():
+            try:
+                params = np.asarray(list(models[key]['model_summary']['parameters'].values()), dtype=float)
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    results = build(values).filter(params)
+                self._forecast_states[key] = ForecastState(results, ts.index[-1], freq, models[key]['method'])
+            except Exception:
+                continue
+            if models[key]['method'] == best_method or self._best_forecast_key is None:
+                self._best_forecast_key = key
+    
+    @staticmethod
+    def _forecast_from_origin(base, values, start, origin, horizon):
+        """Prévision à partir d'une origine: l'état ajusté jusqu'à start est étendu aux observations suivantes."""
+        fitted = base.extend(values[start:origin]) if origin > start else base
+        return np.asarray(fitted.forecast(steps=horizon), dtype=float)
+    
+    @staticmethod
+    def _horizon_errors(actual, predicted):
+        """Erreurs par horizon (moyennées sur les origines) et globales; actual/predicted de forme (origines, horizon)."""
+        per_horizon = _forecast_metrics(actual, predicted, axis=0)
+        overall = _forecast_metrics(actual, predicted)
+        return {
+            'per_horizon': {metric: per_horizon[metric] for metric in ('mae', 'rmse', 'mape')},
+            'mae': overall['mae'],
+            'rmse': overall['rmse'],
+            'mape': overall['mape']
+        }
+    
+    def _rolling_origin_backtest(self, ts, models, config):
+        """
+        Backtest à origine glissante: chaque modèle est ajusté une seule fois
+        sur la fenêtre précédant la première origine, puis son état est étendu
+        (results.extend) aux observations de chaque origine, sans réajustement.
+        Les origines sont évaluées en parallèle (threads).
+        """
+        values = np.asarray(ts, dtype=float)
+        n = len(values)
+        horizon = config.get('backtest_horizon') or max(1, min(config.get('forecast_periods', 30), n // 10))
+        step = config.get('backtest_step') or horizon
+        min_train = config.get('backtest_min_train') or max(10, n // 2)
+        origins = [o for o in sorted(n - horizon - step * i for i in range(config.get('backtest_folds', 0)))
+                   if o >= min_train]
+        if not origins:
+            return {'error': 'Série trop courte pour le backtest demandé'}
+        
+        actual = np.stack([values[o:o + horizon] for o in origins])
+        backtest = {
+            'horizon': int(horizon),
+            'step': int(step),
+            'folds': len(origins),
+            'origins': [str(ts.index[o]) for o in origins],
+            'models': {}
+        }
+        
+        # Références: paramètres ajustés avant la première origine, toutes les origines en une passe
+        period = int(config.get('seasonal_period', 0) or 0)
+        for key, model in models.items():
+            if not model.get('baseline') or 'error' in model:
+                continue
+            params = _fit_baseline(values[:origins[0]], key, period)
+            predicted = _baseline_forecast(values, np.array(origins), horizon, key, params, period)
+            backtest['models'][key] = {
+                'method': model['method'],
+                'updating': 'vectorised',
+                **self._horizon_errors(actual, predicted)
+            }
+        
+        n_jobs = config.get('n_jobs', -1)
+        for key, fit in self._state_space_fitters(models).items():
+            try:
+                base = fit(values[:origins[0]])
+                tasks = [delayed(self._forecast_from_origin)(base, values, origins[0], o, horizon) for o in origins]
+                if n_jobs != 1 and len(tasks) > 1:
+                    predicted = Parallel(n_jobs=n_jobs, prefer='threads')(tasks)
+                else:
+                    predicted = [fn(*args, **kwargs) for fn, args, kwargs in tasks]
+                backtest['models'][key] = {
+                    'method': models[key]['method'],
+                    'updating': 'extend',
+                    **self._horizon_errors(actual, np.stack(predicted))
+                }
+            except Exception as e:
+                backtest['models'][key] = {'method': models[key]['method'], 'error': str(e)}
+        
+        return backtest
+    
+    def _select_differencing(self, values, max_d=2, alpha=0.05):
+        """Ordre d: différencie tant que l'ADF ne rejette pas la racine unitaire ou que le KPSS rejette la stationnarité."""
+        tests = []
+        d = 0
+        series = values
+        while True:
+            adf_p = float(adfuller(series, autolag='AIC')[1])
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                kpss_p = float(kpss(series, regression='c', nlags='auto')[1])
+            tests.append({'d': d, 'adf_p_value': adf_p, 'kpss_p_value': kpss_p})
+            if (adf_p < alpha and kpss_p >= alpha) or d >= max_d or len(series) < 10:
+                return d, tests
+            series = np.diff(series)
+            d += 1
+    
+    def _select_seasonal_differencing(self, values, d, period):
+        """Ordre D: 1 si la force saisonnière (STL) de la série différenciée dépasse 0.64."""
+        series = np.diff(values, n=d) if d > 0 else values
+        if period < 2 or len(series) < 2 * period + 1:
+            return 0, None
+        decomposition = STL(series, period=period).fit()
+        remainder = np.var(decomposition.resid)
+        total = np.var(decomposition.seasonal + decomposition.resid)
+        strength = max(0.0, 1.0 - remainder / total) if total > 0 else 0.0
+        return int(strength > 0.64), float(strength)
+    
+    def _fit_order_candidates(self, values, candidates, series_key, config, deadline):
+        """Ajuste les candidats (cache, puis pool de processus) jusqu'à épuisement du budget."""
+        maxiter = config.get('auto_maxiter', 50)
+        n_jobs = config.get('n_jobs', -1)
+        
+        records, pending = [], []
+        for order, seasonal_order in candidates:
+            key = (series_key, order, seasonal_order)
+            if key in _order_fit_cache:
+                _order_fit_cache.move_to_end(key)
+                records.append({**_order_fit_cache[key], 'cached': True})
+            else:
+                pending.append((order, seasonal_order))
+        
+        tasks = (delayed(_fit_order_candidate)(values, o, so, maxiter) for o, so in pending)
+        if n_jobs != 1 and len(pending) > 1:
+            fitted = Parallel(n_jobs=n_jobs, return_as='generator_unordered')(tasks)
+        else:
+            fitted = (fn(*args, **kwargs) for fn, args, kwargs in tasks)
+        
+        done = set()
+        for record in fitted:
+            key = (series_key, record['order'], record['seasonal_order'])
+            _order_fit_cache[key] = record
+            if len(_order_fit_cache) > ORDER_SEARCH_CACHE_SIZE:
+                _order_fit_cache.popitem(last=False)
+            records.append({**record, 'cached': False})
+            done.add((record['order'], record['seasonal_order']))
+            if time.perf_counter() > deadline:
+                break
+        if hasattr(fitted, 'close'):
+            fitted.close()
+        
+        skipped = [{'order': o, 'seasonal_order': so, 'aic': None, 'bic': None, 'status': 'skipped_time_budget'}
+                   for o, so in pending if (o, so) not in done]
+        return records, skipped
+    
+    def _search_order(self, train, config, acf_pacf=None):
+        """
+        Recherche (p,d,q)(P,D,Q,s) par AIC: d via ADF/KPSS, D via la force saisonnière,
+        puis recherche pas à pas (voisins ±1 du meilleur) ou grille complète.
+        """
+        values = np.asarray(train, dtype=float)
+        period = int(config.get('seasonal_period', 0) or 0)
+        max_p, max_q = config.get('auto_max_p', 3), config.get('auto_max_q', 3)
+        max_P, max_Q = (config.get('auto_max_P', 1), config.get('auto_max_Q', 1)) if period > 1 else (0, 0)
+        start = time.perf_counter()
+        deadline = start + config.get('auto_time_budget', 60)
+        
+        d, d_tests = self._select_differencing(values, config.get('auto_max_d', 2))
+        D, seasonal_strength = self._select_seasonal_differencing(values, d, period) if period > 1 else (0, None)
+        
+        def candidate(p, q, P=0, Q=0):
+            p, q, P, Q = min(max(p, 0), max_p), min(max(q, 0), max_q), min(max(P, 0), max_P), min(max(Q, 0), max_Q)
+            return (p, d, q), ((P, D, Q, period) if period > 1 else (0, 0, 0, 0))
+        
+        if config.get('auto_stepwise', True):
+            # Point de départ de Hyndman-Khandakar + ordres suggérés par l'ACF/PACF
+            candidates = [candidate(2, 2, 1, 1), candidate(0, 0), candidate(1, 0, 1, 0), candidate(0, 1, 0, 1)]
+            if acf_pacf:
+                candidates.append(candidate(acf_pacf.get('suggested_p', 1), acf_pacf.get('suggested_q', 1)))
+        else:
+            candidates = [candidate(p, q, P, Q) for p in range(max_p + 1) for q in range(max_q + 1)
+                          for P in range(max_P + 1) for Q in range(max_Q + 1)]
+        
+        series_key = hashlib.sha1(values.tobytes()).hexdigest()
+        tried, trace = set(), []
+        best = None
+        step = 0
+        budget_exhausted = False
+        while candidates:
+            batch = list(dict.fromkeys(c for c in candidates if c not in tried))
+            if not batch:
+                break
+            tried.update(batch)
+            records, skipped = self._fit_order_candidates(values, batch, series_key, config, deadline)
+            improved = False
+            for record in sorted(records, key=lambda r: (r['aic'] is None, r['aic'] or 0)):
+                trace.append({**record, 'step': step})
+                if record['status'] == 'ok' and (best is None or record['aic'] < best['aic']):
+                    best = record
+                    improved = True
+            trace.extend({**record, 'step': step} for record in skipped)
+            if skipped or time.perf_counter() > deadline:
+                budget_exhausted = True
+                break
+            if not improved or not config.get('auto_stepwise', True):
+                break
+            # Voisins du meilleur modèle (les candidats non convergés ne sont pas étendus)
+            (p, _, q), (P, _, Q, _) = best['order'], best['seasonal_order']
+            candidates = [candidate(p + dp, q + dq, P, Q) for dp, dq in
+                          [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (1, 1)]]
+            if period > 1:
+                candidates += [candidate(p, q, P + dP, Q + dQ) for dP, dQ in
+                               [(-1, 0), (1, 0), (0, -1), (0, 1)]]
+            step += 1
+        
+        return {
+            'best': best,
+            'd_selection': {'d': d, 'tests': d_tests},
+            'seasonal_selection': {'D': D, 'period': period, 'seasonal_strength': seasonal_strength},
+            'trace': trace,
+            'n_fitted': sum(1 for r in trace if r.get('cached') is False),
+            'n_cached': sum(1 for r in trace if r.get('cached') is True),
+            'n_pruned': sum(1 for r in trace if r['status'] in ('not_converged', 'failed')),
+            'budget_exhausted': budget_exhausted,
+            'elapsed_seconds': time.perf_counter() - start
+        }
+    
+    def _auto_arima_model(self, train, test, config, acf_pacf=None):
+        """ARIMA / SARIMA dont l'ordre est choisi automatiquement (AIC)"""
+        try:
+            search = self._search_order(train, config, acf_pacf)
+        except Exception as e:
+            return {'method': 'Auto-ARIMA', 'error': str(e)}
+        
+        best = search['best']
+        if best is None:
+            return {'method': 'Auto-ARIMA', 'error': 'Aucun candidat n\'a convergé', 'search': search}
+        
+        order, seasonal_order = best['order'], best['seasonal_order']
+        result = self._sarima_model(train, test, {
+            **config, 'sarima_order': order, 'sarima_seasonal_order': seasonal_order
+        })
+        result['method'] = (f'Auto-SARIMA{order}x{seasonal_order}' if seasonal_order[3] > 1
+                            else f'Auto-ARIMA{order}')
+        result['search'] = search
+        return result
+    
     def _arima_model(self, train, test, config):
         """Modèle ARIMA"""
         order = config.get('arima_order', (1, 1, 1))
@@ -143,18 +1021,8 @@ class TimeSeriesAnalyzer:
             if test is not None and len(test) > 0:
                 predictions = fitted_model.forecast(steps=len(test))
                 
-                # Calcul des métriques
-                mse = np.mean((test - predictions) ** 2)
-                rmse = np.sqrt(mse)
-                mae = np.mean(np.abs(test - predictions))
-                mape = np.mean(np.abs((test - predictions) / test)) * 100
-                
-                test_metrics = {
-                    'mse': float(mse),
-                    'rmse': float(rmse),
-                    'mae': float(mae),
-                    'mape': float(mape)
-                }
+                # Calcul des métriques (alignement positionnel)
+                test_metrics = _forecast_metrics(test, predictions)
                 test_index = test.index.astype(str).tolist()
             else:
                 predictions = None
@@ -213,18 +1081,8 @@ class TimeSeriesAnalyzer:
             if test is not None and len(test) > 0:
                 predictions = fitted_model.forecast(steps=len(test))
                 
-                # Calcul des métriques
-                mse = np.mean((test - predictions) ** 2)
-                rmse = np.sqrt(mse)
-                mae = np.mean(np.abs(test - predictions))
-                mape = np.mean(np.abs((test - predictions) / test)) * 100
-                
-                test_metrics = {
-                    'mse': float(mse),
-                    'rmse': float(rmse),
-                    'mae': float(mae),
-                    'mape': float(mape)
-                }
+                # Calcul des métriques (alignement positionnel)
+                test_metrics = _forecast_metrics(test, predictions)
                 test_index = test.index.astype(str).tolist()
             else:
                 predictions = None
@@ -287,17 +1145,7 @@ class TimeSeriesAnalyzer:
                 actual = test_df['y'].values
                 
                 # Calcul des métriques
-                mse = np.mean((actual - predictions) ** 2)
-                rmse = np.sqrt(mse)
-                mae = np.mean(np.abs(actual - predictions))
-                mape = np.mean(np.abs((actual - predictions) / actual)) * 100
-                
-                test_metrics = {
-                    'mse': float(mse),
-                    'rmse': float(rmse),
-                    'mae': float(mae),
-                    'mape': float(mape)
-                }
+                test_metrics = _forecast_metrics(actual, predictions)
             else:
                 test_metrics = None
             
@@ -329,28 +1177,35 @@ class TimeSeriesAnalyzer:
                 'error': str(e)
             }
     
-    def _compare_time_series_models(self, models):
+    def _compare_time_series_models(self, models, backtest=None):
         """Compare les performances des modèles de séries temporelles"""
         comparison = []
+        backtested = (backtest or {}).get('models', {})
         
         for name, model_result in models.items():
             if 'error' not in model_result and model_result.get('test_metrics'):
-                comparison.append({
+                entry = {
                     'model': model_result['method'],
                     'rmse': model_result['test_metrics']['rmse'],
                     'mae': model_result['test_metrics']['mae'],
                     'mape': model_result['test_metrics']['mape'],
                     'aic': model_result.get('aic'),
                     'bic': model_result.get('bic')
-                })
+                }
+                if 'rmse' in backtested.get(name, {}):
+                    entry['backtest_rmse'] = backtested[name]['rmse']
+                    entry['backtest_mae'] = backtested[name]['mae']
+                comparison.append(entry)
         
-        # Trier par RMSE (plus bas = meilleur)
+        # Trier par RMSE du backtest si tous les modèles en ont un, sinon du holdout (plus bas = meilleur)
+        ranking_basis = 'backtest' if comparison and all('backtest_rmse' in c for c in comparison) else 'holdout'
         if comparison:
-            comparison.sort(key=lambda x: x['rmse'])
+            comparison.sort(key=lambda x: x['backtest_rmse'] if ranking_basis == 'backtest' else x['rmse'])
             
             return {
                 'best_model': comparison[0]['model'],
                 'comparison': comparison,
+                'ranking_basis': ranking_basis,
                 'recommendation': f"Le modèle {comparison[0]['model']} a la meilleure performance avec RMSE={comparison[0]['rmse']:.4f}"
             }
         else:
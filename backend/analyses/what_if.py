@@ -4,9 +4,38 @@ What-If analysis and counterfactual explanations.
 
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 from typing import Dict, List, Any, Tuple, Optional
 
 
+# Candidate counterfactuals scored per predict call by the tree solver
+TREE_CANDIDATE_BATCH = 1024
+# Valid tree candidates refined by the shrink passes
+SHRINK_CANDIDATES = 16
+# Default number of grid points per feature for partial dependence
+SENSITIVITY_GRID_POINTS = 20
+# Cells (repetitions x rows x features) perturbed per stress-test predict call
+STRESS_BATCH_CELLS = 10000000
+
+
+class ScaledModel:
+    """Fitted scaler (or other transformer) + estimator exposed as one model on raw features."""
+    
+    def __init__(self, model, scaler):
+        self.model = model
+        self.scaler = scaler
+    
+    @property
+    def classes_(self):
+        return self.model.classes_
+    
+    def predict(self, X):
+        return self.model.predict(self.scaler.transform(X))
+    
+    def predict_proba(self, X):
+        return self.model.predict_proba(self.scaler.transform(X))
+
+
 class WhatIfAnalyzer:
     """Provide counterfactual explanations and what-if scenarios."""
     
@@ -14,19 +43,35 @@ class WhatIfAnalyzer:
     def find_counterfactual(model, X_sample: np.ndarray, feature_names: List[str],
                            current_prediction: int, desired_prediction: int,
                            feature_ranges: Dict[str, Tuple[float, float]],
-                           max_changes: int = 3, max_iterations: int = 100) -> Dict[str, Any]:
+                           max_changes: int = 3, max_iterations: int = 20,
+                           population_size: int = 200, sparsity_weight: float = 0.1,
+                           random_state: Optional[int] = None,
+                           solver: str = 'auto') -> Dict[str, Any]:
         """
         Find minimal changes needed to flip prediction.
         
+        Model-aware solvers are tried first: a closed-form minimal-L2 move for
+        linear models (``coef_``) and leaf-box enumeration for decision trees and
+        forests. Other models, or a solver that finds nothing, fall back to the
+        batched evolutionary search: each generation is a (population_size x
+        n_features) candidate matrix scored with a single predict call. Valid
+        candidates are refined by shrinking their changes toward the original
+        sample and by dropping changed features; a share of each generation
+        stays random for exploration.
+        
         Args:
-            model: Trained model
+            model: Trained model (or ScaledModel wrapping a scaler + estimator)
             X_sample: Current feature values
             feature_names: List of feature names
             current_prediction: Current predicted class
             desired_prediction: Desired predicted class
             feature_ranges: Dictionary of valid ranges for each feature
             max_changes: Maximum number of features to change
-            max_iterations: Maximum iterations to try
+            max_iterations: Maximum number of generations
+            population_size: Candidates scored per generation
+            sparsity_weight: Distance penalty per changed feature
+            random_state: Seed for reproducible searches
+            solver: 'auto', 'linear', 'tree' or 'random'
             
         Returns:
             Counterfactual explanation with suggested changes
@@ -37,65 +82,463 @@ class WhatIfAnalyzer:
                 'message': 'Model does not support prediction'
             }
         
-        # Store original values
-        original_values = X_sample.copy()
+        original_values = np.asarray(X_sample, dtype=float).ravel()
+        n_features = len(original_values)
+        
+        # Only features with a known range can be changed
+        mutable = np.array([f in feature_ranges for f in feature_names], dtype=bool)
+        if not mutable.any():
+            return {
+                'found': False,
+                'message': 'No feature ranges available to search counterfactuals'
+            }
+        low = np.array([feature_ranges[f][0] if m else 0.0 for f, m in zip(feature_names, mutable)], dtype=float)
+        high = np.array([feature_ranges[f][1] if m else 0.0 for f, m in zip(feature_names, mutable)], dtype=float)
+        scale = np.where(high - low > 0, high - low, 1.0)
+        max_changes = max(1, min(max_changes, int(mutable.sum())))
+        
+        def distances(candidates):
+            # Sparsity-aware distance: range-normalised L1 + penalty per changed feature
+            diff = np.abs(candidates - original_values) / scale
+            return diff.sum(axis=1) + sparsity_weight * (diff > 1e-9).sum(axis=1)
+        
+        if solver != 'random':
+            solved = WhatIfAnalyzer._model_aware_counterfactual(
+                model, original_values, desired_prediction, low, high, scale,
+                mutable, max_changes, solver
+            )
+            if solved is not None:
+                candidate, used_solver, evaluated = solved
+                return WhatIfAnalyzer._format_counterfactual(
+                    original_values, candidate, feature_names,
+                    sparse_distance=float(distances(candidate[np.newaxis, :])[0]),
+                    solver=used_solver,
+                    candidates_evaluated=evaluated
+                )
+        
+        rng = np.random.default_rng(random_state)
+        
+        def random_candidates(n):
+            # Random subset of at most max_changes mutable features per row
+            n_changes = rng.integers(1, max_changes + 1, size=n)
+            keys = np.where(mutable, rng.random((n, n_features)), np.inf)
+            ranks = np.argsort(np.argsort(keys, axis=1), axis=1)
+            mask = ranks < n_changes[:, np.newaxis]
+            values = low + (high - low) * rng.random((n, n_features))
+            return np.where(mask, values, original_values)
+        
         best_candidate = None
-        min_distance = float('inf')
+        best_distance = np.inf
+        elite = np.empty((0, n_features))
+        evaluated = 0
+        stale_generations = 0
+        generation = 0
         
-        # Try random perturbations
-        for _ in range(max_iterations):
-            # Create a perturbed sample
-            perturbed = X_sample.copy()
-            
-            # Randomly select features to change (up to max_changes)
-            num_changes = np.random.randint(1, max_changes + 1)
-            features_to_change = np.random.choice(len(feature_names), num_changes, replace=False)
+        for generation in range(1, max_iterations + 1):
+            if len(elite) == 0:
+                population = random_candidates(population_size)
+            else:
+                n_random = population_size // 4
+                n_children = population_size - n_random
+                parents = elite[rng.integers(0, len(elite), size=n_children)]
+                # Shrink changes toward the original sample
+                shrink = rng.random((n_children, 1))
+                children = original_values + shrink * (parents - original_values)
+                # Drop one changed feature for half of the children
+                drop = rng.random(n_children) < 0.5
+                changed = np.abs(parents - original_values) > 1e-9
+                drop_keys = np.where(changed, rng.random(changed.shape), -1.0)
+                drop_idx = np.argmax(drop_keys, axis=1)
+                rows = np.flatnonzero(drop & changed.any(axis=1))
+                children[rows, drop_idx[rows]] = original_values[drop_idx[rows]]
+                population = np.vstack([children, random_candidates(n_random)])
             
-            for idx in features_to_change:
-                feature = feature_names[idx]
-                if feature in feature_ranges:
-                    min_val, max_val = feature_ranges[feature]
-                    # Random value within range
-                    perturbed[idx] = np.random.uniform(min_val, max_val)
+            # One predict call per generation
+            valid = np.asarray(model.predict(population)) == desired_prediction
+            evaluated += len(population)
             
-            # Check prediction
-            pred = model.predict(perturbed.reshape(1, -1))[0]
+            improved = False
+            if valid.any():
+                candidates = population[valid]
+                candidate_distances = distances(candidates)
+                order = np.argsort(candidate_distances)
+                if candidate_distances[order[0]] < best_distance - 1e-12:
+                    best_distance = float(candidate_distances[order[0]])
+                    best_candidate = candidates[order[0]].copy()
+                    improved = True
+                elite = candidates[order[:max(1, population_size // 10)]]
             
-            if pred == desired_prediction:
-                # Calculate distance from original
-                distance = np.sum((perturbed - original_values) ** 2)
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    best_candidate = perturbed.copy()
+            if best_candidate is not None:
+                stale_generations = 0 if improved else stale_generations + 1
+                if stale_generations >= 3:
+                    break
         
         if best_candidate is not None:
-            # Extract changes
-            changes = []
-            for idx, (orig, new) in enumerate(zip(original_values, best_candidate)):
-                if abs(orig - new) > 1e-6:
-                    change_pct = ((new - orig) / orig * 100) if orig != 0 else 0
-                    changes.append({
-                        'feature': feature_names[idx],
-                        'original_value': float(orig),
-                        'suggested_value': float(new),
-                        'change': float(new - orig),
-                        'change_percentage': float(change_pct)
-                    })
-            
-            return {
-                'found': True,
-                'changes': changes,
-                'num_changes': len(changes),
-                'distance': float(min_distance),
-                'message': f'Found counterfactual with {len(changes)} changes'
-            }
+            result = WhatIfAnalyzer._format_counterfactual(
+                original_values, best_candidate, feature_names,
+                sparse_distance=best_distance,
+                solver='random_search',
+                candidates_evaluated=evaluated
+            )
+            result['generations'] = int(generation)
+            return result
         
         return {
             'found': False,
-            'message': f'Could not find counterfactual within {max_iterations} iterations'
+            'solver': 'random_search',
+            'candidates_evaluated': int(evaluated),
+            'message': f'Could not find counterfactual within {max_iterations} generations ({evaluated} candidates)'
+        }
+    
+    @staticmethod
+    def _format_counterfactual(original_values: np.ndarray, candidate: np.ndarray,
+                               feature_names: List[str], sparse_distance: float,
+                               solver: str, candidates_evaluated: int) -> Dict[str, Any]:
+        """Build the counterfactual payload from the original and suggested vectors."""
+        changes = []
+        for idx in np.flatnonzero(np.abs(candidate - original_values) > 1e-6):
+            orig, new = original_values[idx], candidate[idx]
+            change_pct = ((new - orig) / orig * 100) if orig != 0 else 0
+            changes.append({
+                'feature': feature_names[idx],
+                'original_value': float(orig),
+                'suggested_value': float(new),
+                'change': float(new - orig),
+                'change_percentage': float(change_pct)
+            })
+        
+        return {
+            'found': True,
+            'changes': changes,
+            'num_changes': len(changes),
+            'distance': float(np.sum((candidate - original_values) ** 2)),
+            'sparse_distance': float(sparse_distance),
+            'solver': solver,
+            'candidates_evaluated': int(candidates_evaluated),
+            'message': f'Found counterfactual with {len(changes)} changes'
         }
     
+    @staticmethod
+    def _model_aware_counterfactual(model, x: np.ndarray, desired_prediction,
+                                    low: np.ndarray, high: np.ndarray, scale: np.ndarray,
+                                    mutable: np.ndarray, max_changes: int,
+                                    solver: str = 'auto') -> Optional[Tuple[np.ndarray, str, int]]:
+        """
+        Solve the counterfactual in the estimator's input space.
+        
+        A ScaledModel is unwrapped so coefficients and split thresholds apply
+        directly; the sample and its box constraints go through the (affine)
+        scaler and the solution comes back through its inverse. Returns
+        (candidate, solver name, candidates evaluated) once the full model
+        confirms the flip, or None.
+        """
+        estimator, scaler = (model.model, model.scaler) if isinstance(model, ScaledModel) else (model, None)
+        classes = getattr(estimator, 'classes_', None)
+        if classes is None:
+            return None
+        desired_index = np.flatnonzero(np.asarray(classes) == desired_prediction)
+        if len(desired_index) == 0:
+            return None
+        desired_index = int(desired_index[0])
+        
+        if solver == 'auto':
+            if hasattr(estimator, 'coef_') and getattr(estimator, 'kernel', 'linear') == 'linear':
+                solver = 'linear'
+            elif hasattr(estimator, 'tree_') or WhatIfAnalyzer._is_tree_ensemble(estimator):
+                solver = 'tree'
+            else:
+                return None
+        
+        if scaler is not None:
+            to_input = lambda v: scaler.transform(v.reshape(1, -1))[0]
+            x_in = to_input(x)
+            low_in, high_in = to_input(low), to_input(high)
+            # Normalisation (range widths) expressed in input units
+            scale_in = np.abs(to_input(low + scale) - low_in)
+            scale_in = np.where(scale_in > 0, scale_in, 1.0)
+        else:
+            x_in, low_in, high_in, scale_in = x, low, high, scale
+        
+        try:
+            if solver == 'linear':
+                candidates = WhatIfAnalyzer._linear_counterfactual(
+                    estimator, x_in, desired_index, low_in, high_in, scale_in, mutable, max_changes
+                )
+                name = 'linear_closed_form'
+            elif solver == 'tree':
+                candidates = WhatIfAnalyzer._tree_counterfactual(
+                    estimator, x_in, desired_index, low_in, high_in, scale_in, mutable, max_changes
+                )
+                name = 'tree_leaf_projection'
+            else:
+                return None
+        except (AttributeError, ValueError):
+            return None
+        
+        evaluated = 0
+        for batch in candidates:
+            if scaler is not None:
+                changed = np.abs(batch - x_in) > 0
+                batch = np.where(changed, scaler.inverse_transform(batch), x)
+            valid = np.flatnonzero(np.asarray(model.predict(batch)) == desired_prediction)
+            evaluated += len(batch)
+            if len(valid) == 0:
+                continue
+            if name == 'linear_closed_form' or hasattr(estimator, 'tree_'):
+                # Exact for a single tree: batches are sorted by distance
+                return batch[valid[0]], name, evaluated
+            # Ensemble votes can move the boundary inside the leaf box: pull the
+            # closest boxes back toward the sample before picking the best one
+            candidate, n_scored = WhatIfAnalyzer._shrink_counterfactual(
+                model, x, batch[valid[:SHRINK_CANDIDATES]], desired_prediction, scale
+            )
+            return candidate, name, evaluated + n_scored
+        return None
+    
+    @staticmethod
+    def _shrink_counterfactual(model, x: np.ndarray, candidates: np.ndarray, desired_prediction,
+                               scale: np.ndarray, n_steps: int = 32,
+                               n_rounds: int = 3) -> Tuple[np.ndarray, int]:
+        """
+        Move valid counterfactuals back toward the sample while they stay valid.
+        
+        A segment pass scores x + t (c - x) on a grid of t for every candidate,
+        then coordinate passes pull one changed feature at a time; each pass is
+        a single predict call. Returns the closest candidate (range-normalised
+        L2) and the number of rows scored.
+        """
+        grid = np.linspace(0.0, 1.0, n_steps + 1)[1:]
+        best = candidates.copy()
+        n_candidates, n_features = best.shape
+        
+        points = x + grid[np.newaxis, :, np.newaxis] * (best - x)[:, np.newaxis, :]
+        valid = np.asarray(model.predict(points.reshape(-1, n_features))) == desired_prediction
+        valid = valid.reshape(n_candidates, n_steps)
+        valid[:, -1] = True
+        best = points[np.arange(n_candidates), np.argmax(valid, axis=1)]
+        evaluated = n_candidates * n_steps
+        
+        for _ in range(n_rounds):
+            rows, cols = np.nonzero(np.abs(best - x) > 0)
+            if len(rows) == 0:
+                break
+            trials = np.repeat(best[rows], n_steps, axis=0)
+            pair = np.repeat(np.arange(len(rows)), n_steps)
+            step = np.tile(grid, len(rows))
+            trial_cols = cols[pair]
+            trials[np.arange(len(trials)), trial_cols] = x[trial_cols] + step * (best[rows[pair], trial_cols] - x[trial_cols])
+            ok = np.asarray(model.predict(trials)) == desired_prediction
+            evaluated += len(trials)
+            
+            # Largest distance saving per candidate among the valid single-feature pulls
+            full = ((best[rows[pair], trial_cols] - x[trial_cols]) / scale[trial_cols]) ** 2
+            pulled = ((trials[np.arange(len(trials)), trial_cols] - x[trial_cols]) / scale[trial_cols]) ** 2
+            saving = np.where(ok, full - pulled, 0.0)
+            improved = False
+            for row in range(n_candidates):
+                options = np.flatnonzero(rows[pair] == row)
+                if len(options) == 0:
+                    continue
+                pick = options[np.argmax(saving[options])]
+                if saving[pick] > 1e-12:
+                    best[row] = trials[pick]
+                    improved = True
+            if not improved:
+                break
+        
+        distances = (((best - x) / scale) ** 2).sum(axis=1)
+        return best[np.argmin(distances)], evaluated
+    
+    @staticmethod
+    def _is_tree_ensemble(estimator) -> bool:
+        """Ensemble of classification trees voting on the ensemble's class indices."""
+        members = getattr(estimator, 'estimators_', None)
+        if members is None or isinstance(members, np.ndarray) and members.ndim > 1:
+            return False
+        return len(members) > 0 and all(hasattr(m, 'tree_') and hasattr(m, 'classes_') for m in members)
+    
+    @staticmethod
+    def _linear_counterfactual(estimator, x: np.ndarray, desired_index: int,
+                               low: np.ndarray, high: np.ndarray, scale: np.ndarray,
+                               mutable: np.ndarray, max_changes: int):
+        """
+        Closed-form minimal-L2 move for linear classifiers.
+        
+        The desired class must beat its strongest competitor: w.x + b > 0 with
+        w, b the difference of their decision functions. The minimal
+        range-normalised L2 step onto that half-space is
+        delta_j = gap * scale_j^2 * w_j / sum(scale^2 w^2) over the allowed
+        features (the max_changes most influential ones); features that hit
+        their range bound are frozen there and the remaining gap is
+        re-projected on the others. Multiclass models repeat the projection
+        until the desired class is the argmax.
+        
+        Yields one (n_margins x n_features) batch of candidates of increasing margin.
+        """
+        coef = np.atleast_2d(np.asarray(estimator.coef_, dtype=float))
+        intercept = np.atleast_1d(np.asarray(estimator.intercept_, dtype=float))
+        n_classes = len(estimator.classes_)
+        if coef.shape[0] == 1 and n_classes == 2:
+            sign = 1.0 if desired_index == 1 else -1.0
+            coef = np.vstack([-sign * coef[0] / 2, sign * coef[0] / 2])
+            intercept = np.array([-sign * intercept[0] / 2, sign * intercept[0] / 2])
+            desired_index = 1
+        elif coef.shape[0] != n_classes:
+            # One-vs-one coefficients (multiclass SVC) have no single argmax form
+            return
+        
+        def project(point, w, b, allowed, margin):
+            delta = np.zeros_like(point)
+            free = allowed.copy()
+            for _ in range(len(point)):
+                gap = margin - (w @ (point + delta) + b)
+                if gap <= 0:
+                    return point + delta
+                direction = np.where(free, scale ** 2 * w, 0.0)
+                denom = w @ direction
+                if denom <= 0:
+                    return None
+                proposal = point + delta + gap / denom * direction
+                clipped = np.clip(proposal, low, high)
+                hit = free & (np.abs(clipped - proposal) > 0)
+                delta = np.where(free, clipped - point, delta)
+                if not hit.any():
+                    return point + delta
+                free &= ~hit
+            return None
+        
+        candidates = []
+        magnitude = 1.0 + np.abs(intercept).max() + np.abs(coef).max() * np.abs(x).sum()
+        for margin in magnitude * np.array([1e-9, 1e-6, 1e-3]):
+            point = x.copy()
+            for _ in range(2 * n_classes):
+                scores = coef @ point + intercept
+                rivals = np.delete(np.arange(n_classes), desired_index)
+                rival = rivals[np.argmax(scores[rivals])]
+                if scores[desired_index] - scores[rival] > margin:
+                    break
+                w = coef[desired_index] - coef[rival]
+                b = intercept[desired_index] - intercept[rival]
+                # Features already moved stay allowed; fill up with the most influential ones
+                changed = np.abs(point - x) > 0
+                room = np.where(w > 0, point < high, point > low)
+                influence = np.where(mutable & room & ~changed, np.abs(w) * scale, -np.inf)
+                n_extra = max_changes - int(changed.sum())
+                allowed = changed.copy()
+                if n_extra > 0:
+                    top = np.argsort(-influence)[:n_extra]
+                    allowed[top[np.isfinite(influence[top])]] = True
+                point = project(point, w, b, allowed, margin)
+                if point is None:
+                    break
+            if point is not None:
+                candidates.append(point)
+        if candidates:
+            yield np.array(candidates)
+    
+    @staticmethod
+    def _tree_counterfactual(estimator, x: np.ndarray, desired_index: int,
+                             low: np.ndarray, high: np.ndarray, scale: np.ndarray,
+                             mutable: np.ndarray, max_changes: int):
+        """
+        Leaf-box projection for decision trees and tree ensembles.
+        
+        Every root-to-leaf path of a leaf voting for the desired class defines
+        a box; projecting the sample into it changes only the features whose
+        split conditions it violates. All leaves of all trees are enumerated
+        at once (vectorised walk from the leaves to the root), infeasible boxes
+        (outside the feature ranges, immutable features, more than max_changes
+        changes) are dropped and the rest are yielded in batches sorted by
+        range-normalised L2 distance, so the caller can stop at the first batch
+        holding a valid counterfactual.
+        """
+        trees = [estimator] if hasattr(estimator, 'tree_') else list(estimator.estimators_)
+        n_features = len(x)
+        leaf_rows, leaf_features, leaf_thresholds, leaf_left = [], [], [], []
+        n_leaves = 0
+        for tree in trees:
+            structure = tree.tree_
+            children_left, children_right = structure.children_left, structure.children_right
+            leaves = np.flatnonzero(children_left == -1)
+            # Trees of an ensemble are fitted on class indices of the ensemble
+            votes = np.argmax(structure.value[leaves, 0, :], axis=1)
+            target = leaves[votes == desired_index]
+            if len(target) == 0:
+                continue
+            internal = np.flatnonzero(children_left != -1)
+            parent = np.full(structure.node_count, -1)
+            parent[children_left[internal]] = internal
+            parent[children_right[internal]] = internal
+            is_left = np.zeros(structure.node_count, dtype=bool)
+            is_left[children_left[internal]] = True
+            
+            node, row = target, np.arange(n_leaves, n_leaves + len(target))
+            while len(node):
+                up = parent[node]
+                alive = up >= 0
+                node, row, up = node[alive], row[alive], up[alive]
+                leaf_rows.append(row)
+                leaf_features.append(structure.feature[up])
+                leaf_thresholds.append(structure.threshold[up])
+                leaf_left.append(is_left[node])
+                node = up
+            n_leaves += len(target)
+        if n_leaves == 0:
+            return
+        
+        rows = np.concatenate(leaf_rows)
+        features = np.concatenate(leaf_features).astype(np.int64)
+        thresholds = np.concatenate(leaf_thresholds)
+        go_left = np.concatenate(leaf_left)
+        
+        # Tightest bound per (leaf, feature): left branch x <= t, right branch x > t
+        keys, inverse = np.unique(rows * n_features + features, return_inverse=True)
+        lower = np.full(len(keys), -np.inf)
+        upper = np.full(len(keys), np.inf)
+        np.maximum.at(lower, inverse[~go_left], thresholds[~go_left])
+        np.minimum.at(upper, inverse[go_left], thresholds[go_left])
+        key_leaf, key_feature = keys // n_features, keys % n_features
+        
+        # Trees compare float32 inputs: use the first float32 value past each bound
+        with np.errstate(over='ignore', invalid='ignore'):
+            above = lower.astype(np.float32)
+            above = np.where(above.astype(float) <= lower, np.nextafter(above, np.float32(np.inf)), above)
+            below = upper.astype(np.float32)
+            below = np.where(below.astype(float) > upper, np.nextafter(below, np.float32(-np.inf)), below)
+        current = x[key_feature]
+        need_up = current <= lower
+        need_down = current > upper
+        value = np.where(need_up, above.astype(float), np.where(need_down, below.astype(float), current))
+        changed = need_up | need_down
+        tolerance = 1e-9 * scale[key_feature]
+        infeasible = changed & (
+            ~mutable[key_feature]
+            | (value < low[key_feature] - tolerance)
+            | (value > high[key_feature] + tolerance)
+            | (value <= lower) | (value > upper)
+        )
+        
+        n_changes = np.bincount(key_leaf, weights=changed, minlength=n_leaves)
+        blocked = np.bincount(key_leaf, weights=infeasible, minlength=n_leaves) > 0
+        step = np.where(changed, ((value - current) / scale[key_feature]) ** 2, 0.0)
+        distance = np.bincount(key_leaf, weights=step, minlength=n_leaves)
+        
+        feasible = np.flatnonzero(~blocked & (n_changes >= 1) & (n_changes <= max_changes))
+        if len(feasible) == 0:
+            return
+        order = feasible[np.argsort(distance[feasible], kind='stable')]
+        
+        for start in range(0, len(order), TREE_CANDIDATE_BATCH):
+            batch_leaves = order[start:start + TREE_CANDIDATE_BATCH]
+            position = np.full(n_leaves, -1)
+            position[batch_leaves] = np.arange(len(batch_leaves))
+            batch = np.tile(x, (len(batch_leaves), 1))
+            selected = changed & (position[key_leaf] >= 0)
+            batch[position[key_leaf[selected]], key_feature[selected]] = value[selected]
+            # Leaves sharing the same projection are scored once
+            _, unique_rows = np.unique(batch, axis=0, return_index=True)
+            yield batch[np.sort(unique_rows)]
+    
     @staticmethod
     def suggest_minimal_changes(model, X_sample: np.ndarray, feature_names: List[str],
                                feature_importance: Dict[str, float],
@@ -179,57 +622,169 @@ class WhatIfAnalyzer:
     
     @staticmethod
     def generate_scenarios(X_sample: np.ndarray, feature_names: List[str],
-                          model, n_scenarios: int = 5) -> List[Dict[str, Any]]:
+                          model, n_scenarios: int = 5,
+                          random_state: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Generate multiple what-if scenarios with small perturbations.
         
+        All scenarios form one (n_scenarios x n_features) perturbation matrix
+        scored with a single predict_proba call (predicted class = argmax), so
+        n_scenarios can reach thousands for sensitivity sweeps.
+        
         Args:
             X_sample: Current feature values
             feature_names: List of feature names
             model: Trained model
             n_scenarios: Number of scenarios to generate
+            random_state: Seed for reproducible scenarios
             
         Returns:
             List of scenario results
         """
+        rng = np.random.default_rng(random_state)
+        X_sample = np.asarray(X_sample, dtype=float).ravel()
+        
+        # Small random perturbations (±10%)
+        perturbation = rng.uniform(-0.1, 0.1, size=(n_scenarios, len(X_sample)))
+        perturbed = X_sample * (1 + perturbation)
+        
+        try:
+            if hasattr(model, 'predict_proba'):
+                proba = np.asarray(model.predict_proba(perturbed))
+                best = np.argmax(proba, axis=1)
+                classes = getattr(model, 'classes_', None)
+                predictions = np.asarray(classes)[best] if classes is not None else best
+                probabilities = proba[np.arange(n_scenarios), best]
+            else:
+                predictions = np.asarray(model.predict(perturbed), dtype=float)
+                probabilities = None
+        except Exception:
+            return []
+        
+        # Changed features per scenario from one diff mask
+        diff = perturbed - X_sample
+        rows, cols = np.nonzero(np.abs(diff) > 1e-6)
+        bounds = np.searchsorted(rows, np.arange(n_scenarios + 1))
+        names = np.asarray(feature_names, dtype=object)
+        values = diff[rows, cols].tolist()
+        changed_names = names[cols].tolist()
+        
         scenarios = []
+        for i, prediction in enumerate(predictions.tolist()):
+            scenario = {'scenario_id': i + 1, 'prediction': prediction}
+            if probabilities is not None:
+                scenario['probability'] = float(probabilities[i])
+            scenario['changes'] = dict(zip(changed_names[bounds[i]:bounds[i + 1]], values[bounds[i]:bounds[i + 1]]))
+            scenarios.append(scenario)
+        
+        return scenarios
+    
+    @staticmethod
+    def feature_grid(column: np.ndarray, feature_range: Optional[Tuple[float, float]] = None,
+                     n_points: int = SENSITIVITY_GRID_POINTS) -> np.ndarray:
+        """
+        Evaluation grid for one feature.
+        
+        Features with at most n_points distinct values (binary, one-hot, small
+        counts) use those values; others use an even grid over the training range.
+        """
+        column = np.asarray(column, dtype=float)
+        unique = np.unique(column)
+        if len(unique) <= n_points:
+            return unique
+        low, high = feature_range if feature_range is not None else (unique[0], unique[-1])
+        return np.linspace(low, high, n_points)
+    
+    @staticmethod
+    def _score_grid(model, rows: np.ndarray, feature_index: int, grid: np.ndarray) -> np.ndarray:
+        """
+        Score every row with the feature set to every grid value, in one call.
+        
+        Returns an (n_rows, n_grid, n_outputs) float32 array: class probabilities
+        for classifiers, the prediction for regressors.
+        """
+        n_rows, n_grid = len(rows), len(grid)
+        batch = np.repeat(rows, n_grid, axis=0)
+        batch[:, feature_index] = np.tile(grid, n_rows)
+        if hasattr(model, 'predict_proba'):
+            scores = np.asarray(model.predict_proba(batch))
+        else:
+            scores = np.asarray(model.predict(batch), dtype=float)[:, np.newaxis]
+        return scores.reshape(n_rows, n_grid, -1).astype(np.float32)
+    
+    @staticmethod
+    def sensitivity_curves(model, X_sample: np.ndarray, X_background: np.ndarray,
+                           feature_names: List[str], features: List[str],
+                           grids: Dict[str, np.ndarray], target_index: Optional[int] = None,
+                           n_jobs: int = 1, max_ice_curves: int = 50,
+                           cache: Optional[Dict] = None, cache_prefix: Any = None) -> List[Dict[str, Any]]:
+        """
+        Partial-dependence and ICE curves per feature.
         
-        for i in range(n_scenarios):
-            # Create small random perturbations (±10%)
-            perturbation = np.random.uniform(-0.1, 0.1, size=X_sample.shape)
-            perturbed = X_sample * (1 + perturbation)
+        Each feature's grid is scored in one batched call over the sample and
+        the background rows; with n_jobs > 1 features are spread over a process
+        pool. Background curves only depend on the model, the feature and the
+        grid, so they are kept in ``cache`` under (cache_prefix, feature, grid);
+        a cached feature only scores the sample row.
+        
+        Args:
+            model: Trained model
+            X_sample: Current feature values
+            X_background: Background rows (training sample)
+            feature_names: Model feature order
+            features: Features to analyse
+            grids: Grid of values per feature
+            target_index: Class column for classifiers (probability curves)
+            n_jobs: Worker processes across features
+            max_ice_curves: Background ICE curves returned per feature
+            cache: Mapping reused across calls for background scores
+            cache_prefix: First element of cache keys (dataset id)
             
-            # Get prediction
-            try:
-                if hasattr(model, 'predict_proba'):
-                    proba = model.predict_proba(perturbed.reshape(1, -1))[0]
-                    pred = model.predict(perturbed.reshape(1, -1))[0]
-                    
-                    scenarios.append({
-                        'scenario_id': i + 1,
-                        'prediction': int(pred),
-                        'probability': float(proba[pred]),
-                        'changes': {
-                            feat: float(perturbed[idx] - X_sample[idx])
-                            for idx, feat in enumerate(feature_names)
-                            if abs(perturbed[idx] - X_sample[idx]) > 1e-6
-                        }
-                    })
-                else:
-                    pred = model.predict(perturbed.reshape(1, -1))[0]
-                    scenarios.append({
-                        'scenario_id': i + 1,
-                        'prediction': float(pred),
-                        'changes': {
-                            feat: float(perturbed[idx] - X_sample[idx])
-                            for idx, feat in enumerate(feature_names)
-                            if abs(perturbed[idx] - X_sample[idx]) > 1e-6
-                        }
-                    })
-            except Exception:
-                continue
+        Returns:
+            One curve set per feature
+        """
+        X_sample = np.asarray(X_sample, dtype=float).ravel()
+        X_background = np.asarray(X_background, dtype=float)
+        indices = {f: feature_names.index(f) for f in features}
+        keys = {f: (cache_prefix, f, tuple(np.asarray(grids[f], dtype=float).tolist())) for f in features}
+        cached = {f for f in features if cache is not None and keys[f] in cache}
         
-        return scenarios
+        # Uncached features score sample + background, cached ones the sample only
+        full_rows = np.vstack([X_sample, X_background])
+        tasks = [(f, full_rows if f not in cached else X_sample[np.newaxis, :]) for f in features]
+        if n_jobs != 1 and len(tasks) > 1:
+            scored = Parallel(n_jobs=n_jobs)(
+                delayed(WhatIfAnalyzer._score_grid)(model, rows, indices[f], np.asarray(grids[f], dtype=float))
+                for f, rows in tasks
+            )
+        else:
+            scored = [WhatIfAnalyzer._score_grid(model, rows, indices[f], np.asarray(grids[f], dtype=float))
+                      for f, rows in tasks]
+        
+        output_index = 0 if target_index is None else target_index
+        curves = []
+        for (feature, _), scores in zip(tasks, scored):
+            if feature in cached:
+                background = cache[keys[feature]]
+            else:
+                background = scores[1:]
+                if cache is not None:
+                    cache[keys[feature]] = background
+            ice = background[:, :, output_index]
+            partial_dependence = ice.mean(axis=0)
+            curves.append({
+                'feature': feature,
+                'grid': list(keys[feature][2]),
+                'sample_value': float(X_sample[indices[feature]]),
+                'sample_curve': scores[0, :, output_index].tolist(),
+                'partial_dependence': partial_dependence.tolist(),
+                'ice': ice[:max_ice_curves].tolist(),
+                'sensitivity': float(partial_dependence.max() - partial_dependence.min()),
+                'cached': feature in cached
+            })
+        
+        curves.sort(key=lambda c: c['sensitivity'], reverse=True)
+        return curves
 
 
 class StressTester:
@@ -237,15 +792,25 @@ class StressTester:
     
     @staticmethod
     def run_stress_tests(model, X_test: np.ndarray, y_test: np.ndarray,
-                        feature_names: List[str]) -> Dict[str, Any]:
+                        feature_names: List[str], task: str = 'classification',
+                        random_state: Optional[int] = 42, n_jobs: int = 2,
+                        repetitions: int = 1) -> Dict[str, Any]:
         """
         Run comprehensive stress tests on the model.
         
+        Each test draws from its own Generator spawned from random_state, so
+        results are reproducible whatever the execution order; the extreme
+        value and missing feature tests run concurrently.
+        
         Args:
             model: Trained model
             X_test: Test features
             y_test: Test labels
             feature_names: List of feature names
+            task: 'classification' (accuracy) or 'regression' (R²)
+            random_state: Seed for reproducible perturbations
+            n_jobs: Threads for the independent tests
+            repetitions: Extreme value draws (confidence interval when > 1)
             
         Returns:
             Stress test results
@@ -254,19 +819,27 @@ class StressTester:
             'noise_robustness': {},
             'extreme_values': {},
             'edge_cases': {},
-            'overall_robustness': 'unknown'
+            'overall_robustness': 'unknown',
+            'metric': 'r2' if task == 'regression' else 'accuracy'
         }
         
+        X_test = np.asarray(X_test, dtype=float)
+        y_test = np.asarray(y_test)
+        scorer = StressTester._scorer(task)
+        noise_rng, extreme_rng, missing_rng = [
+            np.random.default_rng(seed) for seed in np.random.SeedSequence(random_state).spawn(3)
+        ]
+        
         # Test 1: Noise robustness
-        noise_results = StressTester._test_noise_robustness(model, X_test, y_test)
+        noise_results = StressTester._test_noise_robustness(model, X_test, y_test, noise_rng, scorer)
         results['noise_robustness'] = noise_results
         
-        # Test 2: Extreme values
-        extreme_results = StressTester._test_extreme_values(model, X_test, y_test)
+        # Test 2: Extreme values / Test 3: Missing features (set to mean)
+        extreme_results, missing_results = Parallel(n_jobs=n_jobs, prefer='threads')([
+            delayed(StressTester._test_extreme_values)(model, X_test, y_test, extreme_rng, scorer, repetitions),
+            delayed(StressTester._test_missing_features)(model, X_test, y_test, missing_rng, scorer)
+        ])
         results['extreme_values'] = extreme_results
-        
-        # Test 3: Missing features (set to mean)
-        missing_results = StressTester._test_missing_features(model, X_test, y_test)
         results['edge_cases'] = missing_results
         
         # Calculate overall robustness score
@@ -292,22 +865,44 @@ class StressTester:
         return results
     
     @staticmethod
-    def _test_noise_robustness(model, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, Any]:
+    def _scorer(task: str = 'classification'):
+        """
+        Score predictions against labels: accuracy, or R² for regression.
+        
+        Predictions may carry leading axes (e.g. one row per repetition);
+        scores are computed along the last axis.
+        """
+        if task == 'regression':
+            def r2(pred, y):
+                total = np.sum((y - y.mean()) ** 2)
+                if total <= 0:
+                    return np.zeros(np.shape(pred)[:-1]) if np.ndim(pred) > 1 else 0.0
+                return 1.0 - np.sum((y - pred) ** 2, axis=-1) / total
+            return r2
+        return lambda pred, y: np.mean(pred == y, axis=-1)
+    
+    @staticmethod
+    def _test_noise_robustness(model, X_test: np.ndarray, y_test: np.ndarray,
+                               rng: Optional[np.random.Generator] = None, scorer=None) -> Dict[str, Any]:
         """Test model robustness to noise."""
+        rng = rng if rng is not None else np.random.default_rng()
+        scorer = scorer or StressTester._scorer()
         try:
             # Get baseline accuracy
             baseline_pred = model.predict(X_test)
-            baseline_acc = np.mean(baseline_pred == y_test)
+            baseline_acc = scorer(baseline_pred, y_test)
             
-            # Add Gaussian noise (5% of std)
+            # Gaussian noise relative to each column's std; all levels in one predict call
             noise_levels = [0.01, 0.05, 0.1]
-            results = []
+            n = len(X_test)
+            std = X_test.std(axis=0)
+            noise = rng.standard_normal((len(noise_levels), n, X_test.shape[1])) * std
+            X_noisy = (X_test + np.asarray(noise_levels)[:, np.newaxis, np.newaxis] * noise)
+            noisy_pred = np.asarray(model.predict(X_noisy.reshape(-1, X_test.shape[1])))
             
-            for noise_level in noise_levels:
-                X_noisy = X_test + np.random.normal(0, noise_level, X_test.shape)
-                noisy_pred = model.predict(X_noisy)
-                noisy_acc = np.mean(noisy_pred == y_test)
-                
+            results = []
+            for i, noise_level in enumerate(noise_levels):
+                noisy_acc = scorer(noisy_pred[i * n:(i + 1) * n], y_test)
                 results.append({
                     'noise_level': noise_level,
                     'accuracy': float(noisy_acc),
@@ -330,58 +925,89 @@ class StressTester:
             }
     
     @staticmethod
-    def _test_extreme_values(model, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, Any]:
-        """Test model with extreme values."""
+    def _test_extreme_values(model, X_test: np.ndarray, y_test: np.ndarray,
+                             rng: Optional[np.random.Generator] = None, scorer=None,
+                             repetitions: int = 1, extreme_fraction: float = 0.1) -> Dict[str, Any]:
+        """
+        Test model with extreme values.
+        
+        In every column, extreme_fraction of the rows are set to mean ± 3 std.
+        Masks and signs for all repetitions and columns come from one uniform
+        draw: per (repetition, column), the rows whose draw is at or below the
+        k-th smallest are perturbed, and the sign is drawn by whether the value
+        falls in the lower half of that interval. All repetitions are scored
+        with one stacked predict call (chunked only to bound memory), and
+        several repetitions give a confidence interval on the accuracy drop.
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        scorer = scorer or StressTester._scorer()
         try:
             # Get baseline
             baseline_pred = model.predict(X_test)
-            baseline_acc = np.mean(baseline_pred == y_test)
+            baseline_acc = scorer(baseline_pred, y_test)
             
-            # Create extreme values (3x std from mean)
-            X_extreme = X_test.copy()
-            for col in range(X_test.shape[1]):
-                mean = X_test[:, col].mean()
-                std = X_test[:, col].std()
-                # Set 10% of values to extremes
-                n_extreme = int(len(X_test) * 0.1)
-                extreme_indices = np.random.choice(len(X_test), n_extreme, replace=False)
-                X_extreme[extreme_indices, col] = mean + 3 * std * np.random.choice([-1, 1], n_extreme)
+            n_rows, n_cols = X_test.shape
+            n_extreme = int(n_rows * extreme_fraction)
+            mean = X_test.mean(axis=0)
+            std = X_test.std(axis=0)
             
-            extreme_pred = model.predict(X_extreme)
-            extreme_acc = np.mean(extreme_pred == y_test)
+            accuracies = np.empty(repetitions)
+            per_chunk = max(1, min(repetitions, STRESS_BATCH_CELLS // max(1, n_rows * n_cols)))
+            for start in range(0, repetitions, per_chunk):
+                n_reps = min(per_chunk, repetitions - start)
+                X_extreme = np.broadcast_to(X_test, (n_reps, n_rows, n_cols)).astype(X_test.dtype)
+                if n_extreme > 0:
+                    draws = rng.random((n_reps, n_rows, n_cols))
+                    kth = np.partition(draws, n_extreme - 1, axis=1)[:, n_extreme - 1:n_extreme, :]
+                    selected = draws <= kth
+                    sign = np.where(draws < kth / 2, -1.0, 1.0)
+                    X_extreme = np.where(selected, mean + 3 * std * sign, X_extreme)
+                
+                extreme_pred = np.asarray(model.predict(X_extreme.reshape(-1, n_cols)))
+                accuracies[start:start + n_reps] = scorer(extreme_pred.reshape(n_reps, n_rows), y_test)
             
+            extreme_acc = float(accuracies.mean())
             score = extreme_acc / baseline_acc if baseline_acc > 0 else 0
             
-            return {
+            result = {
                 'baseline_accuracy': float(baseline_acc),
-                'extreme_accuracy': float(extreme_acc),
+                'extreme_accuracy': extreme_acc,
                 'accuracy_drop': float(baseline_acc - extreme_acc),
                 'score': float(score),
+                'repetitions': int(repetitions),
                 'interpretation': 'Robust' if score > 0.9 else 'Moderate' if score > 0.7 else 'Sensitive to extremes'
             }
+            if repetitions > 1:
+                drops = baseline_acc - accuracies
+                result['accuracy_drop_std'] = float(drops.std(ddof=1))
+                result['accuracy_drop_ci'] = [float(v) for v in np.percentile(drops, [2.5, 97.5])]
+            return result
         except Exception as e:
             return {
                 'error': f'Extreme values test failed: {str(e)}'
             }
     
     @staticmethod
-    def _test_missing_features(model, X_test: np.ndarray, y_test: np.ndarray) -> Dict[str, Any]:
+    def _test_missing_features(model, X_test: np.ndarray, y_test: np.ndarray,
+                               rng: Optional[np.random.Generator] = None, scorer=None) -> Dict[str, Any]:
         """Test model with missing features (replaced by mean)."""
+        rng = rng if rng is not None else np.random.default_rng()
+        scorer = scorer or StressTester._scorer()
         try:
             # Get baseline
             baseline_pred = model.predict(X_test)
-            baseline_acc = np.mean(baseline_pred == y_test)
+            baseline_acc = scorer(baseline_pred, y_test)
             
             # Set random features to mean (simulating missing)
             X_missing = X_test.copy()
             col_means = X_test.mean(axis=0)
             
             # Set 20% of values to mean
-            mask = np.random.random(X_test.shape) < 0.2
+            mask = rng.random(X_test.shape) < 0.2
             X_missing[mask] = np.take(col_means, np.where(mask)[1])
             
             missing_pred = model.predict(X_missing)
-            missing_acc = np.mean(missing_pred == y_test)
+            missing_acc = scorer(missing_pred, y_test)
             
             score = missing_acc / baseline_acc if baseline_acc > 0 else 0
             
@@ -20,6 +20,8 @@ from analyses.advanced_stats import AdvancedStatsAnalyzer
 from analyses.symptom_matching import SymptomMatchingAnalyzer
 from reports.pdf_generator import PDFReportGenerator
 
+from utils.array_codec import encode_array, smallest_int_dtype
+
 # Import validation modules
 try:
     from utils.data_validator import DataValidator, DataCleaner as NewDataCleaner, BooleanDetector
@@ -33,14 +35,23 @@ CORS(app)
 active_analyzers = {}
 SUMMARY_EXCLUDED_KEYS = {'data', 'features', 'target'}
 
+# Courbes de dépendance partielle: (dataset_id, feature, grid) -> scores du fond
+sensitivity_cache = {}
+SENSITIVITY_CACHE_SIZE = 512
+
 
 def store_analyzer(dataset_id, model_type, analyzer, config, results=None):
     """Persist trained analyzer and metadata in memory."""
+    for key in [k for k in sensitivity_cache if k[0] == dataset_id]:
+        del sensitivity_cache[key]
     active_analyzers[dataset_id] = {
         "model_type": model_type,
         "analyzer": analyzer,
         "config": config,
         "results": results,
+        "holdout": getattr(analyzer, '_holdout', None),
+        "forecast_states": getattr(analyzer, '_forecast_states', None),
+        "explainer": None,
         "trained_at": datetime.now(timezone.utc).isoformat()
     }
 
@@ -58,10 +69,34 @@ def _get_analyzer_entry(dataset_id):
         "analyzer": entry,
         "config": getattr(entry, "config", {}),
         "results": getattr(entry, "results", None),
+        "holdout": None,
         "trained_at": None
     }
 
 
+def _get_explainer(analyzer_entry):
+    """ShapExplainer du modèle stocké: construit une fois puis gardé dans le registre."""
+    if analyzer_entry.get('explainer') is not None:
+        return analyzer_entry['explainer']
+
+    from analyses.explainability import ShapExplainer
+
+    analyzer = analyzer_entry.get('analyzer')
+    model = getattr(analyzer, '_predict_model', None)
+    if model is None or not ShapExplainer.supports(model):
+        return None
+
+    # Espérances calculées sur l'échantillon de fond, dans l'espace vu par le modèle
+    background = getattr(analyzer, '_background_sample', None)
+    scaler = getattr(analyzer, '_predict_scaler', None)
+    if background is not None and scaler is not None:
+        background = scaler.transform(background)
+
+    explainer = ShapExplainer(model, background)
+    analyzer_entry['explainer'] = explainer
+    return explainer
+
+
 def _select_best_model(models, best_model_name):
     """Find the best model result based on provided name."""
     if not models:
@@ -81,7 +116,7 @@ def _normalize_payload(payload):
         return [_normalize_payload(v) for v in payload]
     if isinstance(payload, tuple):
         return tuple(_normalize_payload(item) for item in payload)
-    if isinstance(payload, (np.integer, np.floating)):
+    if isinstance(payload, (np.integer, np.floating, np.bool_)):
         return payload.item()
     if isinstance(payload, np.ndarray):
         return payload.tolist()
@@ -592,9 +627,90 @@ def analyze_time_series():
     except Exception as e:
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
+@app.route('/forecast', methods=['POST'])
+def forecast():
+    """
+    Prévision à la demande depuis l'état ARIMA/SARIMA sauvegardé (sans réajustement)
+    
+    Body:
+    {
+        "dataset_id": "default",
+        "model": "sarima",  # optionnel (défaut: meilleur modèle sauvegardé)
+        "horizon": 30,
+        "confidence": 0.95,
+        "append": [..],          # optionnel: nouvelles observations intégrées avant la prévision
+        "append_offset": 200,    # position de append[0] dans la série (ou "append_start": date)
+    }
+    
+    Les observations ajoutées sont intégrées à tous les états sauvegardés du
+    dataset (ils décrivent la même série). Les points à une position déjà
+    intégrée sont ignorés: rejouer la même requête ne les ajoute pas deux fois.
+    """
+    try:
+        data = request.json or {}
+        entry, error_resp, status = _validate_and_get_entry(data)
+        if error_resp:
+            return error_resp, status
+        states = entry.get('forecast_states')
+        if entry.get('model_type') != 'time_series' or not states:
+            return jsonify({"error": "No saved ARIMA/SARIMA state for this dataset"}), 400
+        
+        key = data.get('model') or getattr(entry['analyzer'], '_best_forecast_key', None) or next(iter(states))
+        if key not in states:
+            return jsonify({"error": f"No saved state for model {key}", "available_models": list(states)}), 400
+        state = states[key]
+        
+        horizon = int(data.get('horizon') or (entry.get('config') or {}).get('forecast_periods', 30))
+        confidence = float(data.get('confidence', 0.95))
+        if horizon < 1 or not 0 < confidence < 1:
+            return jsonify({"error": "horizon must be >= 1 and confidence in (0, 1)"}), 400
+        
+        appended = data.get('append') or []
+        integrated, updated_states = 0, {}
+        if appended:
+            if data.get('append_offset') is None and data.get('append_start') is None:
+                return jsonify({"error": "append requires append_offset (position of its first value) "
+                                         "or append_start (its timestamp)"}), 400
+            try:
+                offset = (int(data['append_offset']) if data.get('append_offset') is not None
+                          else state.offset_of(data['append_start']))
+                if offset > min(s.n_observations for s in states.values()):
+                    raise ValueError(f"Append starts at position {offset}, after the last saved observation")
+            except ValueError as e:
+                return jsonify({"error": str(e), "n_observations": state.n_observations}), 400
+            
+            # Même série pour tous les modèles: chaque état reçoit les nouveaux points
+            for name, saved in states.items():
+                count = saved.append(appended, offset=offset)
+                updated_states[name] = {"appended": count, "n_observations": saved.n_observations}
+            integrated = updated_states[key]['appended']
+        
+        values, lower, upper = state.forecast(horizon, alpha=1 - confidence)
+        index = state.index(horizon)
+        response = {
+            "dataset_id": data.get('dataset_id'),
+            "model": key,
+            "method": state.method,
+            "horizon": horizon,
+            "confidence": confidence,
+            "appended": integrated,
+            "skipped": len(appended) - integrated,
+            "updated_states": updated_states,
+            "n_observations": state.n_observations,
+            "forecast": {
+                "values": values,
+                "lower_bound": lower,
+                "upper_bound": upper,
+                "index": index.astype(str).tolist() if index is not None else None
+            }
+        }
+        return jsonify(_normalize_payload(response)), 200
+    except Exception as e:
+        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
+
 @app.route('/analyze/clustering-advanced', methods=['POST'])
 def analyze_clustering_advanced():
-    """Clustering avancé (K-Means, DBSCAN, Hierarchical, GMM)"""
+    """Clustering avancé (K-Means, DBSCAN, Hierarchical, GMM, MiniBatch, BIRCH, HDBSCAN)"""
     try:
         data = request.json
         df = pd.DataFrame(data['data'])
@@ -603,7 +719,65 @@ def analyze_clustering_advanced():
         analyzer = ClusteringAnalyzer(df)
         results = analyzer.perform_analysis(config)
         
-        return jsonify(results), 200
+        # Stocké seulement si un dataset_id est fourni (labels complets récupérables ensuite)
+        dataset_id = data.get('dataset_id')
+        if dataset_id:
+            store_analyzer(dataset_id, 'clustering', analyzer, config, results)
+            results = {"dataset_id": dataset_id, **results}
+        
+        return jsonify(_normalize_payload(results)), 200
+    except Exception as e:
+        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
+
+
+@app.route('/models/clustering/labels', methods=['POST'])
+def clustering_labels():
+    """
+    Labels complets (une valeur par ligne) d'un clustering stocké
+    
+    Body:
+    {
+        "dataset_id": "patients",
+        "method": "kmeans",        # optionnel, toutes les méthodes sinon
+        "format": "base64"         # 'base64' (défaut), 'json' ou 'binary' (une seule méthode)
+    }
+    """
+    try:
+        data = request.json or {}
+        entry, error_resp, status = _validate_and_get_entry(data)
+        if error_resp:
+            return error_resp, status
+        if entry.get('model_type') != 'clustering':
+            return jsonify({"error": "No clustering model available for this dataset"}), 400
+        
+        stored_labels = getattr(entry.get('analyzer'), 'labels_', {}) or {}
+        method = data.get('method')
+        if method is not None and method not in stored_labels:
+            return jsonify({"error": f"No labels stored for method {method}"}), 404
+        selected = {method: stored_labels[method]} if method else stored_labels
+        
+        output_format = data.get('format', 'base64')
+        if output_format == 'binary':
+            if len(selected) != 1:
+                return jsonify({"error": "The binary format requires a single method"}), 400
+            labels = next(iter(selected.values()))
+            dtype = smallest_int_dtype(labels)
+            buffer = io.BytesIO(labels.astype(dtype.newbyteorder('<')).tobytes())
+            response = send_file(buffer, mimetype='application/octet-stream')
+            response.headers['X-Labels-Dtype'] = dtype.name
+            response.headers['X-Labels-Length'] = str(len(labels))
+            return response
+        
+        if output_format == 'json':
+            labels_payload = {name: labels.tolist() for name, labels in selected.items()}
+        else:
+            labels_payload = {name: encode_array(labels, smallest_int_dtype(labels)) for name, labels in selected.items()}
+        
+        return jsonify(_normalize_payload({
+            "dataset_id": data.get('dataset_id'),
+            "format": output_format,
+            "labels": labels_payload
+        })), 200
     except Exception as e:
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
@@ -756,11 +930,28 @@ def predict():
                 'model': summary.get('best_model') or summary.get('best_model_key') or 'Classification',
                 'predictions': predictions,
                 'top_prediction': predictions[0] if predictions else None,
+                'calibrated': getattr(analyzer, '_calibrator', None) is not None,
+            })), 200
+
+        # 3) Symptom-matching, recherche classée TF-IDF/BM25 (mode='retrieval' ou pas de modèle NB)
+        retrieval_index = getattr(analyzer, 'retrieval_index', None)
+        if retrieval_index is not None and (data.get('mode') == 'retrieval'
+                                            or getattr(analyzer, 'trained_model', None) is None):
+            symptoms = [name for name, value in features.items() if value]
+            predictions = [{'class': str(p['disease']), 'score': p['score']}
+                           for p in retrieval_index.search(symptoms, top_k=10)]
+            return jsonify(_normalize_payload({
+                'model_type': 'symptom_matching',
+                'model': f'Recherche {retrieval_index.weighting.upper()}',
+                'predictions': predictions,
+                'top_prediction': predictions[0] if predictions else None,
+                'n_features_used': len(symptoms),
+                'total_features': len(retrieval_index.symptom_cols)
             })), 200
 
-        # 3) Symptom-matching (historique): utilise trained_model + feature_names
+        # 4) Symptom-matching (historique): utilise trained_model + feature_names
         if not hasattr(analyzer, 'trained_model') or analyzer.trained_model is None:
-            return jsonify({"error": "Aucun modèle ML entraîné. Relancez l'analyse symptom-matching avec model='bernoulli' ou 'all'."}), 400
+            return jsonify({"error": "Aucun modèle ML entraîné. Relancez l'analyse symptom-matching avec model='bernoulli', 'retrieval' ou 'all'."}), 400
         if not getattr(analyzer, 'feature_names', None):
             return jsonify({"error": "Modèle symptom-matching invalide: feature_names manquants."}), 400
 
@@ -770,7 +961,8 @@ def predict():
             X_test.append(value)
         X_test = np.array([X_test])
 
-        y_proba = analyzer.trained_model.predict_proba(X_test)[0]
+        scorer = getattr(analyzer, 'scorer', None) or analyzer.trained_model
+        y_proba = scorer.predict_proba(X_test)[0]
         top_indices = y_proba.argsort()[-10:][::-1]
 
         predictions = [{
@@ -851,18 +1043,22 @@ def predict_with_explanation():
                 ]
             }
             
-            # Add explanation if available
-            if explainability_available and analyzer._predict_model:
-                # Convert features to array
-                feature_names = analyzer._original_feature_columns or []
-                X_sample = np.array([features.get(f, 0) for f in feature_names])
+            # Add explanation if available (explainer mis en cache dans le registre)
+            explainer = _get_explainer(analyzer_entry) if explainability_available else None
+            if explainer is not None:
+                # Vecteur encodé (et standardisé) tel que vu par le modèle
+                feature_names = analyzer._encoded_feature_columns or []
+                X_sample = analyzer.encode_row(features).reshape(1, -1)
+                if analyzer._predict_scaler is not None:
+                    X_sample = analyzer._predict_scaler.transform(X_sample)
                 
                 # Get local explanation
                 local_exp = ExplainabilityAnalyzer.explain_prediction_local(
                     analyzer._predict_model, 
-                    X_sample, 
+                    X_sample[0], 
                     feature_names,
-                    base_value=0.5
+                    explainer=explainer,
+                    class_index=int(np.argmax(probas))
                 )
                 
                 # Generate interpretation messages
@@ -872,9 +1068,26 @@ def predict_with_explanation():
                     local_exp.get('contributions', [])
                 )
                 
+                # Les contributions somment à la sortie brute du modèle (base_value + somme),
+                # avant calibration: elle diffère de 'probability' si un calibrateur est actif
+                calibrated = getattr(analyzer, '_calibrator', None) is not None
+                contributions = local_exp.get('contributions', [])
+                explained_value = None
+                if local_exp.get('available') and local_exp.get('base_value') is not None:
+                    explained_value = local_exp['base_value'] + sum(c['contribution'] for c in contributions)
+                
                 prediction_result['explanation'] = {
-                    'available': True,
-                    'local_contributions': local_exp.get('contributions', []),
+                    'available': local_exp.get('available', False),
+                    'method': local_exp.get('method'),
+                    'output_space': local_exp.get('output_space'),
+                    'base_value': local_exp.get('base_value'),
+                    'explained_value': explained_value,
+                    'calibrated': calibrated,
+                    'additivity_note': ('Contributions sum to the uncalibrated model output '
+                                        '(explained_value), not to the calibrated probability'
+                                        if calibrated else
+                                        'Contributions sum to the model output (explained_value)'),
+                    'local_contributions': contributions,
                     'interpretation_messages': messages,
                     'confidence_level': 'high' if top_prob > 0.8 else 'moderate' if top_prob > 0.6 else 'low'
                 }
@@ -891,6 +1104,70 @@ def predict_with_explanation():
     except Exception as e:
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
+@app.route('/predict/explain/batch', methods=['POST'])
+def predict_explain_batch():
+    """
+    Attributions SHAP agrégées sur une population
+    
+    Body:
+    {
+        "dataset_id": "default",
+        "rows": [{...}, {...}],     # features de chaque individu
+        "chunk_size": 500,
+        "n_jobs": 1,                # processus répartis sur les blocs
+        "top_k": 0                  # contributions principales par ligne (0 = aucune)
+    }
+    
+    Returns:
+    {
+        "n_rows": 1000,
+        "global_importance": [{"feature", "mean_abs_contribution", "mean_contribution"}, ...],
+        "per_class": {"A": {"count", "top_features": [...]}, ...},
+        "rows": [...]               # si top_k > 0
+    }
+    """
+    try:
+        from analyses.explainability import ExplainabilityAnalyzer
+        
+        data = request.json or {}
+        dataset_id = data.get('dataset_id', 'default')
+        rows = data.get('rows') or []
+        if not rows:
+            return jsonify({"error": "rows is required"}), 400
+        
+        analyzer_entry = _get_analyzer_entry(dataset_id)
+        if analyzer_entry is None:
+            return jsonify({"error": f"No trained model for dataset {dataset_id}"}), 400
+        
+        analyzer = analyzer_entry.get('analyzer')
+        if analyzer_entry.get('model_type') != 'classification' or not hasattr(analyzer, 'encode_rows'):
+            return jsonify({"error": "Batch explanations only supported for classification models"}), 400
+        
+        explainer = _get_explainer(analyzer_entry)
+        if explainer is None:
+            return jsonify({"error": "Explainability not available for this model"}), 400
+        
+        X = analyzer.encode_rows(rows)
+        if analyzer._predict_scaler is not None:
+            X = analyzer._predict_scaler.transform(X)
+        
+        classes = np.asarray(analyzer._predict_model.classes_)
+        label_encoder = getattr(analyzer, '_label_encoder', None)
+        class_names = [str(c) for c in (label_encoder.inverse_transform(classes.astype(int))
+                                        if label_encoder is not None else classes)]
+        
+        summary = ExplainabilityAnalyzer.explain_batch(
+            explainer, X, analyzer._encoded_feature_columns or [],
+            class_names=class_names,
+            chunk_size=int(data.get('chunk_size', 500)),
+            n_jobs=int(data.get('n_jobs', 1)),
+            top_k=int(data.get('top_k', 0))
+        )
+        return jsonify(_normalize_payload(summary)), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
+
 @app.route('/whatif/analyze', methods=['POST'])
 def whatif_analyze():
     """
@@ -901,7 +1178,9 @@ def whatif_analyze():
         "dataset_id": "default",
         "current_features": {...},
         "desired_outcome": 1,
-        "max_changes": 3
+        "max_changes": 3,
+        "n_scenarios": 5,
+        "solver": "auto"           # 'auto' (défaut), 'linear', 'tree' ou 'random'
     }
     
     Returns:
@@ -916,7 +1195,7 @@ def whatif_analyze():
     try:
         # Import what-if module
         try:
-            from analyses.what_if import WhatIfAnalyzer
+            from analyses.what_if import WhatIfAnalyzer, ScaledModel
             whatif_available = True
         except ImportError:
             whatif_available = False
@@ -939,40 +1218,76 @@ def whatif_analyze():
         
         if not hasattr(analyzer, '_predict_model') or not analyzer._predict_model:
             return jsonify({"error": "No model available for what-if analysis"}), 400
-        
-        # Convert features to array
-        feature_names = analyzer._original_feature_columns or []
-        X_sample = np.array([features.get(f, 0) for f in feature_names])
+        if not hasattr(analyzer, 'encode_row') or not hasattr(analyzer._predict_model, 'classes_'):
+            return jsonify({"error": "What-if analysis requires a trained classification model"}), 400
+        
+        # Travail dans l'espace des features encodées, tel que vu par le modèle
+        feature_names = analyzer._encoded_feature_columns or []
+        X_sample = analyzer.encode_row(features)
+        model = analyzer._predict_model
+        if analyzer._predict_scaler is not None:
+            model = ScaledModel(model, analyzer._predict_scaler)
+        
+        # Bornes observées à l'entraînement
+        feature_ranges = getattr(analyzer, '_feature_ranges', None) or {}
+        
+        classes = np.asarray(model.classes_)
+        label_encoder = getattr(analyzer, '_label_encoder', None)
+        
+        def to_label(value):
+            if label_encoder is not None:
+                return label_encoder.inverse_transform([int(value)])[0]
+            return value
+        
+        def to_class(label):
+            labels = label_encoder.classes_ if label_encoder is not None else classes
+            matches = [i for i, c in enumerate(labels) if str(c) == str(label)]
+            if not matches:
+                return None
+            return classes[matches[0]] if label_encoder is None else classes[classes == matches[0]][0]
         
         # Get current prediction
-        current_pred = analyzer._predict_model.predict(X_sample.reshape(1, -1))[0]
-        
-        # Get feature ranges from stored data (approximate)
-        results = analyzer_entry.get('results') or {}
-        feature_ranges = {f: (0, 1) for f in feature_names}  # Default ranges
+        current_pred = model.predict(X_sample.reshape(1, -1))[0]
+        
+        if desired_outcome is not None:
+            desired_class = to_class(desired_outcome)
+            if desired_class is None:
+                return jsonify({"error": f"Unknown desired_outcome: {desired_outcome}"}), 400
+        elif len(classes) == 2:
+            desired_class = classes[classes != current_pred][0]
+        else:
+            # Classe la plus probable après la classe prédite
+            proba = model.predict_proba(X_sample.reshape(1, -1))[0]
+            ranked = [c for c in classes[np.argsort(-proba)] if c != current_pred]
+            desired_class = ranked[0]
         
         # Find counterfactual
         counterfactual = WhatIfAnalyzer.find_counterfactual(
-            analyzer._predict_model,
+            model,
             X_sample,
             feature_names,
-            int(current_pred),
-            int(desired_outcome) if desired_outcome is not None else 1 - int(current_pred),
+            current_pred,
+            desired_class,
             feature_ranges,
-            max_changes=max_changes
+            max_changes=max_changes,
+            solver=data.get('solver', 'auto')
         )
         
-        # Generate scenarios
+        # Generate scenarios (un seul predict_proba pour tous les scénarios)
         scenarios = WhatIfAnalyzer.generate_scenarios(
             X_sample,
             feature_names,
-            analyzer._predict_model,
-            n_scenarios=5
+            model,
+            n_scenarios=int(data.get('n_scenarios', 5))
         )
+        if label_encoder is not None and scenarios:
+            labels = label_encoder.inverse_transform([int(sc['prediction']) for sc in scenarios])
+            for scenario, label in zip(scenarios, labels):
+                scenario['prediction'] = str(label)
         
         return jsonify(_normalize_payload({
-            'current_prediction': int(current_pred),
-            'desired_outcome': desired_outcome,
+            'current_prediction': str(to_label(current_pred)),
+            'desired_outcome': str(to_label(desired_class)),
             'counterfactual': counterfactual,
             'scenarios': scenarios
         })), 200
@@ -980,6 +1295,104 @@ def whatif_analyze():
     except Exception as e:
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
 
+@app.route('/whatif/sensitivity', methods=['POST'])
+def whatif_sensitivity():
+    """
+    Courbes de sensibilité (dépendance partielle + ICE) du modèle stocké
+    
+    Body:
+    {
+        "dataset_id": "default",
+        "current_features": {...},
+        "features": ["x1", "x2"],   # colonnes encodées, toutes si <= 30
+        "n_points": 20,
+        "grids": {"x1": [0, 1, 2]}, # optionnel, grille explicite
+        "target_class": "yes",      # optionnel, classe prédite sinon
+        "n_jobs": 1,                # processus répartis sur les features
+        "max_ice_curves": 50
+    }
+    
+    Returns:
+    {
+        "target_class": "yes",
+        "curves": [{"feature", "grid", "partial_dependence", "ice", "sample_curve", "sensitivity"}, ...]
+    }
+    """
+    try:
+        from analyses.what_if import WhatIfAnalyzer, ScaledModel
+        
+        data = request.json or {}
+        dataset_id = data.get('dataset_id', 'default')
+        features = data.get('current_features') or {}
+        
+        analyzer_entry = _get_analyzer_entry(dataset_id)
+        if analyzer_entry is None:
+            return jsonify({"error": f"No trained model for dataset {dataset_id}"}), 400
+        
+        analyzer = analyzer_entry.get('analyzer')
+        if not hasattr(analyzer, '_predict_model') or not analyzer._predict_model:
+            return jsonify({"error": "No model available for sensitivity analysis"}), 400
+        if not hasattr(analyzer, 'encode_row') or getattr(analyzer, '_background_sample', None) is None:
+            return jsonify({"error": "Sensitivity analysis requires a trained classification model"}), 400
+        
+        feature_names = analyzer._encoded_feature_columns or []
+        selected = data.get('features')
+        if not selected:
+            if len(feature_names) > 30:
+                return jsonify({"error": "Too many features: specify 'features'"}), 400
+            selected = feature_names
+        unknown = [f for f in selected if f not in feature_names]
+        if unknown:
+            return jsonify({"error": f"Unknown features: {unknown}"}), 400
+        
+        model = analyzer._predict_model
+        if analyzer._predict_scaler is not None:
+            model = ScaledModel(model, analyzer._predict_scaler)
+        X_sample = analyzer.encode_row(features)
+        background = analyzer._background_sample
+        
+        n_points = int(data.get('n_points', 20))
+        explicit = data.get('grids') or {}
+        ranges = analyzer._feature_ranges or {}
+        grids = {
+            f: np.asarray(explicit[f], dtype=float) if f in explicit
+            else WhatIfAnalyzer.feature_grid(background[:, feature_names.index(f)], ranges.get(f), n_points)
+            for f in selected
+        }
+        
+        # Classe cible: demandée, sinon classe prédite pour l'échantillon
+        classes = np.asarray(model.classes_)
+        label_encoder = getattr(analyzer, '_label_encoder', None)
+        labels = label_encoder.classes_ if label_encoder is not None else classes
+        target_class = data.get('target_class')
+        if target_class is None:
+            target_index = int(np.argmax(model.predict_proba(X_sample.reshape(1, -1))[0]))
+        else:
+            matches = [i for i, c in enumerate(labels) if str(c) == str(target_class)]
+            if not matches:
+                return jsonify({"error": f"Unknown target_class: {target_class}"}), 400
+            target_index = matches[0]
+        
+        curves = WhatIfAnalyzer.sensitivity_curves(
+            model, X_sample, background, feature_names, selected, grids,
+            target_index=target_index,
+            n_jobs=int(data.get('n_jobs', 1)),
+            max_ice_curves=int(data.get('max_ice_curves', 50)),
+            cache=sensitivity_cache,
+            cache_prefix=dataset_id
+        )
+        while len(sensitivity_cache) > SENSITIVITY_CACHE_SIZE:
+            sensitivity_cache.pop(next(iter(sensitivity_cache)))
+        
+        return jsonify(_normalize_payload({
+            'target_class': str(labels[target_index]),
+            'n_background': int(len(background)),
+            'curves': curves
+        })), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
+
 @app.route('/model/stress-test', methods=['POST'])
 def stress_test_model():
     """
@@ -987,7 +1400,9 @@ def stress_test_model():
     
     Body:
     {
-        "dataset_id": "default"
+        "dataset_id": "default",
+        "random_state": 42,
+        "repetitions": 10          # tirages des valeurs extrêmes (intervalle de confiance)
     }
     
     Returns:
@@ -1002,7 +1417,7 @@ def stress_test_model():
     try:
         # Import stress testing module
         try:
-            from analyses.what_if import StressTester
+            from analyses.what_if import StressTester, ScaledModel
             stress_test_available = True
         except ImportError:
             stress_test_available = False
@@ -1019,16 +1434,37 @@ def stress_test_model():
             return jsonify({"error": f"No trained model for dataset {dataset_id}"}), 400
         
         analyzer = analyzer_entry.get('analyzer')
+        model_type = analyzer_entry.get('model_type')
         
         if not hasattr(analyzer, '_predict_model') or not analyzer._predict_model:
             return jsonify({"error": "No model available for stress testing"}), 400
         
-        # We need test data - this would need to be stored during training
-        # For now, return a placeholder response
-        return jsonify({
-            "message": "Stress testing requires access to test data",
-            "recommendation": "Run stress test during model training for accurate results"
-        }), 200
+        holdout = analyzer_entry.get('holdout')
+        if not holdout or model_type not in ('classification', 'regression'):
+            return jsonify({"error": "No holdout data retained for this model: retrain it to run stress tests"}), 400
+        
+        # Modèle final appliqué aux features encodées brutes du holdout
+        model = analyzer._predict_model
+        transformer = getattr(analyzer, '_predict_poly', None) or analyzer._predict_scaler
+        if transformer is not None:
+            model = ScaledModel(model, transformer)
+        
+        results = StressTester.run_stress_tests(
+            model,
+            holdout['X'],
+            holdout['y'],
+            analyzer._encoded_feature_columns or [],
+            task=model_type,
+            random_state=data.get('random_state', 42),
+            repetitions=int(data.get('repetitions', 10))
+        )
+        
+        return jsonify(_normalize_payload({
+            'dataset_id': dataset_id,
+            'model_type': model_type,
+            'n_holdout': int(len(holdout['y'])),
+            'stress_test_results': results
+        })), 200
         
     except Exception as e:
         return jsonify({"error": str(e), "traceback": traceback.format_exc()}), 500
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark des méthodes de clustering: temps d'exécution et pic mémoire
+en fonction du nombre de lignes.
+
+Usage:
+    python benchmark_clustering.py
+    python benchmark_clustering.py --rows 10000 50000 200000 --methods minibatch_kmeans birch
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.datasets import make_blobs
+
+from analyses.clustering import ClusteringAnalyzer
+
+SCALABLE_METHODS = ['minibatch_kmeans', 'birch', 'hdbscan', 'dbscan_graph']
+EXACT_METHODS = ['kmeans', 'dbscan', 'hierarchical', 'gmm']
+
+# Au-delà de cette taille, les méthodes exactes O(n²) ne sont pas lancées
+EXACT_ROW_LIMIT = 20000
+
+METHOD_RUNNERS = {
+    'kmeans': '_kmeans_clustering',
+    'dbscan': '_dbscan_clustering',
+    'hierarchical': '_hierarchical_clustering',
+    'gmm': '_gmm_clustering',
+    'minibatch_kmeans': '_minibatch_kmeans_clustering',
+    'birch': '_birch_clustering',
+    'hdbscan': '_hdbscan_clustering',
+    'dbscan_graph': '_dbscan_graph_clustering',
+}
+
+
+def run_benchmark(rows, methods, n_features=8, exact_row_limit=EXACT_ROW_LIMIT):
+    config = {'n_clusters': 5, 'eps': 0.3, 'min_samples': 10, 'min_cluster_size': 50}
+    analyzer = ClusteringAnalyzer(None)
+    results = []
+
+    for n_rows in rows:
+        X, _ = make_blobs(n_samples=n_rows, n_features=n_features, centers=5, random_state=42)
+        X = (X - X.mean(axis=0)) / X.std(axis=0)
+
+        for method in methods:
+            if method in EXACT_METHODS and n_rows > exact_row_limit:
+                results.append({'rows': n_rows, 'method': method, 'seconds': None, 'peak_mb': None})
+                continue
+
+            runner = getattr(analyzer, METHOD_RUNNERS[method])
+            tracemalloc.start()
+            start = time.perf_counter()
+            output = runner(X, config)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append({
+                'rows': n_rows,
+                'method': method,
+                'seconds': elapsed,
+                'peak_mb': peak / 1024 ** 2,
+                'n_clusters': output.get('n_clusters')
+            })
+
+    return results
+
+
+def print_results(results):
+    print(f"{'rows':>9}  {'method':<18} {'time (s)':>10} {'peak (MB)':>10} {'clusters':>9}")
+    print('-' * 62)
+    for r in results:
+        if r['seconds'] is None:
+            print(f"{r['rows']:>9}  {r['method']:<18} {'skipped':>10} {'-':>10} {'-':>9}")
+        else:
+            print(f"{r['rows']:>9}  {r['method']:<18} {r['seconds']:>10.3f} {r['peak_mb']:>10.1f} {str(r['n_clusters']):>9}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[5000, 20000, 50000, 100000])
+    parser.add_argument('--methods', nargs='+', default=SCALABLE_METHODS + EXACT_METHODS,
+                        choices=SCALABLE_METHODS + EXACT_METHODS)
+    parser.add_argument('--features', type=int, default=8)
+    parser.add_argument('--exact-row-limit', type=int, default=EXACT_ROW_LIMIT)
+    args = parser.parse_args()
+
+    print_results(run_benchmark(args.rows, args.methods, args.features, args.exact_row_limit))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark des contrefactuels: solveurs dédiés au modèle (linéaire / arbres)
+contre la recherche aléatoire par lots, en temps et en distance.
+
+Usage:
+    python benchmark_counterfactuals.py
+    python benchmark_counterfactuals.py --samples 50 --features 20 --models logistic random_forest
+"""
+
+import argparse
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+
+from analyses.what_if import WhatIfAnalyzer
+
+MODELS = {
+    'logistic': lambda: LogisticRegression(max_iter=1000),
+    'linear_svc': lambda: SVC(kernel='linear'),
+    'decision_tree': lambda: DecisionTreeClassifier(random_state=0),
+    'random_forest': lambda: RandomForestClassifier(n_estimators=50, random_state=0),
+    'extra_trees': lambda: ExtraTreesClassifier(n_estimators=50, random_state=0),
+}
+
+
+def run_benchmark(models, n_samples=20, n_features=10, n_rows=2000, max_changes=3):
+    rng = np.random.default_rng(42)
+    X = rng.random((n_rows, n_features))
+    weights = rng.normal(size=n_features)
+    y = (X @ weights > np.median(X @ weights)).astype(int)
+    names = [f'f{i}' for i in range(n_features)]
+    ranges = {name: (0.0, 1.0) for name in names}
+
+    results = []
+    for name in models:
+        model = MODELS[name]().fit(X, y)
+        samples = X[model.predict(X) == 0][:n_samples]
+
+        for solver in ('auto', 'random'):
+            times, dists, found = [], [], 0
+            for i, x in enumerate(samples):
+                start = time.perf_counter()
+                output = WhatIfAnalyzer.find_counterfactual(model, x, names, 0, 1, ranges,
+                                                            max_changes=max_changes,
+                                                            random_state=i, solver=solver)
+                times.append(time.perf_counter() - start)
+                if output['found']:
+                    found += 1
+                    dists.append(output['distance'])
+
+            results.append({
+                'model': name,
+                'solver': output.get('solver', solver),
+                'found': found,
+                'samples': len(samples),
+                'median_ms': float(np.median(times) * 1000),
+                'mean_distance': float(np.mean(dists)) if dists else None
+            })
+
+    return results
+
+
+def print_results(results):
+    print(f"{'model':<15} {'solver':<22} {'found':>7} {'median (ms)':>12} {'mean L2²':>10}")
+    print('-' * 70)
+    for r in results:
+        distance = f"{r['mean_distance']:>10.4f}" if r['mean_distance'] is not None else f"{'-':>10}"
+        print(f"{r['model']:<15} {r['solver']:<22} {r['found']:>3}/{r['samples']:<3} "
+              f"{r['median_ms']:>12.1f} {distance}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=list(MODELS))
+    parser.add_argument('--samples', type=int, default=20)
+    parser.add_argument('--features', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--max-changes', type=int, default=3)
+    args = parser.parse_args()
+
+    print_results(run_benchmark(args.models, args.samples, args.features, args.rows, args.max_changes))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la recherche classée symptômes → maladies (BM25 / TF-IDF)
+contre le scoring Bernoulli Naive Bayes: recall@k sur des profils partiels
+et latence par requête (unitaire et par lot).
+
+Usage:
+    python benchmark_symptom_retrieval.py
+    python benchmark_symptom_retrieval.py --keep 0.3 --noise 1 --k 1 3 10
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.naive_bayes import BernoulliNB
+
+from analyses.symptom_matching import (
+    DEFAULT_FREQUENCY_CORPUS, NaiveBayesScorer, SymptomRetrievalIndex, load_symptom_corpus
+)
+
+DEFAULT_MATRIX = os.path.join(os.path.dirname(__file__), '..', 'disease_symptom_matrix.csv')
+
+
+def partial_queries(X, keep=0.5, noise=0, random_state=42):
+    """Requêtes: fraction `keep` des symptômes de chaque maladie (au moins un) + `noise` symptômes au hasard"""
+    rng = np.random.default_rng(random_state)
+    Q = np.zeros_like(X)
+    for i, row in enumerate(X):
+        present = np.flatnonzero(row)
+        if len(present):
+            kept = rng.choice(present, size=max(1, int(round(keep * len(present)))), replace=False)
+            Q[i, kept] = 1
+        if noise:
+            Q[i, rng.choice(X.shape[1], size=noise, replace=False)] = 1
+    return Q
+
+
+def rank_naive_bayes(scorer, Q, top_k):
+    jll = scorer.joint_log_likelihood(Q)
+    top = np.argpartition(-jll, top_k - 1, axis=1)[:, :top_k]
+    order = np.argsort(-np.take_along_axis(jll, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def run_benchmark(matrix_path=DEFAULT_MATRIX, keep=0.5, noise=0, ks=(1, 5, 10), single_queries=200):
+    df = pd.read_csv(matrix_path)
+    names = df['name'].to_numpy()
+    symptom_cols = [c for c in df.columns if c not in ('id', 'name')]
+    X = (df[symptom_cols].to_numpy() > 0).astype(float)
+    Q = partial_queries(X, keep, noise)
+    frequencies, corpus_size = load_symptom_corpus(DEFAULT_FREQUENCY_CORPUS)
+    top_k = max(ks)
+
+    nb_model = BernoulliNB().fit(X, np.arange(len(X)))
+    nb_scorer = NaiveBayesScorer(nb_model)
+    methods = {
+        'bm25 (corpus)': SymptomRetrievalIndex(X, names, symptom_cols, 'bm25', frequencies, corpus_size=corpus_size),
+        'tfidf (corpus)': SymptomRetrievalIndex(X, names, symptom_cols, 'tfidf', frequencies,
+                                                corpus_size=corpus_size),
+        'bm25 (matrix)': SymptomRetrievalIndex(X, names, symptom_cols, 'bm25'),
+        'bernoulli_nb': nb_scorer,
+    }
+
+    results = []
+    for label, method in methods.items():
+        if isinstance(method, SymptomRetrievalIndex):
+            rank = lambda queries: method.rank(queries, top_k)[0]
+        else:
+            rank = lambda queries: nb_model.classes_[rank_naive_bayes(method, queries, top_k)]
+
+        start = time.perf_counter()
+        top = rank(Q)
+        batch_us = (time.perf_counter() - start) / len(Q) * 1e6
+
+        times = []
+        for i in range(min(single_queries, len(Q))):
+            start = time.perf_counter()
+            rank(Q[i:i + 1])
+            times.append(time.perf_counter() - start)
+
+        hits = names[top] == names[:, None]
+        results.append({
+            'method': label,
+            'recall': {k: float(hits[:, :k].any(axis=1).mean()) for k in ks},
+            'single_ms': float(np.median(times) * 1000),
+            'batch_us': float(batch_us)
+        })
+
+    return results
+
+
+def print_results(results):
+    ks = list(results[0]['recall'])
+    header = ''.join(f"{f'R@{k}':>8}" for k in ks)
+    print(f"{'method':<16}{header} {'single (ms)':>12} {'batch (µs/q)':>13}")
+    print('-' * (16 + 8 * len(ks) + 27))
+    for r in results:
+        recalls = ''.join(f"{r['recall'][k]:>8.3f}" for k in ks)
+        print(f"{r['method']:<16}{recalls} {r['single_ms']:>12.3f} {r['batch_us']:>13.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--matrix', default=DEFAULT_MATRIX)
+    parser.add_argument('--keep', type=float, default=0.5)
+    parser.add_argument('--noise', type=int, default=0)
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 5, 10])
+    args = parser.parse_args()
+
+    print_results(run_benchmark(args.matrix, args.keep, args.noise, tuple(args.k)))
@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2_contingency
+
+sys.path.append(os.path.dirname(__file__))
+from analyses.advanced_stats import AdvancedStatsAnalyzer
+
+
+class ChiSquareScreeningTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 300
+        disease = rng.choice(['A', 'B', 'C', 'D'], n)
+        self.df = pd.DataFrame({
+            'disease': disease,
+            # Symptôme fortement lié à la maladie A
+            'fievre': np.where(disease == 'A', 1, rng.integers(0, 2, n) * (rng.random(n) < 0.2)),
+            'toux': rng.integers(0, 2, n),
+            'groupe': rng.choice(['x', 'y', 'z'], n),
+            'constante': np.ones(n, dtype=int),
+        })
+        self.df.loc[:9, 'groupe'] = None
+
+    def test_matches_scipy_per_pair(self):
+        analyzer = AdvancedStatsAnalyzer(self.df)
+        result = analyzer._chi_square_screening({'target': 'disease'}, 0.05)
+        by_column = {r['column']: r for r in result['results']}
+
+        for col in ['fievre', 'toux', 'groupe']:
+            table = pd.crosstab(self.df['disease'], self.df[col])
+            chi2, p_value, dof, _ = chi2_contingency(table)
+            self.assertAlmostEqual(by_column[col]['chi2_statistic'], chi2, places=8)
+            self.assertAlmostEqual(by_column[col]['p_value'], p_value, places=10)
+            self.assertEqual(by_column[col]['degrees_of_freedom'], dof)
+
+    def test_ranking_and_degenerate_columns(self):
+        analyzer = AdvancedStatsAnalyzer(self.df)
+        results = analyzer.perform_analysis({
+            'tests': ['chi_square_screening'],
+            'chi_square_screening': {'target': 'disease', 'top_n': 2}
+        })
+        screening = results['tests']['chi_square_screening']
+        self.assertEqual(screening['results'][0]['column'], 'fievre')
+        self.assertEqual(len(screening['results']), 2)
+        self.assertIn('constante', screening['skipped_columns'])
+
+    def test_high_cardinality_columns_are_skipped(self):
+        df = self.df.assign(patient_id=np.arange(len(self.df)), mesure=np.random.default_rng(1).normal(size=len(self.df)))
+        result = AdvancedStatsAnalyzer(df)._chi_square_screening({'target': 'disease', 'max_levels': 20}, 0.05)
+        self.assertEqual(result['high_cardinality_columns'], ['patient_id', 'mesure'])
+        self.assertIn('patient_id', result['skipped_columns'])
+        self.assertEqual(result['n_columns_tested'], 3)
+        self.assertEqual({r['column'] for r in result['results']}, {'fievre', 'toux', 'groupe'})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.datasets import make_blobs
+from sklearn.metrics import silhouette_score
+
+sys.path.append(os.path.dirname(__file__))
+from analyses.clustering import ClusteringAnalyzer
+from app import app, active_analyzers
+from utils.array_codec import decode_array
+
+
+def _blobs_frame(n_samples=600, centers=3, random_state=0):
+    X, _ = make_blobs(n_samples=n_samples, n_features=3, centers=centers,
+                      cluster_std=0.6, random_state=random_state)
+    return pd.DataFrame(X, columns=['a', 'b', 'c'])
+
+
+class ScalableClusteringTests(unittest.TestCase):
+    def test_scalable_methods_find_blobs(self):
+        analyzer = ClusteringAnalyzer(_blobs_frame())
+        results = analyzer.perform_analysis({
+            'features': ['a', 'b', 'c'],
+            'methods': ['minibatch_kmeans', 'birch', 'hdbscan', 'dbscan_graph'],
+            'n_clusters': 3,
+            'eps': 0.4,
+            'min_samples': 5,
+            'min_cluster_size': 20
+        })
+        models = results['models']
+        self.assertEqual(models['minibatch_kmeans']['n_clusters'], 3)
+        self.assertEqual(len(models['birch']['cluster_sizes']), 3)
+        self.assertEqual(models['hdbscan']['n_clusters'], 3)
+        self.assertGreater(models['minibatch_kmeans']['metrics']['silhouette_score'], 0.5)
+
+    def test_dbscan_graph_matches_dbscan(self):
+        analyzer = ClusteringAnalyzer(_blobs_frame())
+        results = analyzer.perform_analysis({
+            'features': ['a', 'b', 'c'],
+            'methods': ['dbscan', 'dbscan_graph'],
+            'eps': 0.4,
+            'min_samples': 5
+        })
+        np.testing.assert_array_equal(
+            results['models']['dbscan']['labels'],
+            results['models']['dbscan_graph']['labels']
+        )
+
+
+class ClusterQualityTests(unittest.TestCase):
+    def setUp(self):
+        X, _ = make_blobs(n_samples=3000, n_features=4, centers=4, random_state=1)
+        self.X = (X - X.mean(axis=0)) / X.std(axis=0)
+        self.labels = KMeans(n_clusters=4, random_state=0, n_init=3).fit_predict(self.X)
+        self.analyzer = ClusteringAnalyzer(None)
+
+    def test_sampled_silhouette_brackets_exact_value(self):
+        exact = silhouette_score(self.X, self.labels)
+        metrics = self.analyzer._cluster_quality(self.X, self.labels, {'silhouette_sample_size': 600})
+        low, high = metrics['silhouette_ci']
+        self.assertLessEqual(metrics['silhouette_sample_size'], 610)
+        self.assertLess(low, exact + 0.02)
+        self.assertGreater(high, exact - 0.02)
+
+    def test_large_n_falls_back_to_cheap_metrics(self):
+        metrics = self.analyzer._cluster_quality(self.X, self.labels, {'silhouette_max_rows': 1000})
+        self.assertIsNone(metrics['silhouette_score'])
+        self.assertIsNotNone(metrics['davies_bouldin_index'])
+        self.assertIsNotNone(metrics['calinski_harabasz_score'])
+
+        summary = self.analyzer._compare_clustering_models({'kmeans': {'method': 'K-Means', 'metrics': metrics}})
+        self.assertEqual(summary['best_model'], 'K-Means')
+
+    def test_optimal_k_with_cached_distance_block(self):
+        result = self.analyzer._find_optimal_k(self.X, max_k=6, config={'silhouette_sample_size': 500})
+        self.assertEqual(result['recommended_k'], 4)
+        self.assertEqual(result['silhouette_sample_size'], 500)
+        self.assertEqual(len(result['silhouette_confidence_intervals']), len(result['k_range']))
+
+
+class WarmStartSweepTests(unittest.TestCase):
+    def test_recommended_model_is_reused(self):
+        analyzer = ClusteringAnalyzer(_blobs_frame(centers=4))
+        results = analyzer.perform_analysis({
+            'features': ['a', 'b', 'c'],
+            'methods': ['kmeans'],
+            'find_optimal_k': True,
+            'use_optimal_k': True,
+            'n_jobs': 2
+        })
+        self.assertEqual(results['optimal_k']['recommended_k'], 4)
+        kmeans = results['models']['kmeans']
+        self.assertEqual(kmeans['n_clusters'], 4)
+        self.assertTrue(kmeans['reused_from_k_sweep'])
+        self.assertEqual(kmeans['n_init'], 1)
+
+    def test_minibatch_sweep_model_is_reused_unless_disabled(self):
+        config = {'features': ['a', 'b', 'c'], 'methods': ['kmeans'], 'find_optimal_k': True,
+                  'use_optimal_k': True, 'sweep_minibatch': True}
+        kmeans = ClusteringAnalyzer(_blobs_frame(centers=3)).perform_analysis(config)['models']['kmeans']
+        self.assertTrue(kmeans['reused_from_k_sweep'])
+        self.assertEqual(kmeans['estimator'], 'MiniBatchKMeans')
+
+        refit = ClusteringAnalyzer(_blobs_frame(centers=3)).perform_analysis(
+            dict(config, reuse_sweep_model=False))['models']['kmeans']
+        self.assertFalse(refit['reused_from_k_sweep'])
+        self.assertEqual((refit['estimator'], refit['n_init']), ('KMeans', 10))
+
+    def test_minibatch_sweep(self):
+        analyzer = ClusteringAnalyzer(None)
+        X = _blobs_frame(centers=3).to_numpy()
+        result = analyzer._find_optimal_k(X, max_k=5, config={'sweep_minibatch': True})
+        self.assertEqual(result['sweep']['estimator'], 'MiniBatchKMeans')
+        self.assertEqual(result['recommended_k'], 3)
+
+
+class CompactLabelTransportTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        active_analyzers.clear()
+
+    def test_compact_response_and_labels_on_demand(self):
+        frame = _blobs_frame(n_samples=900)
+        resp = self.client.post('/analyze/clustering-advanced', json={
+            'dataset_id': 'clu1',
+            'data': frame.to_dict('records'),
+            'config': {
+                'features': ['a', 'b', 'c'],
+                'methods': ['kmeans', 'dbscan'],
+                'response_mode': 'compact',
+                'plot_sample_size': 200
+            }
+        })
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        encoded = body['models']['kmeans']['labels']
+        self.assertEqual(encoded['dtype'], 'int8')
+        kmeans_labels = decode_array(encoded)
+        self.assertEqual(len(kmeans_labels), 900)
+        self.assertEqual(len(body['visualization']['pca_coordinates']), 200)
+        self.assertEqual(len(body['visualization']['kmeans_labels']), 200)
+
+        labels_resp = self.client.post('/models/clustering/labels', json={'dataset_id': 'clu1', 'method': 'kmeans'})
+        self.assertEqual(labels_resp.status_code, 200)
+        fetched = decode_array(labels_resp.get_json()['labels']['kmeans'])
+        np.testing.assert_array_equal(fetched, kmeans_labels)
+
+        binary_resp = self.client.post('/models/clustering/labels',
+                                       json={'dataset_id': 'clu1', 'method': 'dbscan', 'format': 'binary'})
+        self.assertEqual(binary_resp.status_code, 200)
+        dtype = binary_resp.headers['X-Labels-Dtype']
+        self.assertEqual(len(np.frombuffer(binary_resp.data, dtype=dtype)), 900)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,377 @@
+import unittest
+import itertools
+import math
+import os
+import sys
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sklearn.calibration import calibration_curve
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append(os.path.dirname(__file__))
+from analyses.classification import ClassificationAnalyzer
+from analyses.explainability import (
+    SHAP_AVAILABLE, ShapExplainer, ExplainabilityAnalyzer, CalibrationAnalyzer, ProbabilityCalibrator
+)
+from analyses.regression import RegressionAnalyzer
+from app import app, active_analyzers
+
+
+def _toy_problem(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, 5))
+    X[:, 3] = np.round(X[:, 3])
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+    return X, y
+
+
+def _conditional_expectation(tree, x, subset):
+    """Path-dependent E[f(x) | x_S]: follow x on features of S, cover-weighted average otherwise."""
+    structure = tree.tree_
+
+    def recurse(node):
+        if structure.children_left[node] == -1:
+            value = structure.value[node, 0, :]
+            return value / value.sum()
+        left, right = structure.children_left[node], structure.children_right[node]
+        if structure.feature[node] in subset:
+            return recurse(left if np.float32(x[structure.feature[node]]) <= structure.threshold[node] else right)
+        cover = structure.weighted_n_node_samples
+        return (cover[left] * recurse(left) + cover[right] * recurse(right)) / cover[node]
+
+    return recurse(0)
+
+
+def _brute_force_shapley(tree, x, n_features):
+    phi = np.zeros((n_features, tree.tree_.value.shape[2]))
+    for i in range(n_features):
+        others = [j for j in range(n_features) if j != i]
+        for size in range(n_features):
+            weight = math.factorial(size) * math.factorial(n_features - size - 1) / math.factorial(n_features)
+            for subset in itertools.combinations(others, size):
+                phi[i] += weight * (_conditional_expectation(tree, x, set(subset) | {i})
+                                    - _conditional_expectation(tree, x, set(subset)))
+    return phi
+
+
+class ShapExplainerTests(unittest.TestCase):
+    def test_tree_shap_matches_brute_force(self):
+        X, y = _toy_problem()
+        tree = DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y)
+        explainer = ShapExplainer(tree, use_shap_library=False)
+        for x in X[:3]:
+            np.testing.assert_allclose(explainer.shap_values(x)[0], _brute_force_shapley(tree, x, 5), atol=1e-12)
+
+    def test_local_accuracy(self):
+        X, y = _toy_problem()
+        cases = [
+            (RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y), 'predict_proba'),
+            (GradientBoostingClassifier(n_estimators=30, random_state=0).fit(X, y), 'decision_function'),
+            (LogisticRegression().fit(X, y), 'decision_function'),
+        ]
+        for model, output in cases:
+            explainer = ShapExplainer(model, X)
+            phi = explainer.shap_values(X[:50])
+            prediction = np.asarray(getattr(model, output)(X[:50])).reshape(50, -1)
+            np.testing.assert_allclose(phi.sum(axis=1) + explainer.expected_value, prediction, atol=1e-9)
+
+    @unittest.skipUnless(SHAP_AVAILABLE, 'shap not installed')
+    def test_closed_form_matches_shap_library(self):
+        X, y = _toy_problem()
+        y = np.digitize(X[:, 0], [-0.5, 0.5])
+        for model in (RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y),
+                      GradientBoostingClassifier(n_estimators=30, random_state=0).fit(X, y)):
+            library = ShapExplainer(model).shap_values(X[:50])
+            closed_form = ShapExplainer(model, use_shap_library=False).shap_values(X[:50])
+            np.testing.assert_allclose(closed_form, library, atol=1e-6)
+
+    def test_binary_decision_function_class_sign(self):
+        X, y = _toy_problem()
+        explainer = ShapExplainer(LogisticRegression().fit(X, y), X)
+        positive, base_positive = explainer.explain(X[:5], class_index=1)
+        negative, base_negative = explainer.explain(X[:5], class_index=0)
+        np.testing.assert_allclose(positive, -negative)
+        self.assertAlmostEqual(base_positive, -base_negative)
+
+    def test_local_explanation_reports_method(self):
+        X, y = _toy_problem()
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+        result = ExplainabilityAnalyzer.explain_prediction_local(model, X[0], [f'f{i}' for i in range(5)])
+        self.assertTrue(result['available'])
+        self.assertEqual(result['method'], 'tree_shap')
+        self.assertEqual(len(result['contributions']), 5)
+
+
+class BatchExplanationTests(unittest.TestCase):
+    def test_streamed_aggregates_match_full_matrix(self):
+        X, y = _toy_problem()
+        y = np.digitize(X[:, 0], [-0.5, 0.5])
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+        explainer = ShapExplainer(model)
+        names = [f'f{i}' for i in range(5)]
+
+        summary = ExplainabilityAnalyzer.explain_batch(explainer, X, names, chunk_size=64, top_k=2)
+        pooled = ExplainabilityAnalyzer.explain_batch(explainer, X, names, chunk_size=64, n_jobs=2)
+
+        predicted = model.predict(X)
+        phi = explainer.shap_values(X)[np.arange(len(X)), :, predicted]
+        expected = np.abs(phi).mean(axis=0)
+        by_feature = {f['feature']: f['mean_abs_contribution'] for f in summary['global_importance']}
+        np.testing.assert_allclose([by_feature[n] for n in names], expected)
+        self.assertEqual(summary['global_importance'], pooled['global_importance'])
+        self.assertEqual(sum(c['count'] for c in summary['per_class'].values()), len(X))
+
+        self.assertEqual(len(summary['rows']), len(X))
+        first = summary['rows'][0]['top_contributions']
+        self.assertEqual(first[0]['feature'], names[int(np.argmax(np.abs(phi[0])))])
+
+    def test_default_forest_batch_runs_in_seconds(self):
+        rng = np.random.default_rng(4)
+        X = rng.normal(size=(1000, 8))
+        y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=1000) > 0).astype(int)
+        model = RandomForestClassifier(random_state=0).fit(X, y)
+        explainer = ShapExplainer(model, use_shap_library=False)
+
+        start = time.perf_counter()
+        summary = ExplainabilityAnalyzer.explain_batch(explainer, X[:300], [f'f{i}' for i in range(8)])
+        elapsed = time.perf_counter() - start
+        self.assertEqual(summary['n_rows'], 300)
+        # ~5 ms par ligne attendu; la récursion par feuille dépassait 0.1 s par ligne
+        self.assertLess(elapsed, 10.0)
+
+
+class PermutationImportanceTests(unittest.TestCase):
+    def test_signal_ranked_first_and_noise_stopped_early(self):
+        rng = np.random.default_rng(3)
+        X = rng.normal(size=(400, 4))
+        y = (X[:, 0] > 0).astype(int)
+        model = KNeighborsClassifier().fit(X[:200], y[:200])
+        names = ['signal', 'noise_a', 'noise_b', 'noise_c']
+
+        serial = ExplainabilityAnalyzer.permutation_importance(model, X[200:], y[200:], names, n_repeats=6)
+        pooled = ExplainabilityAnalyzer.permutation_importance(model, X[200:], y[200:], names, n_repeats=6, n_jobs=2)
+
+        self.assertTrue(serial['available'])
+        self.assertEqual(serial['method'], 'permutation')
+        self.assertEqual(serial['top_features'][0]['feature'], 'signal')
+        self.assertEqual(serial['top_features'][0]['n_repeats'], 6)
+        self.assertGreater(serial['top_features'][0]['importance'], 0.3)
+        self.assertNotIn('signal', serial['stopped_early'])
+        self.assertEqual(serial['top_features'], pooled['top_features'])
+
+    def test_every_method_gets_global_importance(self):
+        rng = np.random.default_rng(4)
+        frame = pd.DataFrame(rng.normal(size=(300, 3)), columns=['a', 'b', 'c'])
+        frame['label'] = np.where(frame['a'] + 0.2 * frame['b'] > 0, 'up', 'down')
+        frame['target'] = 3 * frame['a'] ** 2 + frame['b']
+
+        results = ClassificationAnalyzer(frame).perform_analysis({
+            'target': 'label', 'features': ['a', 'b', 'c'], 'cv_folds': 3,
+            'methods': ['knn', 'svm', 'naive_bayes', 'random_forest']
+        })
+        for key, model_result in results['models'].items():
+            importance = model_result['feature_importance_global']
+            self.assertEqual(importance['top_features'][0]['feature'], 'a', key)
+        self.assertEqual(results['models']['svm']['feature_importance_global']['method'], 'permutation')
+        self.assertEqual(results['models']['random_forest']['feature_importance_global']['method'], 'impurity')
+
+        results = RegressionAnalyzer(frame).perform_analysis({
+            'target': 'target', 'features': ['a', 'b', 'c'], 'methods': ['linear', 'polynomial']
+        })
+        polynomial = results['models']['polynomial']['feature_importance_global']
+        self.assertEqual(polynomial['method'], 'permutation')
+        self.assertEqual(polynomial['metric'], 'r2')
+        self.assertEqual(polynomial['top_features'][0]['feature'], 'a')
+        self.assertEqual(results['models']['linear']['feature_importance_global']['method'], 'coefficients')
+
+
+class CalibrationTests(unittest.TestCase):
+    def test_binary_curve_matches_reference(self):
+        rng = np.random.default_rng(5)
+        proba = rng.uniform(size=2000)
+        y = (rng.uniform(size=2000) < proba ** 2).astype(int)
+
+        result = CalibrationAnalyzer.analyze_calibration(y, proba)
+        actual, predicted = calibration_curve(y, proba, n_bins=10)
+        curve = result['calibration_curve']
+        np.testing.assert_allclose([b['actual_probability'] for b in curve], actual)
+        np.testing.assert_allclose([b['predicted_probability'] for b in curve], predicted)
+        self.assertAlmostEqual(result['brier_score'], np.mean((proba - y) ** 2))
+        weighted = sum(b['count'] * b['calibration_error'] for b in curve) / len(y)
+        self.assertAlmostEqual(result['expected_calibration_error'], weighted)
+
+        two_columns = CalibrationAnalyzer.analyze_calibration(y, np.column_stack([1 - proba, proba]))
+        self.assertEqual(two_columns['calibration_curve'], curve)
+
+    def test_multiclass_one_vs_rest(self):
+        rng = np.random.default_rng(6)
+        proba = rng.dirichlet(np.ones(3), size=1500)
+        y = np.array([rng.choice(3, p=p) for p in proba])
+        labels = np.array(['a', 'b', 'c'])
+
+        result = CalibrationAnalyzer.analyze_calibration(labels[y], proba, classes=labels)
+        onehot = np.eye(3)[y]
+        self.assertAlmostEqual(result['brier_score'], np.mean(np.sum((proba - onehot) ** 2, axis=1)))
+        self.assertEqual([c['class'] for c in result['per_class']], ['a', 'b', 'c'])
+        for k, per_class in enumerate(result['per_class']):
+            actual, predicted = calibration_curve(onehot[:, k], proba[:, k], n_bins=10)
+            np.testing.assert_allclose([b['actual_probability'] for b in per_class['calibration_curve']], actual)
+            self.assertEqual(sum(b['count'] for b in per_class['calibration_curve']), 1500)
+        self.assertLess(result['expected_calibration_error'], 0.05)
+
+    def test_calibrator_reduces_error(self):
+        rng = np.random.default_rng(7)
+        proba = rng.dirichlet(np.ones(3) * 0.5, size=4000)
+        y = np.array([rng.choice(3, p=p) for p in proba])
+        overconfident = proba ** 3 / np.sum(proba ** 3, axis=1, keepdims=True)
+        before = CalibrationAnalyzer.analyze_calibration(y[2000:], overconfident[2000:])
+        for method in ('isotonic', 'sigmoid'):
+            calibrator = ProbabilityCalibrator(method).fit(overconfident[:2000], y[:2000])
+            calibrated = calibrator.transform(overconfident[2000:])
+            np.testing.assert_allclose(calibrated.sum(axis=1), 1.0)
+            after = CalibrationAnalyzer.analyze_calibration(y[2000:], calibrated)
+            self.assertLess(after['expected_calibration_error'], before['expected_calibration_error'], method)
+
+
+class ExplainEndpointTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        active_analyzers.clear()
+
+    def test_explainer_is_cached_per_model(self):
+        rng = np.random.default_rng(2)
+        rows = [{'x1': float(a), 'x2': float(b), 'colour': 'red' if a > 5 else 'blue',
+                 'label': 'yes' if a > b else 'no'}
+                for a, b in rng.uniform(0, 10, size=(150, 2))]
+        resp = self.client.post('/analyze/classification', json={
+            'dataset_id': 'ex1',
+            'data': rows,
+            'config': {'target': 'label', 'features': ['x1', 'x2', 'colour'], 'methods': ['random_forest'],
+                       'test_size': 0.2, 'cv_folds': 3}
+        })
+        self.assertEqual(resp.status_code, 200)
+
+        payload = {'dataset_id': 'ex1', 'features': {'x1': 8.0, 'x2': 1.0, 'colour': 'red'}}
+        resp = self.client.post('/predict/explain', json=payload)
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        explanation = body['explanation']
+        self.assertTrue(explanation['available'])
+        self.assertEqual(explanation['method'], 'tree_shap')
+        self.assertEqual(explanation['output_space'], 'probability')
+        total = explanation['base_value'] + sum(c['contribution'] for c in explanation['local_contributions'])
+        self.assertAlmostEqual(total, body['probability'], places=6)
+        self.assertFalse(explanation['calibrated'])
+        self.assertAlmostEqual(explanation['explained_value'], total)
+
+        explainer = active_analyzers['ex1']['explainer']
+        self.assertIsNotNone(explainer)
+        self.client.post('/predict/explain', json=payload)
+        self.assertIs(active_analyzers['ex1']['explainer'], explainer)
+
+        resp = self.client.post('/predict/explain/batch', json={
+            'dataset_id': 'ex1', 'rows': rows[:100], 'chunk_size': 30, 'top_k': 3
+        })
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body['n_rows'], 100)
+        self.assertEqual(len(body['rows']), 100)
+        self.assertEqual(len(body['rows'][0]['top_contributions']), 3)
+        self.assertLessEqual(set(body['per_class']), {'yes', 'no'})
+        self.assertEqual({f['feature'] for f in body['global_importance'][:2]}, {'x1', 'x2'})
+
+    def test_calibrated_predictor_used_at_predict(self):
+        rng = np.random.default_rng(8)
+        rows = [{'x1': float(a), 'x2': float(b), 'label': ['low', 'mid', 'high'][int(a + b > 7) + int(a + b > 13)]}
+                for a, b in rng.uniform(0, 10, size=(240, 2))]
+        resp = self.client.post('/analyze/classification', json={
+            'dataset_id': 'cal1',
+            'data': rows,
+            'config': {'target': 'label', 'features': ['x1', 'x2'], 'methods': ['svm'],
+                       'cv_folds': 3, 'calibration_method': 'isotonic'}
+        })
+        self.assertEqual(resp.status_code, 200)
+        calibration = resp.get_json()['models']['svm']['calibration']
+        self.assertEqual(len(calibration['per_class']), 3)
+
+        analyzer = active_analyzers['cal1']['analyzer']
+        self.assertIsInstance(analyzer._calibrator, ProbabilityCalibrator)
+        resp = self.client.post('/predict', json={'dataset_id': 'cal1', 'features': {'x1': 9.0, 'x2': 8.0}})
+        body = resp.get_json()
+        self.assertTrue(body['calibrated'])
+        self.assertEqual(body['top_prediction']['class'], 'high')
+        self.assertAlmostEqual(sum(p['probability'] for p in body['predictions']), 1.0, places=3)
+
+    def _calibration_rows(self):
+        rng = np.random.default_rng(10)
+        return [{'x1': float(a), 'x2': float(b), 'label': 'yes' if a + rng.normal() > b else 'no'}
+                for a, b in rng.uniform(0, 10, size=(150, 2))]
+
+    def _train_calibrated(self, dataset_id, method):
+        return self.client.post('/analyze/classification', json={
+            'dataset_id': dataset_id,
+            'data': self._calibration_rows(),
+            'config': {'target': 'label', 'features': ['x1', 'x2'], 'methods': ['random_forest'],
+                       'cv_folds': 3, 'calibration_method': method}
+        })
+
+    def test_platt_alias_and_unknown_calibration_method(self):
+        self.assertEqual(self._train_calibrated('cal3', 'platt').status_code, 200)
+        analyzer = active_analyzers['cal3']['analyzer']
+        self.assertEqual(analyzer._calibrator.method, 'sigmoid')
+        resp = self.client.post('/predict', json={'dataset_id': 'cal3', 'features': {'x1': 9.0, 'x2': 1.0}})
+        self.assertTrue(resp.get_json()['calibrated'])
+
+        body = self._train_calibrated('cal4', 'beta').get_json()
+        self.assertEqual(body['error'], 'Invalid calibration_method')
+        self.assertIn('platt', body['validation_errors'][0])
+
+    def test_calibration_failure_keeps_served_model(self):
+        with mock.patch.object(ProbabilityCalibrator, 'fit', side_effect=ValueError('degenerate fold')):
+            body = self._train_calibrated('cal5', 'isotonic').get_json()
+        self.assertTrue(any('degenerate fold' in w for w in body['warnings']))
+
+        analyzer = active_analyzers['cal5']['analyzer']
+        self.assertIsNotNone(analyzer._predict_model)
+        self.assertIsNone(analyzer._calibrator)
+        resp = self.client.post('/predict', json={'dataset_id': 'cal5', 'features': {'x1': 9.0, 'x2': 1.0}})
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(resp.get_json()['calibrated'])
+
+    def test_explanation_sums_to_uncalibrated_probability(self):
+        rng = np.random.default_rng(9)
+        rows = [{'x1': float(a), 'x2': float(b), 'label': 'yes' if a + rng.normal() > b else 'no'}
+                for a, b in rng.uniform(0, 10, size=(200, 2))]
+        resp = self.client.post('/analyze/classification', json={
+            'dataset_id': 'cal2',
+            'data': rows,
+            'config': {'target': 'label', 'features': ['x1', 'x2'], 'methods': ['random_forest'],
+                       'cv_folds': 3, 'calibration_method': 'isotonic'}
+        })
+        self.assertEqual(resp.status_code, 200)
+
+        features = {'x1': 6.0, 'x2': 5.5}
+        body = self.client.post('/predict/explain', json={'dataset_id': 'cal2', 'features': features}).get_json()
+        explanation = body['explanation']
+        self.assertTrue(explanation['calibrated'])
+        self.assertIn('uncalibrated', explanation['additivity_note'])
+
+        analyzer = active_analyzers['cal2']['analyzer']
+        X_sample = analyzer.encode_row(features).reshape(1, -1)
+        if analyzer._predict_scaler is not None:
+            X_sample = analyzer._predict_scaler.transform(X_sample)
+        raw = analyzer._predict_model.predict_proba(X_sample)[0]
+        class_index = int(np.argmax(analyzer.predict_proba(features)[1]))
+        total = explanation['base_value'] + sum(c['contribution'] for c in explanation['local_contributions'])
+        self.assertAlmostEqual(explanation['explained_value'], total)
+        self.assertAlmostEqual(total, raw[class_index], places=6)
+
+
+if __name__ == "__main__":
+    unittest.main()
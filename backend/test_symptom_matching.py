@@ -0,0 +1,194 @@
+import unittest
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.naive_bayes import BernoulliNB, MultinomialNB
+
+sys.path.append(os.path.dirname(__file__))
+from analyses.symptom_matching import (
+    SymptomMatchingAnalyzer, NaiveBayesScorer, SymptomRetrievalIndex, _binarize_symptoms, load_symptom_corpus
+)
+from app import app, active_analyzers
+
+
+def _symptom_frame(n_diseases=6, rows_per_disease=20, n_symptoms=30, seed=0):
+    rng = np.random.default_rng(seed)
+    profiles = rng.random((n_diseases, n_symptoms)) < 0.25
+    disease = np.repeat(np.arange(n_diseases), rows_per_disease)
+    noise = rng.random((len(disease), n_symptoms)) < 0.05
+    X = (profiles[disease] ^ noise).astype(int)
+    frame = pd.DataFrame(X, columns=[f's{j}' for j in range(n_symptoms)])
+    frame.insert(0, 'name', [f'maladie_{d}' for d in disease])
+    frame.insert(0, 'id', np.arange(len(frame)))
+    return frame
+
+
+class NaiveBayesScoringTests(unittest.TestCase):
+    def test_median_binarization_matches_column_loop(self):
+        X = np.random.default_rng(1).normal(size=(50, 8))
+        binary, is_boolean = _binarize_symptoms(X)
+        self.assertFalse(is_boolean)
+        self.assertTrue(sparse.issparse(binary))
+        expected = np.column_stack([X[:, j] > np.median(X[:, j]) for j in range(X.shape[1])])
+        np.testing.assert_array_equal(binary.toarray(), expected)
+
+    def test_scorer_matches_sklearn_probabilities(self):
+        frame = _symptom_frame()
+        X = frame.filter(like='s').to_numpy()
+        y = frame['name'].to_numpy()
+        queries = (np.random.default_rng(2).random((15, X.shape[1])) < 0.3).astype(float)
+        for model in (BernoulliNB().fit(X, y), MultinomialNB().fit(X, y)):
+            scorer = NaiveBayesScorer(model)
+            np.testing.assert_allclose(scorer.predict_proba(sparse.csr_matrix(queries)),
+                                       model.predict_proba(queries), atol=1e-10)
+
+    def test_all_models_share_binarized_matrix(self):
+        analyzer = SymptomMatchingAnalyzer(_symptom_frame())
+        results = analyzer.perform_analysis({'disease_column': 'name', 'model': 'all'})
+        self.assertTrue(results['success'])
+        self.assertGreater(results['bernoulli_nb']['accuracy'], 0.9)
+        self.assertGreater(results['multinomial_nb']['accuracy'], 0.9)
+        self.assertIsInstance(analyzer.scorer, NaiveBayesScorer)
+
+        profile = analyzer.df.loc[analyzer.df['name'] == 'maladie_3', analyzer.feature_names].mean()
+        symptoms = list(profile[profile > 0.5].index)
+        predictions = analyzer.predict_disease(symptoms, analyzer.trained_model, analyzer.feature_names, top_k=3)
+        self.assertEqual(predictions[0]['disease'], 'maladie_3')
+
+    def test_unsplit_bernoulli_uses_presence(self):
+        frame = _symptom_frame(n_diseases=12, rows_per_disease=1)
+        symptom_cols = list(frame.columns[2:])
+        counts = np.random.default_rng(3).integers(1, 4, size=(len(frame), len(symptom_cols)))
+        frame[symptom_cols] = frame[symptom_cols].to_numpy() * counts
+        analyzer = SymptomMatchingAnalyzer(frame)
+        results = analyzer.perform_analysis({'disease_column': 'name', 'model': 'bernoulli'})
+        self.assertEqual(results['bernoulli_nb']['test_samples'], 0)
+
+        X = frame[symptom_cols].to_numpy()
+        expected = BernoulliNB().fit(X > 0, frame['name'].to_numpy())
+        np.testing.assert_allclose(analyzer.trained_model.feature_log_prob_, expected.feature_log_prob_)
+
+    def test_predict_endpoint_uses_scorer(self):
+        client = app.test_client()
+        active_analyzers.clear()
+        frame = _symptom_frame()
+        resp = client.post('/analyze/symptom-matching/train', json={
+            'dataset_id': 'sym1',
+            'data': frame.to_dict('records'),
+            'config': {'disease_column': 'name', 'model': 'bernoulli'}
+        })
+        self.assertEqual(resp.status_code, 200)
+        row = frame.iloc[0]
+        resp = client.post('/predict', json={'dataset_id': 'sym1',
+                                             'features': {c: int(row[c]) for c in frame.columns[2:]}})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()['top_prediction']['class'], row['name'])
+
+
+class DiseaseProfileTests(unittest.TestCase):
+    def test_profiles_cover_every_disease_and_match_nlargest(self):
+        frame = _symptom_frame(n_diseases=30, rows_per_disease=3)
+        symptom_cols = list(frame.columns[2:])
+        profiles = SymptomMatchingAnalyzer(frame)._top_symptoms_per_disease(frame, symptom_cols, 'name', top_n=5)
+        self.assertEqual([p['disease'] for p in profiles], list(frame['name'].unique()))
+
+        for profile in profiles:
+            counts = frame.loc[frame['name'] == profile['disease'], symptom_cols].sum()
+            top = counts.nlargest(5)
+            self.assertEqual(profile['total_symptom_count'], int(counts.sum()))
+            self.assertEqual([s['count'] for s in profile['top_symptoms']], top.tolist())
+            self.assertEqual([int(counts[s['symptom']]) for s in profile['top_symptoms']], top.tolist())
+
+    def test_missing_disease_and_symptom_values(self):
+        frame = _symptom_frame(n_diseases=4, rows_per_disease=3, n_symptoms=6).astype({'s0': float, 's1': float})
+        symptom_cols = list(frame.columns[2:])
+        frame.loc[0, 'name'] = np.nan
+        frame.loc[[1, 4], 's0'] = np.nan
+        frame.loc[7, 's1'] = np.nan
+        profiles = SymptomMatchingAnalyzer(frame)._top_symptoms_per_disease(frame, symptom_cols, 'name', top_n=3)
+        self.assertEqual([p['disease'] for p in profiles], list(frame['name'].dropna().unique()))
+
+        for profile in profiles:
+            counts = frame.loc[frame['name'] == profile['disease'], symptom_cols].sum()
+            self.assertEqual(profile['total_symptom_count'], int(counts.sum()))
+            self.assertEqual([s['count'] for s in profile['top_symptoms']], counts.nlargest(3).astype(int).tolist())
+
+
+class RetrievalIndexTests(unittest.TestCase):
+    def setUp(self):
+        frame = _symptom_frame(n_diseases=8, rows_per_disease=1, n_symptoms=40)
+        self.symptom_cols = list(frame.columns[2:])
+        self.X = frame[self.symptom_cols].to_numpy()
+        self.names = frame['name'].to_numpy()
+
+    def test_tfidf_documents_match_sklearn_and_rank_by_cosine(self):
+        index = SymptomRetrievalIndex(self.X, self.names, self.symptom_cols, weighting='tfidf')
+        reference = TfidfTransformer().fit(self.X)
+        np.testing.assert_allclose(index.idf, reference.idf_)
+        np.testing.assert_allclose(index.documents.toarray(), reference.transform(self.X).toarray())
+
+        queries = [['s1', 's5', 's9'], ['s2', 'inconnu']]
+        top, scores = index.rank(queries, top_k=3)
+        dense = np.zeros((2, len(self.symptom_cols)))
+        dense[0, [1, 5, 9]] = 1
+        dense[1, 2] = 1
+        expected = cosine_similarity(dense * reference.idf_, index.documents)
+        np.testing.assert_allclose(scores, -np.sort(-expected, axis=1)[:, :3])
+
+    def test_corpus_frequencies_drive_idf(self):
+        corpus = {'s0': 8, 's1': 1}
+        index = SymptomRetrievalIndex(self.X, self.names, self.symptom_cols, weighting='bm25',
+                                      document_frequency=corpus, corpus_size=40)
+        self.assertEqual(index.corpus_coverage, 2)
+        self.assertAlmostEqual(index.idf[0], np.log1p(32.5 / 8.5))
+        self.assertAlmostEqual(index.idf[1], np.log1p(39.5 / 1.5))
+        matrix_df = self.X[:, 2].sum()
+        self.assertAlmostEqual(index.idf[2], np.log1p((8 - matrix_df + 0.5) / (matrix_df + 0.5)))
+        symptoms = [c for c, present in zip(self.symptom_cols, self.X[4]) if present]
+        self.assertEqual(index.search(symptoms, top_k=1)[0]['disease'], self.names[4])
+
+        # Sans N du corpus, celui de la matrice et des fréquences bornées
+        clamped = SymptomRetrievalIndex(self.X, self.names, self.symptom_cols, weighting='bm25',
+                                        document_frequency=corpus)
+        self.assertAlmostEqual(clamped.idf[0], np.log1p(0.5 / 8.5))
+
+    def test_corpus_size_recovered_from_rounded_percentages(self):
+        counts = np.array([37, 31, 12, 5, 1])
+        path = os.path.join(tempfile.mkdtemp(), 'frequences.csv')
+        pd.DataFrame({'symptôme': [f's{j}' for j in range(5)], 'nb_maladies': counts,
+                      'fréquence (%)': np.round(counts / 431 * 100, 1)}).to_csv(path, index=False)
+        frequencies, corpus_size = load_symptom_corpus(path)
+        self.assertEqual(frequencies, {f's{j}': int(c) for j, c in enumerate(counts)})
+        self.assertLessEqual(abs(corpus_size - 431), 2)
+
+    def test_retrieval_mode_through_predict(self):
+        client = app.test_client()
+        active_analyzers.clear()
+        frame = _symptom_frame(n_diseases=10, rows_per_disease=1)
+        resp = client.post('/analyze/symptom-matching/train', json={
+            'dataset_id': 'sym2',
+            'data': frame.to_dict('records'),
+            'config': {'disease_column': 'name', 'model': 'retrieval', 'frequency_corpus': None}
+        })
+        self.assertEqual(resp.status_code, 200)
+        retrieval = resp.get_json()['retrieval']
+        self.assertEqual(retrieval['idf_source'], 'matrix')
+        self.assertEqual(retrieval['self_recall_at_1'], 1.0)
+
+        row = frame.iloc[3]
+        resp = client.post('/predict', json={'dataset_id': 'sym2',
+                                             'features': {c: int(row[c]) for c in frame.columns[2:]}})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body['top_prediction']['class'], row['name'])
+        self.assertAlmostEqual(body['top_prediction']['score'], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
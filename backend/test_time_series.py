@@ -0,0 +1,358 @@
+import copy
+import unittest
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+from analyses import time_series
+from app import app, active_analyzers
+from analyses.time_series import TimeSeriesAnalyzer, _smoothing_errors, _baseline_forecast, _fit_baseline, _forecast_metrics
+from utils.array_codec import decode_array
+
+
+def _ar1_random_walk(n=200, phi=0.7, seed=0):
+    """Integrated AR(1): the auto search should pick d=1 and p=1."""
+    rng = np.random.default_rng(seed)
+    e = rng.normal(size=n)
+    x = np.zeros(n)
+    for t in range(1, n):
+        x[t] = phi * x[t - 1] + e[t]
+    return pd.DataFrame({'date': pd.date_range('2020-01-01', periods=n, freq='D'), 'y': np.cumsum(x) + 50})
+
+
+def _seasonal_frame(n=144, period=12, seed=1):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    y = 100 + 0.5 * t + 10 * np.sin(2 * np.pi * t / period) + rng.normal(scale=0.5, size=n)
+    return pd.DataFrame({'date': pd.date_range('2010-01-01', periods=n, freq='MS'), 'y': y})
+
+
+class AutoOrderSearchTests(unittest.TestCase):
+    def setUp(self):
+        time_series._order_fit_cache.clear()
+
+    def test_recovers_order_and_reuses_cache(self):
+        analyzer = TimeSeriesAnalyzer(_ar1_random_walk())
+        config = {'date_column': 'date', 'target_column': 'y', 'arima_order': 'auto',
+                  'methods': ['arima'], 'forecast_periods': 5, 'n_jobs': 2}
+        model = analyzer.perform_analysis(config)['models']['auto_arima']
+        self.assertEqual(model['order'], (1, 1, 0))
+        self.assertEqual(model['method'], 'Auto-ARIMA(1, 1, 0)')
+        search = model['search']
+        self.assertEqual(search['d_selection']['d'], 1)
+        self.assertGreater(search['n_fitted'], 4)
+        self.assertEqual(min(r['aic'] for r in search['trace'] if r['status'] == 'ok'), model['aic'])
+
+        again = analyzer.perform_analysis({**config, 'n_jobs': 1})['models']['auto_arima']
+        self.assertEqual(again['search']['n_fitted'], 0)
+        self.assertEqual(again['search']['n_cached'], search['n_fitted'])
+        self.assertEqual(again['order'], model['order'])
+
+    def test_time_budget_stops_search(self):
+        analyzer = TimeSeriesAnalyzer(_ar1_random_walk())
+        model = analyzer.perform_analysis({
+            'date_column': 'date', 'target_column': 'y', 'methods': ['auto_arima'],
+            'auto_time_budget': 0, 'n_jobs': 1
+        })['models']['auto_arima']
+        search = model['search']
+        self.assertTrue(search['budget_exhausted'])
+        self.assertEqual(search['n_fitted'], 1)
+        self.assertTrue(any(r['status'] == 'skipped_time_budget' for r in search['trace']))
+
+    def test_seasonal_differencing(self):
+        analyzer = TimeSeriesAnalyzer(_seasonal_frame())
+        model = analyzer.perform_analysis({
+            'date_column': 'date', 'target_column': 'y', 'methods': ['auto_arima'],
+            'seasonal_period': 12, 'auto_max_p': 1, 'auto_max_q': 1, 'n_jobs': 1
+        })['models']['auto_arima']
+        self.assertNotIn('error', model)
+        self.assertEqual(model['search']['seasonal_selection']['D'], 1)
+        self.assertEqual(model['seasonal_order'][1::2], (1, 12))
+        self.assertTrue(model['method'].startswith('Auto-SARIMA'))
+
+
+class BaselineForecasterTests(unittest.TestCase):
+    def test_filters_match_recursions(self):
+        y = _ar1_random_walk(n=100)['y'].to_numpy()
+        alpha, beta = 0.4, 0.2
+        level, trend, errors = y[1], y[1] - y[0], [0.0, 0.0]
+        for t in range(2, len(y)):
+            errors.append(y[t] - (level + trend))
+            new_level = level + trend + alpha * errors[-1]
+            trend = beta * (new_level - level) + (1 - beta) * trend
+            level = new_level
+        np.testing.assert_allclose(_smoothing_errors(y, alpha, beta), errors)
+        np.testing.assert_allclose(_baseline_forecast(y, [len(y)], 3, 'holt', {'alpha': alpha, 'beta': beta})[0],
+                                   level + trend * np.arange(1, 4))
+
+    def test_theta_matches_statsmodels(self):
+        from statsmodels.tsa.forecasting.theta import ThetaModel
+        y = _ar1_random_walk(n=100)['y'].to_numpy()
+        fitted = ThetaModel(y, period=1, deseasonalize=False).fit()
+        ours = _baseline_forecast(y, [len(y)], 5, 'theta', {'alpha': fitted.params['alpha']})[0]
+        np.testing.assert_allclose(ours, np.asarray(fitted.forecast(5)), rtol=1e-8)
+
+    def test_origins_are_vectorised(self):
+        y = _seasonal_frame()['y'].to_numpy()
+        for method in ('naive', 'seasonal_naive', 'drift', 'ses', 'holt', 'theta'):
+            params = _fit_baseline(y[:80], method, 12)
+            together = _baseline_forecast(y, [80, 100, 120], 6, method, params, 12)
+            one_by_one = [_baseline_forecast(y[:o], [o], 6, method, params, 12)[0] for o in (80, 100, 120)]
+            np.testing.assert_allclose(together, one_by_one, err_msg=method)
+
+    def test_baseline_wins_screening_and_skips_heavy_models(self):
+        results = TimeSeriesAnalyzer(_seasonal_frame()).perform_analysis({
+            'date_column': 'date', 'target_column': 'y', 'seasonal_period': 12,
+            'methods': ['naive', 'seasonal_naive', 'theta', 'arima', 'sarima'],
+            'skip_heavy_models': True, 'forecast_periods': 12, 'n_jobs': 1
+        })
+        screening = results['screening']
+        self.assertTrue(screening['skip_heavy'])
+        self.assertEqual(screening['best_baseline'], 'seasonal_naive')
+        self.assertEqual(screening['skipped_methods'], ['arima', 'sarima'])
+        self.assertEqual(set(results['models']), {'naive', 'seasonal_naive', 'theta'})
+        self.assertEqual(len(results['summary']['comparison']), 3)
+        self.assertEqual(len(results['models']['theta']['forecast']['values']), 12)
+
+
+class RollingOriginBacktestTests(unittest.TestCase):
+    def test_extended_state_matches_appended_history(self):
+        analyzer = TimeSeriesAnalyzer(_ar1_random_walk(n=160))
+        results = analyzer.perform_analysis({
+            'date_column': 'date', 'target_column': 'y', 'methods': ['arima', 'sarima'],
+            'sarima_seasonal_order': (0, 0, 0, 0), 'forecast_periods': 10,
+            'backtest_folds': 4, 'backtest_horizon': 6, 'n_jobs': 2
+        })
+        backtest = results['backtest']
+        self.assertEqual(backtest['folds'], 4)
+        self.assertEqual(len(backtest['origins']), 4)
+        for key in ('arima', 'sarima'):
+            curves = backtest['models'][key]['per_horizon']
+            self.assertEqual(len(curves['mae']), 6)
+            self.assertEqual(backtest['models'][key]['updating'], 'extend')
+        self.assertEqual(results['summary']['ranking_basis'], 'backtest')
+        self.assertIn('backtest_rmse', results['summary']['comparison'][0])
+
+        values = _ar1_random_walk(n=160)['y'].to_numpy()
+        base = analyzer._state_space_fitters(results['models'])['arima'](values[:130])
+        extended = TimeSeriesAnalyzer._forecast_from_origin(base, values, 130, 148, 6)
+        appended = base.append(values[130:148]).forecast(steps=6)
+        np.testing.assert_allclose(extended, appended, rtol=1e-6)
+
+    def test_short_series_reports_error(self):
+        results = TimeSeriesAnalyzer(_ar1_random_walk(n=40)).perform_analysis({
+            'date_column': 'date', 'target_column': 'y', 'methods': ['arima'],
+            'backtest_folds': 10, 'backtest_horizon': 5, 'backtest_min_train': 38, 'n_jobs': 1
+        })
+        self.assertIn('error', results['backtest'])
+        self.assertEqual(results['summary']['ranking_basis'], 'holdout')
+
+
+class ResamplingStageTests(unittest.TestCase):
+    def test_high_frequency_series_is_downsampled(self):
+        rng = np.random.default_rng(9)
+        n = 200000
+        minutes = pd.date_range('2023-01-01', periods=n, freq='min')
+        signal = 20 + 5 * np.sin(2 * np.pi * np.arange(n) / 1440) + rng.normal(size=n)
+        df = pd.DataFrame({'date': minutes, 'y': signal})
+
+        results = TimeSeriesAnalyzer(df).perform_analysis({
+            'date_column': 'date', 'target_column': 'y', 'methods': ['arima'],
+            'forecast_periods': 5, 'diagnostics_max_points': 2000
+        })
+        resampling = results['resampling']
+        self.assertTrue(resampling['automatic_rule'])
+        self.assertEqual(resampling['rule'], '1h')
+        self.assertEqual(resampling['original_points'], n)
+        self.assertLessEqual(resampling['effective_points'], 5000)
+        self.assertEqual(results['diagnostics']['acf_pacf']['window'], 2000)
+        self.assertEqual(results['diagnostics']['stationarity']['decimation'], 2)
+        self.assertNotIn('error', results['models']['arima'])
+
+    def test_explicit_rule_fills_gaps(self):
+        dates = pd.to_datetime(['2024-01-01 00:10', '2024-01-01 00:20', '2024-01-01 03:05', '2024-01-01 04:00'])
+        df = pd.DataFrame({'date': dates, 'y': [1.0, 2.0, 4.0, 8.0]})
+        analyzer = TimeSeriesAnalyzer(df)
+        ts = df.set_index('date')['y']
+
+        summed, info = analyzer._resample_series(ts, {'resample_rule': '1h', 'resample_agg': 'sum', 'fill_method': 'zero'})
+        self.assertEqual(summed.tolist(), [3.0, 0.0, 0.0, 4.0, 8.0])
+        self.assertEqual(info['empty_intervals'], 2)
+        self.assertEqual(info['effective_resolution'], '1h')
+
+        interpolated, _ = analyzer._resample_series(ts, {'resample_rule': '1h', 'resample_agg': 'mean'})
+        np.testing.assert_allclose(interpolated.tolist(), [1.5, 1.5 + 2.5 / 3, 1.5 + 5 / 3, 4.0, 8.0])
+
+        _, untouched = analyzer._resample_series(ts, {})
+        self.assertFalse(untouched['resampled'])
+
+
+class GroupedForecastTests(unittest.TestCase):
+    def test_failures_are_isolated_per_group(self):
+        frames = []
+        for i, region in enumerate(['north', 'south', 'east']):
+            frame = _ar1_random_walk(n=120, seed=i)
+            frame['region'] = region
+            frames.append(frame)
+        broken = pd.DataFrame({'date': pd.date_range('2020-01-01', periods=4, freq='D'), 'y': [1.0, 2.0, 3.0, 4.0],
+                               'region': 'tiny'})
+        df = pd.concat(frames + [broken]).sample(frac=1, random_state=0)
+
+        results = TimeSeriesAnalyzer(df).perform_analysis({
+            'date_column': 'date', 'target_column': 'y', 'group_column': 'region',
+            'methods': ['arima', 'sarima'], 'sarima_seasonal_order': (0, 0, 0, 0),
+            'forecast_periods': 7, 'n_jobs': 2
+        })
+        summary = results['summary']
+        self.assertEqual(summary['n_groups'], 4)
+        self.assertEqual(summary['failed_groups'], ['tiny'])
+        self.assertIn('trop courte', results['groups']['tiny']['error'])
+
+        north = results['groups']['north']
+        self.assertEqual(north['n_observations'], 120)
+        self.assertEqual(len(north['forecast']['values']), 7)
+        self.assertIn(north['best_model_key'], ('arima', 'sarima'))
+
+        leaderboard = {entry['model']: entry for entry in summary['leaderboard']}
+        self.assertEqual(leaderboard['arima']['n_groups'], 3)
+        self.assertEqual(sum(entry['wins'] for entry in leaderboard.values()), 3)
+        self.assertEqual(summary['best_model'], summary['leaderboard'][0]['model'])
+
+
+class SavedForecastStateTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        active_analyzers.clear()
+
+    def test_forecast_endpoint_serves_saved_state(self):
+        from statsmodels.tsa.statespace.sarimax import SARIMAX
+        df = _ar1_random_walk(n=200)
+        resp = self.client.post('/analyze/time-series', json={
+            'dataset_id': 'ts1',
+            'data': df.assign(date=df['date'].astype(str)).to_dict('records'),
+            'config': {'date_column': 'date', 'target_column': 'y', 'methods': ['arima', 'sarima'],
+                       'sarima_seasonal_order': [0, 0, 0, 0], 'forecast_periods': 5}
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(set(resp.get_json()['forecast_state']['models']), {'arima', 'sarima'})
+
+        state = active_analyzers['ts1']['forecast_states']['sarima']
+        self.assertIsNone(getattr(state, 'data', None))
+        resp = self.client.post('/forecast', json={'dataset_id': 'ts1', 'model': 'sarima', 'horizon': 12,
+                                                   'confidence': 0.8})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(len(body['forecast']['values']), 12)
+        self.assertEqual(body['forecast']['index'][0], '2020-07-19')
+
+        y = df['y'].to_numpy()
+        reference = SARIMAX(y, order=(1, 1, 1)).filter(state.params).get_forecast(12)
+        np.testing.assert_allclose(body['forecast']['values'], reference.predicted_mean)
+        np.testing.assert_allclose(body['forecast']['lower_bound'], reference.conf_int(alpha=0.2)[:, 0])
+
+        resp = self.client.post('/forecast', json={'dataset_id': 'ts1', 'model': 'sarima', 'horizon': 3,
+                                                   'append': [y[-1] + 1, y[-1] + 2], 'append_offset': 200})
+        body = resp.get_json()
+        self.assertEqual(body['n_observations'], 202)
+        self.assertEqual(body['forecast']['index'][0], '2020-07-21')
+        extended = SARIMAX(np.r_[y, y[-1] + 1, y[-1] + 2], order=(1, 1, 1)).filter(state.params)
+        np.testing.assert_allclose(body['forecast']['values'], extended.forecast(3))
+
+        resp = self.client.post('/forecast', json={'dataset_id': 'ts1', 'model': 'prophet'})
+        self.assertEqual(resp.status_code, 400)
+
+    def _train_states(self, dataset_id):
+        df = _ar1_random_walk(n=200)
+        resp = self.client.post('/analyze/time-series', json={
+            'dataset_id': dataset_id,
+            'data': df.assign(date=df['date'].astype(str)).to_dict('records'),
+            'config': {'date_column': 'date', 'target_column': 'y', 'methods': ['arima', 'sarima'],
+                       'sarima_seasonal_order': [0, 0, 0, 0], 'forecast_periods': 5}
+        })
+        self.assertEqual(resp.status_code, 200)
+        return df['y'].to_numpy()
+
+    def test_repeated_append_is_idempotent(self):
+        y = self._train_states('ts2')
+        request = {'dataset_id': 'ts2', 'model': 'sarima', 'horizon': 3,
+                   'append': [y[-1] + 1, y[-1] + 2], 'append_start': '2020-07-19'}
+        first = self.client.post('/forecast', json=request).get_json()
+        second = self.client.post('/forecast', json=request).get_json()
+        self.assertEqual(first['appended'], 2)
+        self.assertEqual((second['appended'], second['skipped']), (0, 2))
+        self.assertEqual(second['n_observations'], 202)
+        self.assertEqual(second['forecast'], first['forecast'])
+
+        # Chevauchement partiel: seul le nouveau point est intégré
+        resp = self.client.post('/forecast', json={**request, 'append': [y[-1] + 2, y[-1] + 3],
+                                                   'append_start': None, 'append_offset': 201})
+        self.assertEqual(resp.get_json()['appended'], 1)
+        self.assertEqual(resp.get_json()['n_observations'], 203)
+
+        for invalid in ({'append_start': None}, {'append_start': None, 'append_offset': 250},
+                        {'append_start': '2020-07-19 12:00'}):
+            resp = self.client.post('/forecast', json={**request, **invalid})
+            self.assertEqual(resp.status_code, 400, invalid)
+        self.assertEqual(active_analyzers['ts2']['forecast_states']['sarima'].n_observations, 203)
+
+    def test_append_updates_every_saved_model(self):
+        y = self._train_states('ts3')
+        states = active_analyzers['ts3']['forecast_states']
+        arima_reference = copy.deepcopy(states['arima'])
+        new_points = [y[-1] + 1, y[-1] + 2]
+        body = self.client.post('/forecast', json={'dataset_id': 'ts3', 'model': 'sarima', 'horizon': 4,
+                                                   'append': new_points, 'append_offset': 200}).get_json()
+        self.assertEqual(body['updated_states'], {
+            'arima': {'appended': 2, 'n_observations': 202},
+            'sarima': {'appended': 2, 'n_observations': 202}
+        })
+
+        body = self.client.post('/forecast', json={'dataset_id': 'ts3', 'model': 'arima', 'horizon': 4}).get_json()
+        self.assertEqual(body['n_observations'], 202)
+        self.assertEqual(body['forecast']['index'][0], '2020-07-21')
+        arima_reference.append(new_points)
+        np.testing.assert_allclose(body['forecast']['values'], arima_reference.forecast(4)[0])
+
+
+class CompactPayloadTests(unittest.TestCase):
+    def test_forecast_metrics_along_horizon_axis(self):
+        actual = np.array([[1.0, 0.0, 4.0], [3.0, 2.0, 2.0]])
+        predicted = actual + np.array([[1.0, 1.0, -2.0], [1.0, 1.0, 2.0]])
+        per_horizon = _forecast_metrics(actual, predicted, axis=0)
+        np.testing.assert_allclose(per_horizon['mae'], [1.0, 1.0, 2.0])
+        np.testing.assert_allclose(per_horizon['mape'], [200 / 3, 50.0, 75.0])
+        overall = _forecast_metrics(actual, predicted)
+        self.assertAlmostEqual(overall['rmse'], np.sqrt(2.0))
+        self.assertIsNone(_forecast_metrics(np.zeros(3), np.ones(3))['mape'])
+
+    def test_compact_mode_preserves_values(self):
+        config = {'date_column': 'date', 'target_column': 'y', 'methods': ['naive', 'drift', 'arima'],
+                  'forecast_periods': 6, 'backtest_folds': 2, 'backtest_horizon': 4}
+        full = TimeSeriesAnalyzer(_seasonal_frame()).perform_analysis(dict(config))
+        compact = TimeSeriesAnalyzer(_seasonal_frame()).perform_analysis(dict(config, response_mode='compact'))
+        self.assertEqual(compact['response_mode'], 'compact')
+
+        for key in ('drift', 'arima'):
+            model, reference = compact['models'][key], full['models'][key]
+            self.assertEqual(model['test_metrics'], reference['test_metrics'])
+            self.assertEqual(decode_array(model['test_actual']).dtype, np.float32)
+            np.testing.assert_allclose(decode_array(model['test_predictions']), reference['test_predictions'], rtol=1e-5)
+            np.testing.assert_allclose(decode_array(model['forecast']['values']), reference['forecast']['values'],
+                                       rtol=1e-5)
+            self.assertEqual(model['test_index'], {'start': reference['test_index'][0], 'freq': 'MS',
+                                                   'periods': len(reference['test_index'])})
+            self.assertEqual(model['forecast']['index']['start'], reference['test_index'][0])
+
+        summary = compact['models']['arima']['model_summary']
+        np.testing.assert_allclose(decode_array(summary['parameters']),
+                                   [full['models']['arima']['model_summary']['parameters'][n] for n in summary['names']],
+                                   rtol=1e-5)
+        np.testing.assert_allclose(decode_array(compact['backtest']['models']['naive']['per_horizon']['mae']),
+                                   full['backtest']['models']['naive']['per_horizon']['mae'], rtol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,310 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+
+sys.path.append(os.path.dirname(__file__))
+from analyses.what_if import WhatIfAnalyzer, ScaledModel, StressTester
+from app import app, active_analyzers
+
+
+def _toy_problem(n_features=8, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((400, n_features))
+    y = (X[:, 0] + X[:, 1] > 1).astype(int)
+    names = [f'f{i}' for i in range(n_features)]
+    ranges = {name: (0.0, 1.0) for name in names}
+    return X, y, names, ranges
+
+
+class CounterfactualSearchTests(unittest.TestCase):
+    def test_batched_search_flips_prediction(self):
+        X, y, names, ranges = _toy_problem()
+        model = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, y)
+        x = X[y == 0][0]
+
+        result = WhatIfAnalyzer.find_counterfactual(model, x, names, 0, 1, ranges,
+                                                    max_changes=2, random_state=3, solver='random')
+        self.assertTrue(result['found'])
+        self.assertLessEqual(result['num_changes'], 2)
+        self.assertGreater(result['candidates_evaluated'], 100)
+
+        counterfactual = x.copy()
+        for change in result['changes']:
+            counterfactual[names.index(change['feature'])] = change['suggested_value']
+        self.assertEqual(model.predict(counterfactual.reshape(1, -1))[0], 1)
+
+    def test_search_is_reproducible(self):
+        X, y, names, ranges = _toy_problem()
+        model = LogisticRegression().fit(X, y)
+        x = X[y == 0][0]
+        first = WhatIfAnalyzer.find_counterfactual(model, x, names, 0, 1, ranges, random_state=7)
+        second = WhatIfAnalyzer.find_counterfactual(model, x, names, 0, 1, ranges, random_state=7)
+        self.assertEqual(first['changes'], second['changes'])
+
+
+
+def _apply_changes(x, names, result):
+    counterfactual = x.copy()
+    for change in result['changes']:
+        counterfactual[names.index(change['feature'])] = change['suggested_value']
+    return counterfactual
+
+
+class ModelAwareSolverTests(unittest.TestCase):
+    def assertCloserThanRandom(self, model, solver_name, X, y, names, ranges, desired=1):
+        for x in X[y != desired][:5]:
+            current = model.predict(x.reshape(1, -1))[0]
+            solved = WhatIfAnalyzer.find_counterfactual(model, x, names, current, desired, ranges)
+            baseline = WhatIfAnalyzer.find_counterfactual(model, x, names, current, desired, ranges,
+                                                          solver='random', random_state=0)
+            self.assertEqual(solved['solver'], solver_name)
+            self.assertEqual(model.predict(_apply_changes(x, names, solved).reshape(1, -1))[0], desired)
+            self.assertLessEqual(solved['num_changes'], 3)
+            if baseline['found']:
+                self.assertLess(solved['distance'], baseline['distance'])
+
+    def test_linear_models(self):
+        X, y, names, ranges = _toy_problem()
+        for model in (LogisticRegression(), SVC(kernel='linear')):
+            self.assertCloserThanRandom(model.fit(X, y), 'linear_closed_form', X, y, names, ranges)
+
+    def test_multiclass_logistic_regression(self):
+        X, _, names, ranges = _toy_problem()
+        y = np.digitize(X[:, 0] + X[:, 1], [0.7, 1.3])
+        model = LogisticRegression().fit(X, y)
+        self.assertCloserThanRandom(model, 'linear_closed_form', X, y, names, ranges, desired=2)
+
+    def test_decision_tree(self):
+        X, y, names, ranges = _toy_problem()
+        model = DecisionTreeClassifier(random_state=0).fit(X, y)
+        self.assertCloserThanRandom(model, 'tree_leaf_projection', X, y, names, ranges)
+
+    def test_random_forest(self):
+        X, y, names, ranges = _toy_problem()
+        model = RandomForestClassifier(n_estimators=30, random_state=0).fit(X, y)
+        x = X[y == 0][0]
+        result = WhatIfAnalyzer.find_counterfactual(model, x, names, 0, 1, ranges)
+        self.assertEqual(result['solver'], 'tree_leaf_projection')
+        self.assertEqual(model.predict(_apply_changes(x, names, result).reshape(1, -1))[0], 1)
+
+    def test_respects_ranges_and_scaler(self):
+        X, y, names, _ = _toy_problem()
+        X = X * 10
+        scaler = StandardScaler().fit(X)
+        model = ScaledModel(LogisticRegression().fit(scaler.transform(X), y), scaler)
+        ranges = {name: (0.0, 10.0) for name in names}
+        ranges['f0'] = (0.0, 5.0)
+        x = X[(y == 0) & (X[:, 0] < 4)][0]
+        result = WhatIfAnalyzer.find_counterfactual(model, x, names, 0, 1, ranges)
+        self.assertEqual(result['solver'], 'linear_closed_form')
+        counterfactual = _apply_changes(x, names, result)
+        self.assertLessEqual(counterfactual[0], 5.0 + 1e-9)
+        self.assertEqual(model.predict(counterfactual.reshape(1, -1))[0], 1)
+
+
+class ScenarioGenerationTests(unittest.TestCase):
+    def test_single_batched_call(self):
+        X, y, names, _ = _toy_problem()
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, np.where(y == 1, 'high', 'low'))
+        calls = []
+        original = model.predict_proba
+
+        def counting_predict_proba(rows):
+            calls.append(len(rows))
+            return original(rows)
+
+        model.predict_proba = counting_predict_proba
+        scenarios = WhatIfAnalyzer.generate_scenarios(X[0], names, model, n_scenarios=2000, random_state=0)
+        self.assertEqual(calls, [2000])
+        self.assertEqual(len(scenarios), 2000)
+        self.assertIn(scenarios[0]['prediction'], ('high', 'low'))
+        self.assertEqual(set(scenarios[0]['changes']), set(names))
+
+    def test_scenarios_are_reproducible(self):
+        X, y, names, _ = _toy_problem()
+        model = LogisticRegression().fit(X, y)
+        first = WhatIfAnalyzer.generate_scenarios(X[0], names, model, n_scenarios=10, random_state=4)
+        second = WhatIfAnalyzer.generate_scenarios(X[0], names, model, n_scenarios=10, random_state=4)
+        self.assertEqual(first, second)
+
+
+class SensitivityCurveTests(unittest.TestCase):
+    def setUp(self):
+        X, y, self.names, _ = _toy_problem()
+        self.X = X
+        self.model = LogisticRegression().fit(X, y)
+        self.grids = {name: np.linspace(0, 1, 11) for name in self.names[:3]}
+
+    def test_partial_dependence_matches_manual_average(self):
+        curves = WhatIfAnalyzer.sensitivity_curves(self.model, self.X[0], self.X[:50], self.names,
+                                                   self.names[:3], self.grids, target_index=1)
+        f0 = next(c for c in curves if c['feature'] == 'f0')
+        shifted = self.X[:50].copy()
+        shifted[:, 0] = 0.5
+        expected = self.model.predict_proba(shifted)[:, 1].mean()
+        self.assertAlmostEqual(f0['partial_dependence'][5], expected, places=5)
+        self.assertEqual(len(f0['ice']), 50)
+        # Irrelevant features come last
+        self.assertEqual(curves[-1]['feature'], 'f2')
+
+    def test_cache_and_process_pool(self):
+        cache = {}
+        serial = WhatIfAnalyzer.sensitivity_curves(self.model, self.X[0], self.X[:50], self.names,
+                                                   self.names[:3], self.grids, target_index=1,
+                                                   cache=cache, cache_prefix='ds')
+        self.assertEqual(len(cache), 3)
+        self.assertIn(('ds', 'f0', tuple(self.grids['f0'].tolist())), cache)
+        pooled = WhatIfAnalyzer.sensitivity_curves(self.model, self.X[1], self.X[:50], self.names,
+                                                   self.names[:3], self.grids, target_index=1, n_jobs=2)
+        cached = WhatIfAnalyzer.sensitivity_curves(self.model, self.X[1], self.X[:50], self.names,
+                                                   self.names[:3], self.grids, target_index=1,
+                                                   cache=cache, cache_prefix='ds')
+        self.assertTrue(all(c['cached'] for c in cached))
+        for a, b, c in zip(serial, pooled, cached):
+            np.testing.assert_allclose(a['partial_dependence'], b['partial_dependence'], rtol=1e-6)
+            np.testing.assert_allclose(b['sample_curve'], c['sample_curve'], rtol=1e-6)
+
+
+class StressTesterTests(unittest.TestCase):
+    def test_noise_levels_share_one_predict_call(self):
+        X, y, _, _ = _toy_problem()
+        model = LogisticRegression().fit(X, y)
+        calls = []
+        original = model.predict
+
+        def counting_predict(rows):
+            calls.append(len(rows))
+            return original(rows)
+
+        model.predict = counting_predict
+        result = StressTester._test_noise_robustness(model, X, y, np.random.default_rng(0))
+        self.assertEqual(calls, [len(X), 3 * len(X)])
+        self.assertEqual(len(result['noise_tests']), 3)
+
+    def test_extreme_values_vectorised_with_repetitions(self):
+        X, y, _, _ = _toy_problem()
+        model = LogisticRegression().fit(X, y)
+        batches = []
+        original = model.predict
+
+        def recording_predict(rows):
+            batches.append(rows)
+            return original(rows)
+
+        model.predict = recording_predict
+        result = StressTester._test_extreme_values(model, X, y, np.random.default_rng(0), repetitions=4)
+        self.assertEqual(len(batches), 2)
+        perturbed = batches[1].reshape(4, len(X), X.shape[1])
+        # Exactly 10% of each column is pushed to mean ± 3 std in every repetition
+        extreme = np.abs(np.abs(perturbed - X.mean(axis=0)) - 3 * X.std(axis=0)) < 1e-9
+        np.testing.assert_array_equal(extreme.sum(axis=1), 40)
+        low, high = result['accuracy_drop_ci']
+        self.assertLessEqual(low, result['accuracy_drop'])
+        self.assertGreaterEqual(high, result['accuracy_drop'])
+
+    def test_seeded_results_are_reproducible(self):
+        X, y, names, _ = _toy_problem()
+        model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+        first = StressTester.run_stress_tests(model, X, y, names, random_state=5)
+        second = StressTester.run_stress_tests(model, X, y, names, random_state=5)
+        self.assertEqual(first, second)
+        self.assertIn(first['overall_robustness'], ('high', 'moderate', 'low'))
+
+
+class WhatIfEndpointTests(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        active_analyzers.clear()
+
+    def test_counterfactual_uses_training_ranges(self):
+        rng = np.random.default_rng(0)
+        rows = [{'x1': float(a), 'x2': float(b), 'label': 'yes' if a + b > 10 else 'no'}
+                for a, b in rng.uniform(0, 10, size=(120, 2))]
+        resp = self.client.post('/analyze/classification', json={
+            'dataset_id': 'wi1',
+            'data': rows,
+            'config': {'target': 'label', 'features': ['x1', 'x2'], 'methods': ['svm'],
+                       'svm_kernel': 'linear', 'test_size': 0.2, 'cv_folds': 3}
+        })
+        self.assertEqual(resp.status_code, 200)
+
+        resp = self.client.post('/whatif/analyze', json={
+            'dataset_id': 'wi1',
+            'current_features': {'x1': 2.0, 'x2': 3.0},
+            'desired_outcome': 'yes',
+            'n_scenarios': 50
+        })
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body['current_prediction'], 'no')
+        self.assertTrue(body['counterfactual']['found'])
+        for change in body['counterfactual']['changes']:
+            self.assertLessEqual(change['suggested_value'], 10.0)
+        self.assertEqual(len(body['scenarios']), 50)
+        self.assertIn(body['scenarios'][0]['prediction'], ('yes', 'no'))
+
+        resp = self.client.post('/whatif/sensitivity', json={
+            'dataset_id': 'wi1',
+            'current_features': {'x1': 2.0, 'x2': 3.0},
+            'target_class': 'yes',
+            'n_points': 10
+        })
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body['target_class'], 'yes')
+        self.assertEqual(len(body['curves']), 2)
+        x1 = next(c for c in body['curves'] if c['feature'] == 'x1')
+        self.assertEqual(len(x1['grid']), 10)
+        # P(yes) grows with x1
+        self.assertGreater(x1['partial_dependence'][-1], x1['partial_dependence'][0])
+
+    def test_stress_test_uses_retained_holdout(self):
+        rng = np.random.default_rng(1)
+        # 10 % d'étiquettes bruitées: un score d'entraînement (~1.0) se distingue d'un score hors échantillon
+        rows = [{'x1': float(a), 'x2': float(b), 'label': 'yes' if (a > b) != flip else 'no',
+                 'value': float(2 * a - b + noise)}
+                for (a, b), flip, noise in zip(rng.uniform(0, 10, size=(150, 2)), rng.random(150) < 0.1,
+                                               rng.normal(scale=0.5, size=150))]
+        for model_type, target, methods in (('classification', 'label', ['random_forest']),
+                                            ('regression', 'value', ['linear'])):
+            resp = self.client.post(f'/analyze/{model_type}', json={
+                'dataset_id': model_type,
+                'data': rows,
+                'config': {'target': target, 'features': ['x1', 'x2'], 'methods': methods,
+                           'test_size': 0.2, 'cv_folds': 3}
+            })
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(active_analyzers[model_type]['holdout']['X'].dtype, np.float32)
+
+            resp = self.client.post('/model/stress-test', json={'dataset_id': model_type})
+            self.assertEqual(resp.status_code, 200)
+            body = resp.get_json()
+            self.assertEqual(body['n_holdout'], 30)
+            results = body['stress_test_results']
+            self.assertGreater(results['noise_robustness']['baseline_accuracy'], 0.7)
+            self.assertIn('score', results['extreme_values'])
+
+            # Le baseline est le score hors échantillon du modèle servi, pas un score d'entraînement
+            analyzer = active_analyzers[model_type]['analyzer']
+            holdout = active_analyzers[model_type]['holdout']
+            transformer = getattr(analyzer, '_predict_poly', None) or analyzer._predict_scaler
+            served = ScaledModel(analyzer._predict_model, transformer) if transformer is not None else analyzer._predict_model
+            predicted = served.predict(holdout['X'])
+            if model_type == 'classification':
+                held_out_score = np.mean(predicted == holdout['y'])
+                self.assertLess(held_out_score, 1.0)
+            else:
+                held_out_score = 1 - np.sum((holdout['y'] - predicted) ** 2) / np.sum((holdout['y'] - holdout['y'].mean()) ** 2)
+            self.assertAlmostEqual(results['noise_robustness']['baseline_accuracy'], held_out_score, places=5)
+            self.assertIn('score', results['edge_cases'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Encodage compact de tableaux numpy pour le transport JSON.
+
+Les tableaux sont sérialisés en binaire little-endian puis encodés en base64,
+ce qui évite de produire (et de parcourir dans _normalize_payload) des listes
+JSON de plusieurs centaines de milliers d'éléments.
+
+Format:
+{
+    "encoding": "base64",
+    "dtype": "int16",
+    "byteorder": "little",
+    "shape": [200000],
+    "data": "..."
+}
+"""
+
+import base64
+
+import numpy as np
+
+
+def smallest_int_dtype(values):
+    """Plus petit type entier signé pouvant représenter toutes les valeurs"""
+    values = np.asarray(values)
+    if values.size == 0:
+        return np.dtype(np.int8)
+    low, high = int(values.min()), int(values.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def encode_array(values, dtype=None):
+    """Encode un tableau numpy en base64 (little-endian)"""
+    arr = np.asarray(values, dtype=dtype)
+    arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder('<'))
+    return {
+        'encoding': 'base64',
+        'dtype': arr.dtype.name,
+        'byteorder': 'little',
+        'shape': list(arr.shape),
+        'data': base64.b64encode(arr.tobytes()).decode('ascii')
+    }
+
+
+def decode_array(payload):
+    """Décode un tableau produit par encode_array"""
+    dtype = np.dtype(payload['dtype']).newbyteorder('<')
+    arr = np.frombuffer(base64.b64decode(payload['data']), dtype=dtype)
+    return arr.reshape(payload['shape'])